@@ -34,4 +34,252 @@ cdef void _emptyStringToNone(list l):
             emptyStringToNone(x)
 
         elif x == '':
-            l[i] = None
\ No newline at end of file
+            l[i] = None
+
+from cpython.conversion cimport PyOS_string_to_double
+from libc.stdlib cimport malloc, free
+from libc.math cimport NAN
+
+import numpy as np
+
+def timestampsToMicroseconds(list values):
+    """
+    Converts naive 'YYYY-MM-DD HH:MM[:SS[.ffffff]]' strings into an int64
+    array of microseconds since 1970-01-01 00:00.
+    """
+    cdef Py_ssize_t i, n = len(values)
+    result = np.empty(n, dtype=np.int64)
+    cdef long long[:] out = result
+    for i in range(n):
+        out[i] = _timestampToMicroseconds(values[i])
+
+    return result
+
+cdef long long _timestampToMicroseconds(object tStr) except? -1:
+    cdef unicode s = tStr if isinstance(tStr, unicode) else tStr.decode('ascii')
+    return _parseTimestamp(s, 0, len(s))
+
+cdef long long _parseTimestamp(unicode s, Py_ssize_t start, Py_ssize_t stop) except? -1:
+    cdef long long fields[6]
+    cdef int k
+    cdef Py_ssize_t i
+    cdef long long microseconds = 0, scale = 100000
+    cdef int field = 0, digits = 0, digit
+    cdef bint fraction = False
+    cdef Py_UCS4 c
+
+    for k in range(6):
+        fields[k] = 0
+
+    for i in range(start, stop):
+        c = s[i]
+        if u'0' <= c <= u'9':
+            digit = <int>c - 48 # ord('0')
+            if not fraction:
+                fields[field] = fields[field] * 10 + digit
+                digits += 1
+
+            elif scale > 0:
+                microseconds += digit * scale
+                scale //= 10
+
+            elif scale == 0:
+                if digit >= 5:
+                    microseconds += 1
+
+                scale = -1
+
+        elif c == u'.' and field == 5 and not fraction:
+            fraction = True
+
+        elif (c == u'-' and field < 2 or c == u' ' and field == 2
+              or c == u':' and 2 < field < 5) and digits > 0:
+            field += 1
+            digits = 0
+
+        else:
+            raise ValueError('invalid timestamp: %r' % s[start:stop])
+
+    if field < 4 or digits == 0 or not 1 <= fields[1] <= 12 \
+       or not 1 <= fields[2] <= _daysInMonth(fields[0], fields[1]):
+        raise ValueError('invalid timestamp: %r' % s[start:stop])
+
+    return ((((_daysFromCivil(fields[0], fields[1], fields[2]) * 24
+               + fields[3]) * 60 + fields[4]) * 60 + fields[5]) * 1000000
+            + microseconds)
+
+cdef int _daysInMonth(long long year, long long month):
+    if month == 2:
+        if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+            return 29
+
+        return 28
+
+    if month in (4, 6, 9, 11):
+        return 30
+
+    return 31
+
+cdef long long _daysFromCivil(long long year, long long month, long long day):
+    # days since 1970-01-01 in the proleptic Gregorian calendar
+    if month <= 2:
+        year -= 1
+
+    cdef long long era = year // 400
+    cdef long long yearOfEra = year - era * 400
+    cdef long long dayOfYear = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    cdef long long dayOfEra = yearOfEra * 365 + yearOfEra // 4 - yearOfEra // 100 + dayOfYear
+    return era * 146097 + dayOfEra - 719468
+
+def tokenizeColumns(list lines, list codes, list nulls):
+    """
+    Converts tab-separated lines into typed columns.
+
+    codes[j] declares the kind of j-th field: None (skipped), 'i' (int64,
+    empty fields are nulls[j]), 'f' (float64, decimal commas accepted,
+    empty fields are NaN), 's' (strings, empty fields are None) or 't'
+    (timestamps as int64 microseconds since 1970-01-01 00:00).
+
+    Returns a list of arrays (None for skipped fields) or None if the lines
+    are not plain tab-separated lines of len(codes) fields (e.g. contain
+    quotes, which are left to the csv module).
+    """
+    cdef Py_ssize_t n = len(lines), width = len(codes)
+    cdef Py_ssize_t i, j, k, start, length
+    cdef char *kinds = <char *>malloc(width * sizeof(char))
+    cdef void **buffers = <void **>malloc(width * sizeof(void *))
+    cdef long long *intNulls = <long long *>malloc(width * sizeof(long long))
+    cdef long long[::1] intView
+    cdef double[::1] floatView
+    cdef unicode text
+    cdef Py_UCS4 c
+    columns = []
+    strings = []
+    try:
+        for j in range(width):
+            code = codes[j]
+            kinds[j] = ord(code) if code is not None else 0
+            strings.append([] if code == 's' else None)
+            if code in ('i', 't'):
+                intNulls[j] = nulls[j] if code == 'i' else 0
+                columns.append(np.empty(n, dtype=np.int64))
+                if n > 0:
+                    intView = columns[j]
+                    buffers[j] = &intView[0]
+
+            elif code == 'f':
+                columns.append(np.empty(n, dtype=np.float64))
+                if n > 0:
+                    floatView = columns[j]
+                    buffers[j] = &floatView[0]
+
+            else:
+                columns.append(None)
+
+        for i in range(n):
+            line = lines[i]
+            text = line if isinstance(line, unicode) else line.decode('latin-1')
+            length = len(text)
+            while length > 0 and text[length - 1] in u'\r\n':
+                length -= 1
+
+            j = 0
+            start = 0
+            for k in range(length + 1):
+                if k < length:
+                    c = text[k]
+                    if c == u'"':
+                        return None
+
+                    if c != u'\t':
+                        continue
+
+                if j >= width:
+                    return None
+
+                if kinds[j] == b'i':
+                    (<long long *>buffers[j])[i] = _parseInt(text, start, k,
+                                                              intNulls[j])
+
+                elif kinds[j] == b'f':
+                    (<double *>buffers[j])[i] = _parseFloat(text, start, k)
+
+                elif kinds[j] == b't':
+                    (<long long *>buffers[j])[i] = _parseTimestamp(text, start, k)
+
+                elif kinds[j] == b's':
+                    strings[j].append(line[start:k] if k > start else None)
+
+                j += 1
+                start = k + 1
+
+            if j != width:
+                return None
+
+    finally:
+        free(kinds)
+        free(buffers)
+        free(intNulls)
+
+    for j in range(width):
+        if strings[j] is not None:
+            columns[j] = np.empty(n, dtype=object)
+            columns[j][:] = strings[j]
+
+    return columns
+
+cdef long long _parseInt(unicode s, Py_ssize_t start, Py_ssize_t stop,
+                         long long null) except? -1:
+    cdef long long value = 0
+    cdef Py_ssize_t i = start
+    cdef bint negative = False
+    cdef Py_UCS4 c
+    if start == stop:
+        return null
+
+    if s[i] == u'-' or s[i] == u'+':
+        negative = s[i] == u'-'
+        i += 1
+
+    if i == stop or stop - i > 18:
+        return int(s[start:stop])
+
+    for i in range(i, stop):
+        c = s[i]
+        if not u'0' <= c <= u'9':
+            return int(s[start:stop])
+
+        value = value * 10 + (<int>c - 48) # ord('0')
+
+    return -value if negative else value
+
+cdef double _parseFloat(unicode s, Py_ssize_t start, Py_ssize_t stop) except? -1.0:
+    cdef char buf[64]
+    cdef char *end
+    cdef double value = 0
+    cdef Py_ssize_t i
+    cdef Py_UCS4 c
+    if start == stop:
+        return NAN
+
+    if stop - start >= 64:
+        return float(s[start:stop].replace(u',', u'.'))
+
+    for i in range(start, stop):
+        c = s[i]
+        if c > 127:
+            return float(s[start:stop].replace(u',', u'.'))
+
+        buf[i - start] = b'.' if c == u',' else <char>c
+
+    buf[stop - start] = 0
+    try:
+        value = PyOS_string_to_double(buf, &end, NULL)
+
+    except ValueError:
+        end = buf
+
+    if end != buf + (stop - start):
+        return float(s[start:stop].replace(u',', u'.'))
+
+    return value
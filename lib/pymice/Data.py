@@ -42,7 +42,7 @@ from collections import Container
 from .ICNodes import Group # XXX: unnecessary dependency
 
 from ._Tools import timeString, toTimestampUTC, warn, isString
-from ._ObjectBase import ObjectBase
+from ._ObjectBase import ObjectBase, Interval, LRUCache
 
 
 # dependence tracking
@@ -58,6 +58,23 @@ class IdentityManager(object):
     return x
 
 
+class SourceRegistry(dict):
+  """
+  A registry of data sources of nodes.
+
+  Every distinct source is stored once: nodes of the source (and their
+  clones) refer to the registered object.
+
+  >>> registry = SourceRegistry()
+  >>> source = registry[u'a.zip']
+  >>> registry[u''.join([u'a', u'.zip'])] is source
+  True
+  """
+  def __missing__(self, source):
+    self[source] = source
+    return source
+
+
 class IntIdentityManager(int):
   def __new__(cls, *args, **kwargs):
     if len(args) + len(kwargs) == 0:
@@ -79,9 +96,10 @@ class Data(object):
 
   def __init__(self, getNp=True, getLog=False,
                getEnv=False, getHw=False,
-               SourceManager=IdentityManager,
+               SourceManager=SourceRegistry,
 #               CageManager=IntIdentityManager,
-               AnimalManager=dict):
+               AnimalManager=dict,
+               queryCacheBudget=LRUCache.DEFAULT_BUDGET):
     """
     :param getNp: whether to load nosepoke data.
     :type getNp: bool
@@ -94,6 +112,10 @@ class Data(object):
 
     :param getHw: whether to load hardware data.
     :type getHw: bool
+
+    :param queryCacheBudget: maximum size (in bytes) of masks and indexes
+                             kept to speed up queries (unlimited if None)
+    :type queryCacheBudget: int or None
     """
     self.__name2group = {}
 
@@ -107,13 +129,18 @@ class Data(object):
     # change to
     self.__animalsByName = AnimalManager()
 
+    self.__queryCache = LRUCache(queryCacheBudget)
     self.__visits = ObjectBase({
       'Start': toTimestampUTC,
-      'End': toTimestampUTC})
-
-    self.__log = ObjectBase({'DateTime': toTimestampUTC})
-    self.__environment = ObjectBase({'DateTime': toTimestampUTC})
-    self.__hardware = ObjectBase({'DateTime': toTimestampUTC})
+      'End': toTimestampUTC},
+      cache=self.__queryCache)
+
+    self.__log = ObjectBase({'DateTime': toTimestampUTC},
+                            cache=self.__queryCache)
+    self.__environment = ObjectBase({'DateTime': toTimestampUTC},
+                                    cache=self.__queryCache)
+    self.__hardware = ObjectBase({'DateTime': toTimestampUTC},
+                                 cache=self.__queryCache)
     self._initCache()
 
 #    self._setCageManager(CageManager())
@@ -122,12 +149,31 @@ class Data(object):
   def _setCageManager(self, cageManager):
     self._cageManager = cageManager
 
+  def setQueryCacheBudget(self, budget):
+    """
+    Limit the memory used by masks and indexes kept to speed up queries
+    (least recently used ones are discarded first).
+
+    :param budget: maximum size (in bytes) (unlimited if None)
+    :type budget: int or None
+    """
+    self.__queryCache.setBudget(budget)
+
+  def getQueryCacheStats(self):
+    """
+    :return: the budget, number and total size (in bytes) of masks and
+             indexes kept to speed up queries, and numbers of cache hits,
+             misses and evictions
+    :rtype: {str: int, ...}
+    """
+    return self.__queryCache.getStats()
+
   def __del__(self):
     for cache in [self.__visits,
                   self.__log,
                   self.__environment,
                   self.__hardware]:
-      for node in cache.get():
+      for node in cache.getMaterialized():
         if node:
           node._del_()
 
@@ -171,8 +217,7 @@ class Data(object):
 
       selectors['Animal.Name'] = map(unicode, mice)
 
-    visits = self.__visits.get(selectors)
-    return self.__orderBy(visits, order)
+    return self.__visits.get(selectors, order=order)
 
   def getLog(self, start=None, end=None, order=None):
     """
@@ -193,8 +238,7 @@ class Data(object):
      < Log Info, Application (at 2012-12-18 12:20:37.718) >]
     """
     selectors = self.__makeTimeSelectors('DateTime', start, end)
-    log = self.__log.get(selectors)
-    return self.__orderBy(log, order)
+    return self.__log.get(selectors, order=order)
 
   def getEnvironment(self, start=None, end=None, order=None):
     """
@@ -229,8 +273,7 @@ class Data(object):
      < Illumination:   0, Temperature: 23.6 (at 2012-12-18 12:20:02.000) >]
     """
     selectors = self.__makeTimeSelectors('DateTime', start, end)
-    env = self.__environment.get(selectors)
-    return self.__orderBy(env, order)
+    return self.__environment.get(selectors, order=order)
 
   def getHardwareEvents(self, start=None, end=None, order=None):
     """
@@ -247,8 +290,82 @@ class Data(object):
     :rtype: [:py:class:`HardwareEvent`, ...]
     """
     selectors = self.__makeTimeSelectors('DateTime', start, end)
-    hw = self.__hardware.get(selectors)
-    return self.__orderBy(hw, order)
+    return self.__hardware.get(selectors, order=order)
+
+  Interval = Interval
+
+  def query(self, table, where=None, order=None, offset=0, limit=None):
+    """
+    :param table: nodes to be selected from
+    :type table: 'visits', 'log', 'environment' or 'hardware'
+
+    :param where: attributes (dotted paths allowed) and their predicates;
+                  a predicate is either an accepted value, a collection of
+                  accepted values, a range (a slice or an
+                  :py:class:`Interval` of lower (inclusive) and upper
+                  (exclusive) bounds), or a function returning a boolean
+                  mask for a NumPy array of attribute values
+    :type where: {str: object, ...} or None
+
+    :param order: attributes that the returned list is ordered by
+    :type order: str or unicode or their sequence or None
+
+    :param offset: number of (ordered) nodes to be skipped
+    :type offset: int
+
+    :param limit: maximum number of nodes returned (unlimited if None)
+    :type limit: int or None
+
+    :return: nodes satisfying all the predicates
+    :rtype: [:py:class:`Visit`, ...] or [:py:class:`LogEntry`, ...] or
+            [:py:class:`EnvironmentalConditions`, ...] or
+            [:py:class:`HardwareEvent`, ...]
+
+    >>> data.query('visits', {'Animal.Name': ['Mickey', 'Minnie'],
+    ...                       'Corner': slice(2, 5)})
+    [< Visit of "Minnie" to corner #4 of cage #1 (at 2012-12-18 12:30:02.360) >]
+
+    >>> data.query('visits', {'Animal.Name': ['Mickey', 'Minnie']},
+    ...            order='Start', offset=1, limit=1)
+    [< Visit of "Mickey" to corner #1 of cage #1 (at 2012-12-18 12:31:00.000) >]
+    """
+    try:
+      objectBase = {'visits': self.__visits,
+                    'log': self.__log,
+                    'environment': self.__environment,
+                    'hardware': self.__hardware}[table]
+
+    except KeyError:
+      raise ValueError("Unknown table: %s" % table)
+
+    selectors = dict((attributeName, self.__makeSelector(attributeName, predicate))
+                     for attributeName, predicate in (where or {}).items())
+    stop = None if limit is None else offset + limit
+    return objectBase.get(selectors, offset, stop, order)
+
+  __TIME_ATTRIBUTES = frozenset(['Start', 'End', 'DateTime'])
+
+  @classmethod
+  def __makeSelector(cls, attributeName, predicate):
+    convert = toTimestampUTC if attributeName in cls.__TIME_ATTRIBUTES \
+              else (lambda x: x)
+    if isinstance(predicate, slice):
+      if predicate.step is not None:
+        raise ValueError("Range with a step: %s" % predicate)
+
+      predicate = Interval(predicate.start, predicate.stop)
+
+    if isinstance(predicate, Interval):
+      return Interval(None if predicate.lower is None else convert(predicate.lower),
+                      None if predicate.upper is None else convert(predicate.upper))
+
+    if hasattr(predicate, '__call__'):
+      return predicate
+
+    if isString(predicate) or not isinstance(predicate, Container):
+      predicate = [predicate]
+
+    return [convert(value) for value in predicate]
 
   def getCage(self, mouse):
     """
@@ -315,6 +432,14 @@ class Data(object):
     except ValueError:
       return None
 
+  def _getIcSessionBounds(self):
+    """
+    :return: the start and the end of the IntelliCage session (without
+             loading data not loaded yet)
+    :rtype: (datetime.datetime or None, datetime.datetime or None)
+    """
+    return self.icSessionStart, self.icSessionEnd
+
   def getEnd(self):
     """
     :return: time of the latest visit registration
@@ -364,39 +489,44 @@ class Data(object):
     self.__cages = {}
     self.__animal2cage = {}
 
-  def _buildCache(self):
+  def _buildCache(self, cagesAndAnimals=None):
+    """
+    :param cagesAndAnimals: (cage, animal name) pairs of the visits (to be
+                            extracted from the visits if not given)
+    """
     self.__cages = {}
     self.__animal2cage = {}
-    currentCage = None
-    animals = []
-    cursor = sorted(set((int(c), unicode(a)) for (c, a) in self.__visits.getAttributes('Cage', 'Animal.Name')))
+    if cagesAndAnimals is None:
+      cagesAndAnimals = self.__visits.getAttributes('Cage', 'Animal.Name')
+
+    self._updateCache(cagesAndAnimals)
+
+  def _updateCache(self, cagesAndAnimals):
+    """
+    Update the cage and inmates caches with only newly inserted visits.
+
+    :param cagesAndAnimals: (cage, animal name) pairs of the new visits
+    """
+    cursor = sorted(set((int(c), unicode(a)) for (c, a) in cagesAndAnimals))
+    newInmates = {}
 
     for cage, animal in cursor:
-      if animal not in self.__animal2cage:
-        self.__animal2cage[animal] = [cage]
+      cages = self.__animal2cage.setdefault(animal, [])
+      if cage in cages:
+        continue
 
-      else:
-        self.__animal2cage[animal].append(cage)
+      cages.append(cage)
+      if len(cages) > 1:
+        cages.sort()
         warn.warn("Animal %s found in multiple cages (%s)." %\
-                  (animal, ', '.join(map(str, self.__animal2cage[animal]))))
+                  (animal, ', '.join(map(str, cages))))
                   #, stacklevel=4)
 
       # unsure if should be object instead of unicode
-      animal = self.__animalsByName[animal]
-      if cage != currentCage:
-        if currentCage != None:
-          self.__cages[currentCage] = frozenset(animals)
+      newInmates.setdefault(cage, []).append(self.__animalsByName[animal])
 
-        animals = [animal]
-        currentCage = cage
-
-      else:
-        animals.append(animal)
-
-    #XXX: I've changed the indent (was in for loop) - in case of any issue
-    #     investigate it.
-    if currentCage != None:
-      self.__cages[currentCage] = frozenset(animals)
+    for cage, animals in newInmates.items():
+      self.__cages[cage] = self.__cages.get(cage, frozenset()).union(animals)
 
 
 # data management
@@ -409,6 +539,9 @@ class Data(object):
   def _insertNewLog(self, lNodes):
     self.__log.put(lNodes)
 
+  def _insertLazyLog(self, lNodesFactory):
+    self.__log.putLazy(lNodesFactory)
+
   def insertEnv(self, env):
     self._raiseIfFrozen()
 
@@ -418,6 +551,9 @@ class Data(object):
   def _insertNewEnv(self, eNodes):
     self.__environment.put(eNodes)
 
+  def _insertLazyEnv(self, eNodesFactory):
+    self.__environment.putLazy(eNodesFactory)
+
   def insertHw(self, hardwareEvents):
     self._raiseIfFrozen()
 
@@ -427,6 +563,9 @@ class Data(object):
   def _insertNewHw(self, hNodes):
     self.__hardware.put(hNodes)
 
+  def _insertLazyHw(self, hNodesFactory):
+    self.__hardware.putLazy(hNodesFactory)
+
   def freeze(self):
     self.__frozen = True
 
@@ -451,6 +590,9 @@ class Data(object):
   def _insertNewVisits(self, visits):
     self.__visits.put(visits)
 
+  def _insertLazyVisits(self, visitsFactory):
+    self.__visits.putLazy(visitsFactory)
+
   def _registerGroup(self, Name, Animals=[], **kwargs):
     Animals = [self.getAnimal(animal) for animal in Animals] # XXX sanity
     if Name in self.__name2group:
@@ -480,27 +622,10 @@ class Data(object):
 
     return animal
 
-  @staticmethod
-  def __orderBy(data, order):
-    if order is None:
-      return list(data)
-
-    key = attrgetter(order) if isString(order) else attrgetter(*order)
-    return sorted(data, key=key)
-
   @staticmethod
   def __makeTimeFilter(start, end):
-    if start is not None:
-      startTimestamp = toTimestampUTC(start)
-      if end is not None:
-        endTimestamp = toTimestampUTC(end)
-        return lambda X: (startTimestamp <= X) * (X < endTimestamp)
-
-      return lambda X: startTimestamp <= X
-
-    if end is not None:
-      endTimestamp = toTimestampUTC(end)
-      return lambda X: X < endTimestamp
+    return Interval(toTimestampUTC(start) if start is not None else None,
+                    toTimestampUTC(end) if end is not None else None)
 
   @staticmethod
   def __makeTimeSelectors(attributeName, start, end):
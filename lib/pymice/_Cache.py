@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2012-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+"""
+On-disk cache of data files already parsed into typed columns.
+"""
+
+import os
+import hashlib
+import tempfile
+
+try:
+  import cPickle as pickle
+
+except ImportError:
+  import pickle
+
+from ._Version import __version__ as VERSION
+
+# dependence tracking
+from . import _dependencies
+import types
+__dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().values()
+                                                      if isinstance(x, types.ModuleType)])
+
+
+class ArchiveCache(object):
+  """
+  A directory of snapshots of parsed data files.
+
+  Snapshots are keyed by a hash of the data file content and by the
+  loading flags; a snapshot of another format (see `FORMAT_VERSION`) or
+  made by another version of the library is considered stale.  Stale or corrupted snapshots are removed and replaced.
+  A snapshot of a data file (loaded with given flags) is evicted as soon
+  as a snapshot of another content of the file is made.
+
+  >>> import shutil
+  >>> cacheDir = tempfile.mkdtemp()
+  >>> cache = ArchiveCache(cacheDir)
+  >>> dataFile = os.path.join(cacheDir, 'data.zip')
+  >>> with open(dataFile, 'wb') as fh:
+  ...   _ = fh.write(b'data')
+
+  >>> def parse():
+  ...   print('parsing')
+  ...   return {'parsed': True}
+  >>> cache.get(dataFile, ('getNp',), parse)
+  parsing
+  {'parsed': True}
+
+  >>> cache.get(dataFile, ('getNp',), parse)
+  {'parsed': True}
+
+  >>> cache.get(dataFile, ('getNp', 'getLog'), parse)
+  parsing
+  {'parsed': True}
+
+  >>> shutil.rmtree(cacheDir)
+  """
+  BLOCK_SIZE = 1 << 20
+
+  # to be increased whenever the layout of snapshots changes
+  FORMAT_VERSION = 1
+
+  def __init__(self, path):
+    """
+    :param path: path to the cache directory (created if necessary)
+    :type path: basestring
+    """
+    if not os.path.isdir(path):
+      os.makedirs(path)
+
+    self.__path = path
+
+  def get(self, fname, flags, parse):
+    """
+    :param fname: path to the data file (or directory)
+    :type fname: basestring
+
+    :param flags: loading flags the parsed data depend on
+    :type flags: tuple
+
+    :param parse: a function parsing the data file (called on cache miss)
+
+    :return: parsed data file
+    """
+    path = self.__snapshotPath(fname, flags)
+    try:
+      parsed = self.__load(path)
+
+    except (IOError, OSError):
+      parsed = self.__parse(path, parse)
+
+    except Exception: # corrupted or stale
+      self.__remove(path)
+      parsed = self.__parse(path, parse)
+
+    self.__updateReference(fname, flags, path)
+    return parsed
+
+  def __parse(self, path, parse):
+    parsed = parse()
+    self.__store(path, parsed)
+    return parsed
+
+  def __snapshotPath(self, fname, flags):
+    digest = self.__hashFile(fname)
+    digest.update(repr(flags).encode('utf-8'))
+    return os.path.join(self.__path, digest.hexdigest() + '.pickle')
+
+  def __updateReference(self, fname, flags, path):
+    """
+    Point the reference of the data file (loaded with the flags) to the
+    snapshot evicting the snapshot referenced previously.
+    """
+    digest = hashlib.sha1(os.path.abspath(fname).encode('utf-8'))
+    digest.update(repr(flags).encode('utf-8'))
+    reference = os.path.join(self.__path, digest.hexdigest() + '.ref')
+    snapshot = os.path.basename(path)
+    try:
+      with open(reference) as fh:
+        previous = fh.read()
+
+    except (IOError, OSError):
+      previous = None
+
+    if previous == snapshot:
+      return
+
+    if previous:
+      self.__remove(os.path.join(self.__path, os.path.basename(previous)))
+
+    self.__write(reference, lambda fh: fh.write(snapshot.encode('utf-8')))
+
+  def __hashFile(self, fname):
+    digest = hashlib.sha1()
+    if os.path.isdir(fname):
+      for directory, subdirectories, filenames in os.walk(fname):
+        subdirectories.sort()
+        for filename in sorted(filenames):
+          path = os.path.join(directory, filename)
+          digest.update(os.path.relpath(path, fname).encode('utf-8'))
+          self.__updateDigest(digest, path)
+
+    else:
+      self.__updateDigest(digest, fname)
+
+    return digest
+
+  def __updateDigest(self, digest, path):
+    with open(path, 'rb') as fh:
+      for block in iter(lambda: fh.read(self.BLOCK_SIZE), b''):
+        digest.update(block)
+
+  def __load(self, path):
+    with open(path, 'rb') as fh:
+      version, parsed = pickle.load(fh)
+
+    if version != self.__getVersion():
+      raise self.StaleSnapshotError(path)
+
+    return parsed
+
+  def __store(self, path, parsed):
+    self.__write(path, lambda fh: pickle.dump((self.__getVersion(), parsed),
+                                              fh, pickle.HIGHEST_PROTOCOL))
+
+  def __getVersion(self):
+    return self.FORMAT_VERSION, VERSION
+
+  def __write(self, path, dump):
+    fd, tmpPath = tempfile.mkstemp(dir=self.__path, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as fh:
+        dump(fh)
+
+      self.__remove(path) # os.rename() fails on Windows if path exists
+      os.rename(tmpPath, path)
+
+    except:
+      self.__remove(tmpPath)
+      raise
+
+  @staticmethod
+  def __remove(path):
+    try:
+      os.remove(path)
+
+    except OSError:
+      pass
+
+  class StaleSnapshotError(ValueError):
+    pass
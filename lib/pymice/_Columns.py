@@ -0,0 +1,633 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2012-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+"""
+Typed, column-oriented storage of IntelliCage tables.
+
+Every column of a table is kept as a NumPy array of a type declared by its
+column kind, so no Python object is created per cell until the rows are
+explicitly converted to lists (e.g. to build the nodes).
+"""
+
+import csv
+from datetime import date, timedelta
+from itertools import islice, chain
+
+try:
+  from itertools import izip, imap
+
+except ImportError:
+  izip = zip
+  imap = map
+
+import numpy as np
+
+# dependence tracking
+from . import _dependencies
+import types
+__dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().values()
+                                                      if isinstance(x, types.ModuleType)])
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def timeStringToMicroseconds(tStr):
+  """
+  Converts naive time string to microseconds since 1970-01-01 00:00.
+
+  >>> timeStringToMicroseconds('1970-01-02 00:00:01.5')
+  86401500000
+
+  >>> timeStringToMicroseconds('1970-01-01 01:01')
+  3660000000
+  """
+  day, time = tStr.split()
+  year, month, dayOfMonth = map(int, day.split('-'))
+  tokens = time.split(':')
+  days = date(year, month, dayOfMonth).toordinal() - EPOCH_ORDINAL
+  minutes = (days * 24 + int(tokens[0])) * 60 + int(tokens[1])
+  microseconds = int(round(float(tokens[2]) * 1000000)) if len(tokens) > 2 else 0
+  return minutes * 60000000 + microseconds
+
+
+def timedeltaToMicroseconds(delta):
+  """
+  >>> timedeltaToMicroseconds(timedelta(days=-1, microseconds=1))
+  -86399999999
+  """
+  return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _npTimestampsToMicroseconds(values):
+  """
+  Converts naive time strings to an int64 array of microseconds since
+  1970-01-01 00:00.
+
+  >>> _npTimestampsToMicroseconds(['1970-01-02 00:00:01.5', '1970-01-01 01:01']).tolist()
+  [86401500000, 3660000000]
+  """
+  try:
+    timepoints = np.array(values, dtype='datetime64[us]')
+
+  except ValueError: # not ISO 8601 strings
+    pass
+
+  else:
+    if not np.isnat(timepoints).any():
+      return timepoints.view(np.int64)
+
+  return np.fromiter((timeStringToMicroseconds(x) for x in values),
+                     np.int64, len(values))
+
+
+def timeListsToMicroseconds(timeLists):
+  """
+  Converts naive timepoints given as [year, month, day, hour, minute,
+  second, microsecond] lists to an int64 array of microseconds since
+  1970-01-01 00:00.
+
+  >>> timeListsToMicroseconds([[1970, 1, 2, 0, 0, 1, 500000],
+  ...                          [1970, 2, 1, 1, 1, 0, 0]]).tolist()
+  [86401500000, 2682060000000]
+  """
+  fields = np.fromiter(chain.from_iterable(timeLists), np.int64,
+                       7 * len(timeLists)).reshape(-1, 7)
+  months = (fields[:, 0] - 1970) * 12 + fields[:, 1] - 1
+  days = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) \
+         + fields[:, 2] - 1
+  seconds = ((days * 24 + fields[:, 3]) * 60 + fields[:, 4]) * 60 + fields[:, 5]
+  return seconds * 1000000 + fields[:, 6]
+
+
+try:
+  from pymice._cymice import timestampsToMicroseconds, tokenizeColumns
+
+except Exception:
+  timestampsToMicroseconds = _npTimestampsToMicroseconds
+  tokenizeColumns = None
+
+
+class ColumnKind(object):
+  """
+  A virtual class of column kinds - declarations how a column of strings
+  is converted into a typed array and back into a list of Python values.
+  """
+  dtype = object
+  typeCode = None
+
+  def fromStrings(self, values):
+    raise NotImplementedError
+
+  def fromTokens(self, array):
+    """
+    :param array: a column tokenized by the compiled extension
+    """
+    return array.astype(self.dtype, copy=False)
+
+  def forTable(self):
+    """
+    :return: the kind to be used by a column of a table being read
+             (a kind with no state is shared by all tables)
+    """
+    return self
+
+  def compact(self, array):
+    """
+    :return: the kind and the column to be pickled
+    """
+    return self, array
+
+  def toList(self, array):
+    return array.tolist()
+
+  def equals(self, array, value):
+    """
+    :return: which cells of the column are equal to the value
+    :rtype: numpy.ndarray of bool
+    """
+    return array == value
+
+  def __repr__(self):
+    return '%s()' % self.__class__.__name__
+
+
+class IntColumn(ColumnKind):
+  """
+  >>> kind = IntColumn(np.int8)
+  >>> array = kind.fromStrings(['1', '', '-1'])
+  >>> array.dtype == np.int8
+  True
+
+  >>> kind.toList(array)
+  [1, None, -1]
+  """
+  typeCode = 'i'
+
+  def __init__(self, dtype=np.int64):
+    self.dtype = np.dtype(dtype)
+    self.null = np.iinfo(self.dtype).min
+
+  def fromStrings(self, values):
+    null = self.null
+    return np.fromiter((int(x) if x else null for x in values),
+                       self.dtype, len(values))
+
+  def toList(self, array):
+    null = self.null
+    return [None if x == null else x for x in array.tolist()]
+
+  def __repr__(self):
+    return 'IntColumn(%s)' % self.dtype.name
+
+
+class FloatColumn(ColumnKind):
+  """
+  Decimal commas are accepted.
+
+  >>> kind = FloatColumn()
+  >>> kind.toList(kind.fromStrings(['1,5', '', '2.25']))
+  [1.5, None, 2.25]
+  """
+  dtype = np.dtype(np.float64)
+  typeCode = 'f'
+
+  def fromStrings(self, values):
+    nan = np.nan
+    return np.fromiter((float(x.replace(',', '.')) if x else nan for x in values),
+                       self.dtype, len(values))
+
+  def toList(self, array):
+    return [None if x != x else x for x in array.tolist()]
+
+
+class StringColumn(ColumnKind):
+  """
+  >>> kind = StringColumn()
+  >>> kind.toList(kind.fromStrings(['a', '', 'b']))
+  ['a', None, 'b']
+  """
+  typeCode = 's'
+
+  def fromStrings(self, values):
+    array = np.empty(len(values), dtype=object)
+    array[:] = [x if x else None for x in values]
+    return array
+
+
+class CategoryColumn(ColumnKind):
+  """
+  Strings of a few distinct values repeated many times (e.g. log notes).
+
+  Every distinct string is stored once, in the pool of the column kind,
+  and the column is an array of codes of the strings (0 for empty fields),
+  so equality filters compare integers.  Every table read gets a kind
+  (and a pool) of its own (see :py:meth:`forTable`), so pools are released
+  together with their tables.
+
+  >>> kind = CategoryColumn()
+  >>> codes = kind.fromStrings(['a', '', 'b', 'a'])
+  >>> codes.tolist()
+  [1, 0, 2, 1]
+
+  >>> values = kind.toList(codes)
+  >>> values
+  ['a', None, 'b', 'a']
+
+  >>> values[0] is values[3] is kind.intern(''.join(['a']))
+  True
+
+  >>> kind.equals(codes, 'a').tolist()
+  [True, False, False, True]
+
+  >>> kind.equals(codes, 'c').tolist()
+  [False, False, False, False]
+
+  >>> compacted, compactedCodes = kind.compact(codes[1:3])
+  >>> compacted.toList(compactedCodes)
+  [None, 'b']
+  """
+  dtype = np.dtype(np.int32)
+  typeCode = 's'
+
+  def __init__(self):
+    self.__values = [None]
+    self.__codes = {None: 0, '': 0}
+
+  def intern(self, value):
+    """
+    :return: the string of the pool equal to the value
+    """
+    return self.__values[self.__getCode(value)]
+
+  def __getCode(self, value):
+    try:
+      return self.__codes[value]
+
+    except KeyError:
+      code = self.__codes[value] = len(self.__values)
+      self.__values.append(value.decode('utf-8') if isinstance(value, bytes) else value)
+      return code
+
+  def fromStrings(self, values):
+    codes = self.__codes
+    try:
+      return np.fromiter(imap(codes.__getitem__, values),
+                         self.dtype, len(values))
+
+    except KeyError:
+      for value in values:
+        if value not in codes:
+          self.__getCode(value)
+
+      return np.fromiter(imap(codes.__getitem__, values),
+                         self.dtype, len(values))
+
+  def fromTokens(self, array):
+    return self.fromStrings(array)
+
+  def forTable(self):
+    return self.__class__()
+
+  def compact(self, array):
+    """
+    :return: a kind with only strings of the column in the pool and
+             the column recoded
+    """
+    codes, inverse = np.unique(array, return_inverse=True)
+    kind = self.__class__()
+    return kind, kind.fromStrings(self.toList(codes))[inverse]
+
+  def toList(self, array):
+    return list(imap(self.__values.__getitem__, array.tolist()))
+
+  def equals(self, array, value):
+    code = self.__codes.get(value)
+    if code is None:
+      return np.zeros(len(array), dtype=bool)
+
+    return array == code
+
+
+class TimeColumn(ColumnKind):
+  """
+  Naive timepoints in microseconds since 1970-01-01 00:00.
+
+  >>> kind = TimeColumn()
+  >>> kind.fromStrings(['1970-01-01 00:00:01.25']).tolist()
+  [1250000]
+  """
+  dtype = np.dtype(np.int64)
+  typeCode = 't'
+
+  def fromStrings(self, values):
+    return timestampsToMicroseconds(list(values))
+
+  def toList(self, array):
+    return array.astype('datetime64[us]').tolist()
+
+
+INT8 = IntColumn(np.int8)
+INT = IntColumn(np.int64)
+FLOAT = FloatColumn()
+STRING = StringColumn()
+CATEGORY = CategoryColumn()
+TIME = TimeColumn()
+
+
+class ColumnTable(dict):
+  """
+  A dict of typed columns of equal length.
+
+  >>> table = ColumnTable.fromRows(['Cage', 'Name', 'Ignored'],
+  ...                              [['1', 'a', 'x'], ['', 'b', 'y']],
+  ...                              {'Cage': INT8, 'Name': STRING})
+  >>> sorted(table)
+  ['Cage', 'Name']
+
+  >>> table.rowCount
+  2
+
+  >>> table.toPyColumns() == {'Cage': [1, None], 'Name': ['a', 'b']}
+  True
+
+  >>> table.select([1]).toPyColumns() == {'Cage': [None], 'Name': ['b']}
+  True
+  """
+  def __init__(self, rowCount=0):
+    dict.__init__(self)
+    self.__rowCount = rowCount
+    self.__kinds = {}
+    self.__timezones = {}
+
+  @classmethod
+  def fromRows(cls, labels, rows, columnKinds):
+    table = cls(len(rows))
+    columns = izip(*rows) if rows else [() for _ in labels]
+    for label, values in izip(labels, columns):
+      kind = columnKinds.get(label)
+      if kind is not None:
+        table.addColumn(label, kind, kind.fromStrings(values))
+
+    return table
+
+  @classmethod
+  def fromLines(cls, labels, lines, columnKinds):
+    """
+    Tokenizes tab-separated lines with the compiled extension.
+
+    :return: the table or None if the lines have to be parsed with
+             the csv module
+    :rtype: ColumnTable or None
+    """
+    kinds = [columnKinds.get(label) for label in labels]
+    columns = tokenizeColumns(lines,
+                              [kind.typeCode if kind is not None else None
+                               for kind in kinds],
+                              [getattr(kind, 'null', None) for kind in kinds])
+    if columns is None:
+      return None
+
+    table = cls(len(lines))
+    for label, kind, array in izip(labels, kinds, columns):
+      if kind is not None:
+        table.addColumn(label, kind, kind.fromTokens(array))
+
+    return table
+
+  @classmethod
+  def concatenate(cls, tables):
+    """
+    >>> kinds = {'Cage': INT8}
+    >>> table = ColumnTable.concatenate([ColumnTable.fromRows(['Cage'], [['1']], kinds),
+    ...                                  ColumnTable.fromRows(['Cage'], [], kinds),
+    ...                                  ColumnTable.fromRows(['Cage'], [['2']], kinds)])
+    >>> table.rowCount
+    2
+
+    >>> table.toPyColumns()
+    {'Cage': [1, 2]}
+    """
+    first = tables[0]
+    table = cls(sum(t.rowCount for t in tables))
+    for label, array in first.items():
+      table.addColumn(label, first.getKind(label),
+                      np.concatenate([t[label] for t in tables]))
+
+    return table
+
+  @property
+  def rowCount(self):
+    return self.__rowCount
+
+  def addColumn(self, label, kind, array):
+    assert len(array) == self.__rowCount
+    self[label] = array
+    self.__kinds[label] = kind
+
+  def getKind(self, label):
+    return self.__kinds[label]
+
+  def __reduce__(self):
+    """
+    Columns are pickled compacted (see :py:meth:`ColumnKind.compact`),
+    e.g. with only strings used by a category column.
+    """
+    kinds, columns = {}, {}
+    for label, array in self.items():
+      kinds[label], columns[label] = self.__kinds[label].compact(array)
+
+    return (self.__class__, (self.__rowCount,),
+            {'kinds': kinds, 'timezones': self.__timezones},
+            None, iter(columns.items()))
+
+  def __setstate__(self, state):
+    self.__kinds = state['kinds']
+    self.__timezones = state['timezones']
+
+  def equals(self, label, value):
+    """
+    >>> table = ColumnTable.fromRows(['Type'], [['a'], ['b'], ['a']],
+    ...                              {'Type': CategoryColumn()})
+    >>> table.equals('Type', 'a').tolist()
+    [True, False, True]
+
+    :return: which rows have the value in the column
+    :rtype: numpy.ndarray of bool
+    """
+    return self.__kinds[label].equals(self[label], value)
+
+  def setTimezones(self, label, timezones):
+    """
+    :param timezones: timezone of every timepoint of the column
+    :type timezones: [tzinfo, ...]
+    """
+    assert len(timezones) == self.__rowCount
+    distinct = []
+    codeById = {}
+    codes = np.empty(self.__rowCount, dtype=np.int32)
+    for i, tz in enumerate(timezones):
+      try:
+        codes[i] = codeById[id(tz)]
+
+      except KeyError:
+        codes[i] = codeById[id(tz)] = len(distinct)
+        distinct.append(tz)
+
+    self.__timezones[label] = (codes, distinct)
+
+  def setTimezone(self, label, timezone):
+    """
+    :param timezone: timezone of all timepoints of the column
+    :type timezone: tzinfo
+    """
+    self.__timezones[label] = (np.zeros(self.__rowCount, dtype=np.int32),
+                               [timezone])
+
+  def hasTimezones(self, label):
+    return label in self.__timezones
+
+  def getTimezones(self, label):
+    codes, distinct = self.__timezones[label]
+    return [distinct[c] for c in codes.tolist()]
+
+  def getUtcOffsets(self, label):
+    """
+    :return: UTC offsets (in microseconds) of timepoints or None if any of
+             their timezones has no fixed offset
+    :rtype: numpy.ndarray or None
+    """
+    codes, distinct = self.__timezones[label]
+    offsets = [tz.utcoffset(None) for tz in distinct]
+    if None in offsets:
+      return None
+
+    return np.array([timedeltaToMicroseconds(o) for o in offsets],
+                    dtype=np.int64)[codes]
+
+  def getUtcTimestamps(self, label):
+    """
+    :return: timepoints (with timezones set) in microseconds since
+             1970-01-01 00:00 UTC
+    :rtype: numpy.ndarray
+    """
+    offsets = self.getUtcOffsets(label)
+    if offsets is None:
+      offsets = np.array([timedeltaToMicroseconds(x.utcoffset())
+                          for x in self.getDatetimes(label)],
+                         dtype=np.int64)
+
+    return self[label] - offsets
+
+  def getDatetimes(self, label):
+    naive = TIME.toList(self[label])
+    codes, distinct = self.__timezones[label]
+    if len(distinct) == 1:
+      tz = distinct[0]
+      return [x.replace(tzinfo=tz) for x in naive]
+
+    return [x.replace(tzinfo=distinct[c]) for x, c in izip(naive, codes.tolist())]
+
+  def toPyColumns(self):
+    """
+    :return: columns converted to lists of Python values (aware datetimes
+             for timepoints with timezones set)
+    :rtype: {label: list, ...}
+    """
+    return dict((label, self.getDatetimes(label)
+                        if label in self.__timezones else
+                        self.__kinds[label].toList(array))
+                for label, array in self.items())
+
+  def select(self, indexer):
+    """
+    :param indexer: boolean mask or indices of selected rows
+    :return: a table of selected rows
+    :rtype: ColumnTable
+    """
+    indices = np.arange(self.__rowCount)[indexer]
+    table = self.__class__(len(indices))
+    for label, array in self.items():
+      table.addColumn(label, self.__kinds[label], array[indices])
+
+    for label, (codes, distinct) in self.__timezones.items():
+      table.__timezones[label] = (codes[indices], distinct)
+
+    return table
+
+
+def readColumnTable(fh, columnKinds, delimiter='\t', chunkSize=None):
+  """
+  Reads a tab-separated table; only columns of declared kinds are stored.
+
+  :param columnKinds: kinds of the columns (see
+                      :py:meth:`ColumnKind.forTable`)
+  :type columnKinds: {label: ColumnKind, ...}
+
+  :param chunkSize: number of rows converted at once (all if None); only
+                    one chunk of rows is kept in memory as strings
+  :type chunkSize: int or None
+
+  :return: the table or None if file is empty
+  :rtype: ColumnTable or None
+  """
+  if chunkSize is not None and chunkSize < 1:
+    raise ValueError('chunkSize must be positive')
+
+  columnKinds = dict((label, kind.forTable())
+                     for label, kind in columnKinds.items())
+  reader = csv.reader(fh, delimiter=delimiter)
+  try:
+    labels = next(reader)
+
+  except StopIteration:
+    return None
+
+  chunks = []
+  if delimiter == '\t' and tokenizeColumns is not None:
+    while True:
+      lines = list(islice(fh, chunkSize))
+      table = ColumnTable.fromLines(labels, lines, columnKinds)
+      if table is None:
+        reader = csv.reader(chain(lines, fh), delimiter=delimiter)
+        break
+
+      chunks.append(table)
+      if chunkSize is None or len(lines) < chunkSize:
+        return _joinChunks(chunks)
+
+  if chunkSize is None:
+    chunks.append(ColumnTable.fromRows(labels, list(reader), columnKinds))
+    return _joinChunks(chunks)
+
+  while True:
+    rows = list(islice(reader, chunkSize))
+    chunks.append(ColumnTable.fromRows(labels, rows, columnKinds))
+    if len(rows) < chunkSize:
+      return _joinChunks(chunks)
+
+
+def _joinChunks(chunks):
+  return chunks[0] if len(chunks) == 1 else ColumnTable.concatenate(chunks)
@@ -34,6 +34,7 @@ except ImportError:
 
 import numpy as np
 import heapq
+import pytz
 
 # dependence tracking
 from . import _dependencies
@@ -42,9 +43,42 @@ __dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().value
                                                       if isinstance(x, types.ModuleType)])
 
 
+EPOCH = datetime(1970, 1, 1)
+
+
 def inferTimezones(timepoints, sessionStart, sessionEnd=None):
   return TimezonesInferrer(sessionStart, sessionEnd).infer(timepoints)
 
+def datetimeToMicroseconds(dt):
+  """
+  Converts local time of a datetime to microseconds since 1970-01-01 00:00.
+
+  >>> datetimeToMicroseconds(datetime(1970, 1, 2, 0, 0, 1, 5, tzinfo=pytz.utc))
+  86401000005
+  """
+  delta = dt.replace(tzinfo=None) - EPOCH
+  return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+def getPreservedTimezone(sessions):
+  """
+  :param sessions: sessions the timepoints were registered in
+  :type sessions: [:py:class:`Session`, ...] or None (UTC assumed)
+
+  :return: timezone of all timepoints registered in the sessions or None
+           if the timezone might have been changed
+  :rtype: tzinfo or None
+  """
+  if not sessions:
+    return pytz.utc
+
+  timezone = sessions[0].Start.tzinfo
+  for session in sessions:
+    if session.Start.tzinfo != timezone \
+       or not TimezonesInferrer(session.Start, session.End).isTimePreserved():
+      return None
+
+  return timezone
+
 class TimezonesInferrer(object):
   class AmbigousTimezoneChangeError(ValueError):
     pass
@@ -80,12 +114,23 @@ class TimezonesInferrer(object):
                                       self.TooManyIntervalsBigEnoughForTimeAdvance)
 
   def infer(self, timepoints):
+    return self.__infer(timepoints, self.makeIntervals)
+
+  def inferFromMicroseconds(self, timepoints):
+    """
+    :param timepoints: ordered local timepoints (in microseconds since
+                       1970-01-01 00:00)
+    :type timepoints: numpy.ndarray
+    """
+    return self.__infer(timepoints, self.makeIntervalsFromMicroseconds)
+
+  def __infer(self, timepoints, makeIntervals):
     self.timepointsNumber = len(timepoints)
     if self.isTimePreserved():
       return [self.start.tzinfo] * self.timepointsNumber
 
     self.timeChange = self.end.utcoffset() - self.start.utcoffset()
-    self.makeIntervals(timepoints)
+    makeIntervals(timepoints)
     if self.isTimeAdvanced():
       return self.inferWhenTimeAdvances()
 
@@ -124,6 +169,12 @@ class TimezonesInferrer(object):
     self.intervals = np.array([b - a for (a, b) in
                                izip(dtTimepoints, islice(dtTimepoints, 1, None))])
 
+  def makeIntervalsFromMicroseconds(self, timepoints):
+    bounded = np.concatenate([[datetimeToMicroseconds(self.start)],
+                              timepoints,
+                              [datetimeToMicroseconds(self.end)]])
+    self.intervals = np.diff(bounded).astype('timedelta64[us]')
+
   def getBoundedTimepoints(self, timepoints):
     return [self.start.replace(tzinfo=None)] +\
            [datetime(*t) for t in timepoints] +\
@@ -202,3 +253,160 @@ class LatticeOrderer(object):
   def makeOrderedSequence(sequence):
     for first, second in izip(sequence, islice(sequence, 1, None)):
       first.markLessThan(second)
+
+
+class Timeline(object):
+  """
+  Naive timepoints (in microseconds since 1970-01-01 00:00) of many columns
+  and the partial order known from the order of records.
+
+  >>> timeline = Timeline()
+  >>> starts = timeline.addTimepoints([30, 10])
+  >>> ends = timeline.addTimepoints([40, 20])
+  >>> timeline.coupleTuples(starts, ends)
+  >>> timeline.addOrderedSequence(starts)
+  >>> timeline.getTimepoints()[timeline.pullOrdered()].tolist()
+  [30, 10, 20, 40]
+  """
+  def __init__(self):
+    self.__timepoints = []
+    self.__size = 0
+    self.__sequences = []
+    self.__tuples = []
+
+  def __len__(self):
+    return self.__size
+
+  def addTimepoints(self, timepoints):
+    """
+    :return: indices of added timepoints
+    :rtype: numpy.ndarray
+    """
+    start = self.__size
+    self.__timepoints.append(np.asarray(timepoints, dtype=np.int64))
+    self.__size += len(timepoints)
+    return np.arange(start, self.__size)
+
+  def addOrderedSequence(self, indices):
+    self.__sequences.append(np.asarray(indices))
+
+  def coupleTuples(self, *indexSequences):
+    self.__tuples.append(indexSequences)
+
+  def getTimepoints(self):
+    if self.__timepoints:
+      return np.concatenate(self.__timepoints)
+
+    return np.array([], dtype=np.int64)
+
+  def pullOrdered(self):
+    """
+    The order is the one LatticeOrderer would yield (the least of the
+    timepoints not preceded by any other one first), but only timepoints
+    preceded by a later one (e.g. after the clock was moved back) are
+    ordered with the lattice.
+
+    Every timepoint is given a key - the latest of the timepoint and
+    timepoints preceding it.  The lattice yields the timepoints in the
+    order of their keys, so only timepoints sharing a key with a preceded
+    timepoint have to be ordered with the lattice.
+
+    :return: indices of timepoints in the order of their registration
+    :rtype: numpy.ndarray
+    """
+    timepoints = self.getTimepoints()
+    keys = self.__propagateKeys(timepoints.copy())
+    order = np.argsort(keys, kind='mergesort')
+    preceded = keys != timepoints
+    if preceded.any():
+      inLattice = np.in1d(keys, np.unique(keys[preceded]))
+      order[inLattice[order]] = self.__pullLatticeOrdered(np.flatnonzero(inLattice),
+                                                          timepoints, keys)
+
+    return order
+
+  def __iterEdges(self):
+    for sequence in self.__sequences:
+      yield sequence[:-1], sequence[1:]
+
+    for edge in self.__iterCouplings():
+      yield edge
+
+  def __iterCouplings(self):
+    for sequences in self.__tuples:
+      for lesser, greater in izip(sequences, sequences[1:]):
+        yield lesser, greater
+
+  def __propagateKeys(self, keys):
+    changed = True
+    while changed:
+      for sequence in self.__sequences:
+        keys[sequence] = np.maximum.accumulate(keys[sequence])
+
+      changed = False
+      for lesser, greater in self.__iterCouplings():
+        lagging = keys[greater] < keys[lesser]
+        if lagging.any():
+          keys[greater[lagging]] = keys[lesser[lagging]]
+          changed = True
+
+    return keys
+
+  def __pullLatticeOrdered(self, indices, timepoints, keys):
+    selected = np.zeros(self.__size, dtype=bool)
+    selected[indices] = True
+    nodes = dict((i, LatticeOrderer.Node([k, t]))
+                 for i, k, t in izip(indices.tolist(),
+                                     keys[indices].tolist(),
+                                     timepoints[indices].tolist()))
+    for lesser, greater in self.__iterEdges():
+      both = selected[lesser] & selected[greater]
+      for i, j in izip(lesser[both].tolist(), greater[both].tolist()):
+        nodes[i].markLessThan(nodes[j])
+
+    orderer = LatticeOrderer()
+    orderer.addNodes(*nodes.values())
+    indexById = dict((id(node), i) for i, node in nodes.items())
+    return np.array([indexById[id(node)] for node in orderer],
+                    dtype=np.intp)
+
+  def inferTimezones(self, sessions):
+    """
+    :param sessions: sessions (ordered by start) the timepoints were
+                     registered in
+    :type sessions: [:py:class:`Session`, ...] or None (UTC assumed)
+
+    :return: timezone of every timepoint
+    :rtype: numpy.ndarray of tzinfo objects
+    """
+    timezones = np.empty(self.__size, dtype=object)
+    timezone = getPreservedTimezone(sessions)
+    if timezone is not None:
+      timezones.fill(timezone)
+      return timezones
+
+    ordered = self.pullOrdered()
+    sortedTimepoints = self.getTimepoints()[ordered]
+    bounds = self.__findSessionBounds(sortedTimepoints, sessions)
+    for session, start, stop in izip(sessions, bounds, bounds[1:]):
+      inferrer = TimezonesInferrer(session.Start, session.End)
+      timezones[ordered[start:stop]] = inferrer.inferFromMicroseconds(sortedTimepoints[start:stop])
+
+    return timezones
+
+  @staticmethod
+  def __findSessionBounds(sortedTimepoints, sessions):
+    """
+    Timepoints registered before the clock was moved back are still later
+    than those registered after, so the session starts are searched among
+    the latest timepoints registered so far.
+
+    :param sessions: sessions ordered by start
+    :return: indices of the first timepoint of every session and the
+             number of timepoints
+    :rtype: [int, ...]
+    """
+    latest = np.maximum.accumulate(sortedTimepoints)
+    starts = [datetimeToMicroseconds(session.Start) for session in sessions[1:]]
+    return [0] + np.searchsorted(latest, starts, side='left').tolist() \
+           + [len(sortedTimepoints)]
@@ -33,6 +33,7 @@ if sys.version_info >= (3, 0):
 import os
 import csv
 import warnings
+import multiprocessing
 
 try:
   import cStringIO as io
@@ -47,6 +48,7 @@ import numpy as np
 from xml.dom import minidom
 
 from operator import methodcaller, attrgetter, itemgetter
+from collections import Container
 try:
   from itertools import izip, repeat, count
 
@@ -61,14 +63,22 @@ from .ICNodes import (Animal, Visit, Nosepoke, LogEntry,
                       EnvironmentalConditions, AirHardwareEvent,
                       DoorHardwareEvent, LedHardwareEvent,
                       UnknownHardwareEvent, Session)
+from ._ICNodesBase import LazyNosepokes, FieldNotLoadedError, projectNodeClass
 
 from ._Tools import (timeToList, ArchiveZipFile, DirectoryZipFile, warn, groupBy,
-                     isString, mapAsList)
-from ._FixTimezones import inferTimezones, LatticeOrderer
+                     isString, mapAsList, EPOCH_UTC)
+from ._FixTimezones import Timeline, getPreservedTimezone
 from ._Analysis import Aggregator
+from ._Columns import (readColumnTable, timeListsToMicroseconds,
+                       timedeltaToMicroseconds,
+                       CategoryColumn, INT8, INT, FLOAT, STRING, CATEGORY, TIME)
+from ._Cache import ArchiveCache
+from ._Overlaps import OverlapIndex, FingerprintSet
+from ._Ens import Ens
 
 # dependence tracking
-from . import _dependencies, Data as _Data, ICNodes, _Tools, _FixTimezones, _Analysis
+from . import (_dependencies, Data as _Data, ICNodes, _ICNodesBase, _Tools, _FixTimezones,
+               _Analysis, _Columns, _Cache, _Overlaps, _Ens)
 import dateutil
 import types
 __dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().values()
@@ -79,7 +89,7 @@ class PmCImportWarning(ImportWarning):
   pass
 
 try:
-  from pymice._cpymice import emptyStringToNone
+  from pymice._cymice import emptyStringToNone
 
 except Exception as e:
   warnings.warn('%s\t%s' % (type(e), e),
@@ -99,14 +109,62 @@ except Exception as e:
 convertFloat = methodcaller('replace', ',', '.')
 
 
-def fixSessions(sortedTimepoints, sessions=[]):
-  assert len(sessions) == 1
-  session = sessions[0]
-  sortedTimezones = inferTimezones(sortedTimepoints, session.Start, session.End)
-  for timepoint, timezone in zip(sortedTimepoints, sortedTimezones):
+def fixSessions(timepoints, timeline, sessions=None):
+  for timepoint, timezone in izip(timepoints,
+                                  timeline.inferTimezones(sessions).tolist()):
     timepoint.append(timezone)
 
 
+class ArchiveColumns(object):
+  """
+  Tables of a data file parsed into typed columns (with timezones of the
+  timepoints already inferred).  Unlike the loaded data it is picklable,
+  so the parsing may be done in another process.
+  """
+  def __init__(self, source, ZipLoader, animals, sessions, visits, nosepokes,
+               tables):
+    self.source = source
+    self.ZipLoader = ZipLoader
+    self.animals = animals
+    self.sessions = sessions
+    self.visits = visits
+    self.nosepokes = nosepokes
+    self.tables = tables
+
+
+def _getExtremeTimepoint(table, label, argext):
+  """
+  :param argext: np.argmin for the earliest or np.argmax for the latest
+  :return: the earliest or the latest timepoint of the column (or None if
+           the table is empty)
+  :rtype: datetime.datetime or None
+  """
+  if table.rowCount == 0:
+    return None
+
+  return table.select([argext(table.getUtcTimestamps(label))]).getDatetimes(label)[0]
+
+
+def _mapColumn(column, mapping):
+  """
+  Map values of the column converting only its distinct values.
+
+  >>> _mapColumn(np.array(['b', 'a', 'b']), {'a': 'A', 'b': 'B'}).tolist()
+  ['B', 'A', 'B']
+
+  :rtype: numpy.ndarray of objects
+  """
+  distinct, codes = np.unique(column, return_inverse=True)
+  mapped = np.empty(len(distinct), dtype=object)
+  mapped[:] = [mapping[value] for value in distinct.tolist()]
+  return mapped[codes]
+
+
+def _readArchiveColumns(args):
+  fname, flags = args
+  return Loader._readArchiveColumns(fname, **flags)
+
+
 class Loader(Data):
   _legacy = {'Animals': {'Name': 'AnimalName',
                          'Tag': 'AnimalTag',
@@ -165,11 +223,95 @@ class Loader(Data):
                                     },
                 }
 
+  # labels of strings interned (in a pool of the table) by the row loader
+  _internZip = {'Visits': ['ModuleName', 'Module'],
+                'Log': ['LogCategory', 'Category', 'LogType', 'Type',
+                        'LogNotes', 'Notes'],
+                'HardwareEvents': ['HardwareType', 'Type'],
+               }
+
+  _columnKinds = {'Animals': {'AnimalName': STRING,
+                              'Name': STRING,
+                              'AnimalTag': STRING,
+                              'Tag': STRING,
+                              'Sex': STRING,
+                              'AnimalNotes': STRING,
+                              'Notes': STRING,
+                              'GroupName': STRING,
+                              'Group': STRING,
+                              },
+                  'Visits': {'VisitID': INT,
+                             'ID': INT,
+                             'AnimalTag': STRING,
+                             'Animal': STRING,
+                             'Start': TIME,
+                             'End': TIME,
+                             'ModuleName': CATEGORY,
+                             'Cage': INT8,
+                             'Corner': INT8,
+                             'CornerCondition': INT,
+                             'PlaceError': INT,
+                             'AntennaNumber': INT,
+                             'AntennaDuration': FLOAT,
+                             'PresenceNumber': INT,
+                             'PresenceDuration': FLOAT,
+                             'VisitSolution': INT,
+                             },
+                  'Nosepokes': {'VisitID': INT,
+                                'Start': TIME,
+                                'End': TIME,
+                                'Side': INT8,
+                                'SideCondition': INT,
+                                'SideError': INT,
+                                'TimeError': INT,
+                                'ConditionError': INT,
+                                'LickNumber': INT,
+                                'LicksNumber': INT,
+                                'LickContactTime': FLOAT,
+                                'LickDuration': FLOAT,
+                                'LicksDuration': FLOAT,
+                                'AirState': INT,
+                                'DoorState': INT,
+                                'LED1State': INT,
+                                'LED2State': INT,
+                                'LED3State': INT,
+                                },
+                  'Log': {'DateTime': TIME,
+                          'Time': TIME,
+                          'LogCategory': CATEGORY,
+                          'Category': CATEGORY,
+                          'LogType': CATEGORY,
+                          'Type': CATEGORY,
+                          'Cage': INT8,
+                          'Corner': INT8,
+                          'Side': INT8,
+                          'LogNotes': CATEGORY,
+                          'Notes': CATEGORY,
+                          },
+                  'Environment': {'DateTime': TIME,
+                                  'Time': TIME,
+                                  'Temperature': FLOAT,
+                                  'Illumination': INT,
+                                  'Cage': INT8,
+                                  },
+                  'HardwareEvents': {'DateTime': TIME,
+                                     'Time': TIME,
+                                     'HardwareType': CATEGORY,
+                                     'Type': CATEGORY,
+                                     'Cage': INT8,
+                                     'Corner': INT8,
+                                     'Side': INT8,
+                                     'State': INT,
+                                     },
+                 }
+
   def __init__(self, fname, getNp=True, getLog=False, getEnv=False, getHw=False,
-               verbose=False, **kwargs):
+               verbose=False, columnar=False, chunkSize=None, cacheDir=None,
+               lazy=False, start=None, end=None, mice=None, fields=None,
+               **kwargs):
     """
-    :param fname: a path to the data file.
-    :type fname: basestring
+    :param fname: a path to the data file (or the data file already parsed).
+    :type fname: basestring or :py:class:`ArchiveColumns`
 
     :param getNp: whether to load nosepoke data.
     :type getNp: bool
@@ -185,6 +327,53 @@ class Loader(Data):
 
     :param verbose: whether to output verbose messages
     :type verbose: bool
+
+    :param columnar: whether to parse the tables into typed NumPy columns
+                     and create the objects (visits, nosepokes, log entries
+                     etc.) not until they are requested.
+    :type columnar: bool
+
+    :param chunkSize: number of rows of a table to be read and converted
+                      at once (implies the columnar mode); if not given,
+                      whole tables are read at once.
+    :type chunkSize: int or None
+
+    :param cacheDir: a directory where snapshots of parsed data files are
+                     stored, so a data file loaded again is not parsed
+                     (implies the columnar mode)
+    :type cacheDir: basestring or None
+
+    :param lazy: whether to postpone loading of log, environmental and
+                 hardware data until they are requested for the first time
+                 (getLog, getEnv and getHw are ignored then; implies the
+                 columnar mode); timezones of the postponed data are inferred
+                 together with the data already loaded; until the log is
+                 loaded, :py:meth:`getStart` and :py:meth:`getEnd` return
+                 the bounds of visits
+    :type lazy: bool
+
+    :param start: a lower bound of the visit Start and of the log entry,
+                  environmental sample and hardware event DateTime
+                  attributes; other rows are dropped before any object is
+                  created (implies the columnar mode), but timezones are
+                  inferred from all of them
+    :type start: datetime.datetime or None
+
+    :param end: an upper bound of the attributes (see start)
+    :type end: datetime.datetime or None
+
+    :param mice: mouse (or mice) which visits are to be loaded (implies the
+                 columnar mode)
+    :type mice: str or unicode or :py:class:`Animal` or collection of them
+                or None
+
+    :param fields: visit and nosepoke attributes to be loaded (implies the
+                   columnar mode); columns of other attributes are skipped
+                   while parsing and an access to the attributes raises
+                   :py:class:`Loader.FieldNotLoadedError` (Start, End, Cage,
+                   Corner, Animal and Side are always loaded); if not given,
+                   all attributes are loaded
+    :type fields: collection of str or None
     """
     for key, value in kwargs.items():
       warn.warn("Unknown argument %s given for Loader constructor." % key, stacklevel=2)
@@ -192,19 +381,115 @@ class Loader(Data):
     Data.__init__(self, getNp=getNp, getLog=getLog, getEnv=getEnv, getHw=getHw)
     self._setCageManager(ICCageManager())
     self.__verbose = verbose
-
-    self._fnames = (fname,)
+    self.__columnar = columnar or chunkSize is not None or cacheDir is not None \
+                      or lazy or start is not None or end is not None \
+                      or mice is not None or fields is not None
+    self.__start = self.__toUtcMicroseconds(start)
+    self.__end = self.__toUtcMicroseconds(end)
+    if mice is not None and (isString(mice) or not isinstance(mice, Container)):
+      mice = [mice]
+
+    self.__mice = set(map(unicode, mice)) if mice is not None else None
+    self.__fields = _ZipLoaderBase.checkFields(fields)
+    self.__lazy = lazy
+    self.__pendingTables = []
+    self.__chunkSize = chunkSize
+    self.__cache = ArchiveCache(cacheDir) if cacheDir is not None else None
+    self.__columns = None
+
+    self._fnames = (fname.source if isinstance(fname, ArchiveColumns) else fname,)
 
     self._appendData(fname)
 
-    self._setIcSessionAttributes()
+    if 'Log' not in self.__pendingTables:
+      self._setIcSessionAttributes()
+
     self.freeze()
 
+  @staticmethod
+  def __toUtcMicroseconds(dt):
+    if dt is not None:
+      return timedeltaToMicroseconds(dt - EPOCH_UTC)
+
+  FieldNotLoadedError = FieldNotLoadedError
+
+  class InconsistentTimezonesError(ValueError):
+    """
+    Timezones inferred with lazily loaded data differ from those of data
+    already loaded.
+    """
+    pass
+
+  @property
+  def icSessionStart(self):
+    self.__loadPendingTable('Log')
+    return self.__icSessionStart
+
+  @icSessionStart.setter
+  def icSessionStart(self, value):
+    self.__icSessionStart = value
+
+  @property
+  def icSessionEnd(self):
+    self.__loadPendingTable('Log')
+    return self.__icSessionEnd
+
+  @icSessionEnd.setter
+  def icSessionEnd(self, value):
+    self.__icSessionEnd = value
+
+  def getLog(self, *args, **kwargs):
+    self.__loadPendingTable('Log')
+    return Data.getLog(self, *args, **kwargs)
+
+  getLog.__doc__ = Data.getLog.__doc__
+
+  def getEnvironment(self, *args, **kwargs):
+    self.__loadPendingTable('Environment')
+    return Data.getEnvironment(self, *args, **kwargs)
+
+  getEnvironment.__doc__ = Data.getEnvironment.__doc__
+
+  def getHardwareEvents(self, *args, **kwargs):
+    self.__loadPendingTable('HardwareEvents')
+    return Data.getHardwareEvents(self, *args, **kwargs)
+
+  getHardwareEvents.__doc__ = Data.getHardwareEvents.__doc__
+
+  def __loadPendingTable(self, path):
+    if path not in self.__pendingTables:
+      return
+
+    self.__pendingTables.remove(path)
+    archive = self.__archive
+    try:
+      archive.tables[path] = self._fromZipColumns(self._openArchive(archive.source),
+                                                  path, self.__chunkSize)
+
+    except KeyError:
+      if path == 'Log':
+        raise
+
+      return
+
+    self.__setColumnTimezones(archive.sessions, archive.ZipLoader,
+                              archive.visits, archive.nosepokes, archive.tables)
+    table = self.__selectTimeWindow(archive.tables[path],
+                                    archive.ZipLoader.DATETIME_KEY)
+    self.__columns.tables[path] = table
+    self.__insertTableNodes(self, self.__nodesLoader, {path: table})
+    if path == 'Log':
+      self._setIcSessionAttributes()
+
 
   def _appendData(self, fname):
     """
     Process one input file and append data to self.data
     """
+    if isinstance(fname, ArchiveColumns):
+      self._buildCache(self._insertArchiveColumns(fname))
+      return
+
     if self.__verbose:
       if isinstance(fname, str): #XXX: Python3
         print('loading data from {}'.format(fname))
@@ -212,140 +497,484 @@ class Loader(Data):
       else:
         print('loading data from {}'.format(fname.encode('utf-8')))
 
+    cagesAndAnimals = None
+    zf = self._openArchive(fname)
+    if zf is not None:
+      if self.__columnar:
+        cagesAndAnimals = self._loadZipColumns(zf, source=fname)
+
+      else:
+        self._loadZip(zf, source=fname)
+
+    self._buildCache(cagesAndAnimals)
+
+  @staticmethod
+  def _openArchive(fname):
     if fname.endswith('.zip') or os.path.isdir(fname):
       if isString(fname) and os.path.isdir(fname):
-        zf = DirectoryZipFile(fname)
+        return DirectoryZipFile(fname)
 
-      else:
-        zf = ArchiveZipFile(fname)
+      return ArchiveZipFile(fname)
 
-      self._loadZip(zf, source=fname)
+  @classmethod
+  def _readArchiveColumns(cls, fname, getNp=True, getLog=False, getEnv=False,
+                          getHw=False, chunkSize=None, cacheDir=None,
+                          fields=None):
+    """
+    :return: parsed archive or None if fname is not an archive
+    :rtype: :py:class:`ArchiveColumns` or None
+    """
+    zf = cls._openArchive(fname)
+    if zf is not None:
+      return cls._readZipColumns(zf, fname, getNp=getNp, getLog=getLog,
+                                 getEnv=getEnv, getHw=getHw,
+                                 chunkSize=chunkSize,
+                                 cache=ArchiveCache(cacheDir) if cacheDir is not None else None,
+                                 fields=fields)
+
+  def _loadZipColumns(self, zf, source=None):
+    """
+    :return: (cage, animal name) pairs of loaded visits
+    """
+    return self._insertArchiveColumns(
+                  self._readZipColumns(zf, source,
+                                       getNp=self._getNp,
+                                       getLog=self._getLog and not self.__lazy,
+                                       getEnv=self._getEnv and not self.__lazy,
+                                       getHw=self._getHw and not self.__lazy,
+                                       chunkSize=self.__chunkSize,
+                                       cache=self.__cache,
+                                       fields=self.__fields))
+
+  @classmethod
+  def _readZipColumns(cls, zf, source, getNp, getLog, getEnv, getHw,
+                      chunkSize, cache=None, fields=None):
+    if cache is not None:
+      flags = (getNp, getLog, getEnv, getHw)
+      if fields is not None:
+        flags += (tuple(sorted(fields)),)
+
+      archive = cache.get(source, flags,
+                          lambda: cls._readZipColumns(zf, source, getNp, getLog,
+                                                      getEnv, getHw, chunkSize,
+                                                      fields=fields))
+      archive.source = source
+      return archive
+
+    ZipLoader = cls._getZipLoader(zf)
+    animals = cls._fromZipColumns(zf, 'Animals', chunkSize).toPyColumns()
+    sessions = cls._extractSessions(zf)
+
+    visitLabels, nosepokeLabels = ZipLoader.getSkippedLabels(fields)
+    visits = cls._fromZipColumns(zf, 'Visits', chunkSize, visitLabels)
+    nosepokes = None
+    if getNp:
+      nosepokes = cls._fromZipColumns(zf, 'Nosepokes', chunkSize, nosepokeLabels)
+      nosepokes = cls.__selectMatchedNosepokes(nosepokes,
+                                               visits[ZipLoader.VISIT_ID_FIELD])
+
+    tables = {}
+    for path, flag in [('Log', getLog),
+                       ('Environment', getEnv),
+                       ('HardwareEvents', getHw)]:
+      if flag:
+        try:
+          tables[path] = cls._fromZipColumns(zf, path, chunkSize)
+
+        except KeyError:
+          if path == 'Log':
+            raise
+
+    cls.__setColumnTimezones(sessions, ZipLoader, visits, nosepokes, tables)
+    return ArchiveColumns(source, ZipLoader, animals, sessions, visits,
+                          nosepokes, tables)
+
+  def _insertArchiveColumns(self, archive):
+    """
+    :return: (cage, animal name) pairs of loaded visits
+    """
+    ZipLoader = archive.ZipLoader
+    self._registerAnimals(archive.animals, ZipLoader)
+    tagToAnimal = self._makeTagToAnimalDict()
+    loader = ZipLoader(self._sourceManager[archive.source], self._cageManager,
+                       tagToAnimal,
+                       fields=self.__fields)
+
+    visits, nosepokes = self.__selectVisits(archive, tagToAnimal)
+    self.__insertVisitNodes(self, loader, visits, nosepokes)
+    tables = {}
+    for path in ['Log', 'Environment', 'HardwareEvents']:
+      if path in archive.tables:
+        tables[path] = self.__selectTimeWindow(archive.tables[path],
+                                               ZipLoader.DATETIME_KEY)
+
+      elif self.__lazy:
+        self.__pendingTables.append(path)
+
+    self.__insertTableNodes(self, loader, tables)
+
+    if self.__lazy:
+      self.__archive = archive
+      self.__nodesLoader = loader
+
+    names = dict((tag, animal.Name) for tag, animal in tagToAnimal.items())
+    cagesAndAnimals = set(izip(visits['Cage'].tolist(),
+                               map(names.__getitem__, visits[ZipLoader.VISIT_TAG_FIELD])))
+    self.__columns = ArchiveColumns(archive.source, ZipLoader, archive.animals,
+                                    archive.sessions, visits, nosepokes, tables)
+    self.__cagesAndAnimals = cagesAndAnimals
+    return cagesAndAnimals
+
+  @staticmethod
+  def __insertVisitNodes(data, loader, visits, nosepokes):
+    if nosepokes is not None:
+      data._insertLazyVisits(lambda: loader.loadVisitsWithNosepokeTable(visits.toPyColumns(),
+                                                                        nosepokes))
+
+    else:
+      data._insertLazyVisits(lambda: loader.loadVisits(visits.toPyColumns()))
+
+  @classmethod
+  def __insertTableNodes(cls, data, loader, tables):
+    for path in ['Log', 'Environment', 'HardwareEvents']:
+      if path in tables:
+        insert, load = cls.__getTableInserter(data, path, loader)
+        insert(cls.__makeNodesFactory(load, tables[path]))
+
+  def _getColumns(self, paths):
+    """
+    :param paths: tables other than visits to be included
+    :type paths: ['Log', 'Environment', 'HardwareEvents'] or their subset
+
+    :return: tables of loaded rows and (cage, animal name) pairs of the
+             visits or None if data were not loaded in the columnar mode
+    :rtype: (:py:class:`ArchiveColumns`, set) or None
+    """
+    if self.__columns is None:
+      return None
+
+    for path in paths:
+      self.__loadPendingTable(path)
+
+    columns = self.__columns
+    tables = dict((path, columns.tables[path]) for path in paths
+                  if path in columns.tables)
+    return ArchiveColumns(columns.source, columns.ZipLoader, columns.animals,
+                          columns.sessions, columns.visits, columns.nosepokes,
+                          tables), self.__cagesAndAnimals
+
+  @classmethod
+  def _selectColumnsRows(cls, columns, selected):
+    """
+    Select rows of tables (preserving their line numbers).  Nosepokes of
+    visits not selected are dropped.
+
+    :param selected: masks of rows to be selected (tables not given are
+                     selected as a whole)
+    :type selected: {path: numpy.ndarray, ...}
+
+    :rtype: :py:class:`ArchiveColumns`
+    """
+    visits, nosepokes = columns.visits, columns.nosepokes
+    if 'Visits' in selected:
+      visits = cls.__selectRows(visits, selected['Visits'])
+      if nosepokes is not None:
+        nosepokes = cls.__selectRows(nosepokes,
+                                     np.in1d(nosepokes['VisitID'],
+                                             visits[columns.ZipLoader.VISIT_ID_FIELD]))
+
+    tables = dict((path, cls.__selectRows(table, selected[path])
+                         if path in selected else table)
+                  for path, table in columns.tables.items())
+    return ArchiveColumns(columns.source, columns.ZipLoader, columns.animals,
+                          columns.sessions, visits, nosepokes, tables)
+
+  def _insertColumnsInto(self, data, columns):
+    """
+    Insert the loaded data into another data object (e.g. a merger) without
+    creating (nor copying) nodes of the loader.  The nodes are created from
+    the columns - with source and cage managers and animals of the object -
+    not until they are requested.
+
+    :param columns: tables to be inserted (see :py:meth:`_getColumns`)
+    :type columns: :py:class:`ArchiveColumns`
+    """
+    tagToAnimal = dict((tag, data.getAnimal(animal.Name))
+                       for tag, animal in self._makeTagToAnimalDict().items())
+    loader = columns.ZipLoader(data._sourceManager[columns.source],
+                               data._cageManager, tagToAnimal,
+                               fields=self.__fields)
+    self.__insertVisitNodes(data, loader, columns.visits, columns.nosepokes)
+    self.__insertTableNodes(data, loader, columns.tables)
+
+  def _getIcSessionBounds(self):
+    if 'Log' in self.__pendingTables:
+      return None, None
+
+    return self.__icSessionStart, self.__icSessionEnd
+
+  def getStart(self):
+    if self._getIcSessionBounds()[0] is None and self.__columns is not None:
+      return _getExtremeTimepoint(self.__columns.visits, 'Start', np.argmin)
+
+    return Data.getStart(self)
+
+  getStart.__doc__ = Data.getStart.__doc__
+
+  def getEnd(self):
+    if self._getIcSessionBounds()[1] is None and self.__columns is not None:
+      return _getExtremeTimepoint(self.__columns.visits, 'End', np.argmax)
+
+    return Data.getEnd(self)
+
+  getEnd.__doc__ = Data.getEnd.__doc__
+
+  def __selectVisits(self, archive, tagToAnimal):
+    visits, nosepokes = archive.visits, archive.nosepokes
+    if self.__mice is not None:
+      tags = [tag for tag, animal in tagToAnimal.items() \
+              if animal.Name in self.__mice]
+      visits = self.__selectRows(visits,
+                                 np.in1d(visits[archive.ZipLoader.VISIT_TAG_FIELD],
+                                         tags))
+
+    visits = self.__selectTimeWindow(visits, 'Start')
+    if nosepokes is not None and visits is not archive.visits:
+      nosepokes = self.__selectRows(nosepokes,
+                                    np.in1d(nosepokes['VisitID'],
+                                            visits[archive.ZipLoader.VISIT_ID_FIELD]))
+
+    return visits, nosepokes
+
+  def __selectTimeWindow(self, table, label):
+    if self.__start is None and self.__end is None:
+      return table
+
+    timestamps = table.getUtcTimestamps(label)
+    selected = np.ones(table.rowCount, dtype=bool)
+    if self.__start is not None:
+      selected &= self.__start <= timestamps
+
+    if self.__end is not None:
+      selected &= timestamps < self.__end
+
+    return self.__selectRows(table, selected)
+
+  @staticmethod
+  def __selectRows(table, selected):
+    """
+    Select rows of the table preserving their line numbers
+    (as the '_line' column).
+    """
+    if '_line' in table:
+      lines = table['_line'][selected]
+
+    else:
+      lines = np.flatnonzero(selected) + 1
+
+    table = table.select(selected)
+    table.addColumn('_line', INT, lines)
+    return table
+
+  @staticmethod
+  def __getTableInserter(data, path, loader):
+    return {'Log': (data._insertLazyLog, loader.loadLog),
+            'Environment': (data._insertLazyEnv, loader.loadEnv),
+            'HardwareEvents': (data._insertLazyHw, loader.loadHw),
+            }[path]
+
+  @staticmethod
+  def __makeNodesFactory(load, table):
+    return lambda: load(table.toPyColumns())
+
+  @classmethod
+  def __selectMatchedNosepokes(cls, nosepokes, vids):
+    matched = np.in1d(nosepokes['VisitID'], vids)
+    if matched.all():
+      return nosepokes
+
+    for vid in nosepokes['VisitID'][~matched].tolist():
+      warn.warn('Unmatched nosepokes: %s' % vid)
+
+    return cls.__selectRows(nosepokes, matched)
+
+  @classmethod
+  def __setColumnTimezones(cls, sessions, ZipLoader, visits, nosepokes, tables):
+    timezone = getPreservedTimezone(sessions)
+    if timezone is not None:
+      for table, label in cls.__iterTimeColumns(ZipLoader, visits, nosepokes, tables):
+        table.setTimezone(label, timezone)
+
+      return
+
+    timeline = Timeline()
+    vStarts = timeline.addTimepoints(visits['Start'])
+    vEnds = timeline.addTimepoints(visits['End'])
+    timeline.coupleTuples(vStarts, vEnds)
+    timeline.addOrderedSequence(vEnds)
+    vids = visits[ZipLoader.VISIT_ID_FIELD]
+    timeline.addOrderedSequence(vStarts[np.argsort(vids, kind='mergesort')])
+    timepointIndices = [(visits, 'Start', vStarts),
+                        (visits, 'End', vEnds)]
+
+    if nosepokes is not None:
+      npStarts = timeline.addTimepoints(nosepokes['Start'])
+      npEnds = timeline.addTimepoints(nosepokes['End'])
+      timeline.coupleTuples(npStarts, npEnds)
+      timeline.addOrderedSequence(npEnds)
+      for sequence in cls.__groupNosepokeStarts(npStarts, nosepokes, vids,
+                                                 visits[ZipLoader.VISIT_TAG_FIELD]):
+        timeline.addOrderedSequence(sequence) # tailpokes correction
+
+      timepointIndices.extend([(nosepokes, 'Start', npStarts),
+                               (nosepokes, 'End', npEnds)])
+
+    for table in tables.values():
+      indices = timeline.addTimepoints(table[ZipLoader.DATETIME_KEY])
+      timeline.addOrderedSequence(indices)
+      timepointIndices.append((table, ZipLoader.DATETIME_KEY, indices))
+
+    timezones = timeline.inferTimezones(sessions)
+    for table, label, indices in timepointIndices:
+      if table.hasTimezones(label) \
+         and table.getTimezones(label) != timezones[indices].tolist():
+        raise cls.InconsistentTimezonesError(label)
+
+    for table, label, indices in timepointIndices:
+      table.setTimezones(label, timezones[indices])
+
+  @staticmethod
+  def __iterTimeColumns(ZipLoader, visits, nosepokes, tables):
+    yield visits, 'Start'
+    yield visits, 'End'
+    if nosepokes is not None:
+      yield nosepokes, 'Start'
+      yield nosepokes, 'End'
 
-    self._buildCache()
+    for table in tables.values():
+      yield table, ZipLoader.DATETIME_KEY
+
+  @staticmethod
+  def __groupNosepokeStarts(npStarts, nosepokes, vids, tags):
+    if len(npStarts) == 0:
+      return []
+
+    vidOrder = np.argsort(vids)
+    visitIndices = vidOrder[np.searchsorted(vids, nosepokes['VisitID'],
+                                            sorter=vidOrder)]
+    _, tagCodes = np.unique(tags[visitIndices].astype(unicode),
+                            return_inverse=True)
+    groups = tagCodes * 2 + nosepokes['Side'] % 2 # no bilocation assumed
+    order = np.argsort(groups, kind='mergesort')
+    bounds = np.flatnonzero(np.diff(groups[order])) + 1
+    return np.split(npStarts[order], bounds)
+
+  @classmethod
+  def __fixTimeLists(cls, sessions, ZipLoader, tags, visits, nosepokes, tables):
+    timezone = getPreservedTimezone(sessions)
+    if timezone is not None:
+      for timeLists in cls.__iterTimeLists(ZipLoader, visits, nosepokes, tables):
+        for timeList in timeLists:
+          timeList.append(timezone)
+
+      return
+
+    timeline = Timeline()
+    timeToFix = []
+    vEnds = cls.__addTimepoints(timeline, timeToFix, visits['End'])
+    vStarts = cls.__addTimepoints(timeline, timeToFix, visits['Start'])
+    timeline.coupleTuples(vStarts, vEnds)
+    timeline.addOrderedSequence(vEnds)
+    vids = visits[ZipLoader.VISIT_ID_FIELD]
+    timeline.addOrderedSequence(vStarts[np.argsort(mapAsList(int, vids))])
+
+    if nosepokes is not None and len(nosepokes['VisitID']) > 0:
+      vid2tag = dict(izip(vids, visits[ZipLoader.VISIT_TAG_FIELD]))
+      npEnds = cls.__addTimepoints(timeline, timeToFix, nosepokes['End'])
+      npStarts = cls.__addTimepoints(timeline, timeToFix, nosepokes['Start'])
+      timeline.coupleTuples(npStarts, npEnds)
+      timeline.addOrderedSequence(npEnds)
+
+      npTags = np.array(mapAsList(vid2tag.get, nosepokes['VisitID']))
+      npSides = np.array(mapAsList(int, nosepokes['Side'])) % 2 # no bilocation assumed
+      # XXX                   ^ - ugly... possibly duplicated
+
+      for tag in tags:
+        for side in (0, 1): # tailpokes correction
+          timeline.addOrderedSequence(npStarts[(npTags == tag) * (npSides == side)])
+
+    for table in tables:
+      if table is not None:
+        timeline.addOrderedSequence(cls.__addTimepoints(timeline, timeToFix,
+                                                        table[ZipLoader.DATETIME_KEY]))
+
+    fixSessions(timeToFix, timeline, sessions)
+
+  @staticmethod
+  def __iterTimeLists(ZipLoader, visits, nosepokes, tables):
+    yield visits['Start']
+    yield visits['End']
+    if nosepokes is not None:
+      yield nosepokes['Start']
+      yield nosepokes['End']
+
+    for table in tables:
+      if table is not None:
+        yield table[ZipLoader.DATETIME_KEY]
+
+  @staticmethod
+  def __addTimepoints(timeline, timeToFix, timepoints):
+    timeToFix.extend(timepoints)
+    return timeline.addTimepoints(timeListsToMicroseconds(timepoints))
 
   def _loadZip(self, zf, source=None):
     ZipLoader = self._getZipLoader(zf)
     self._loadAnimals(zf, ZipLoader)
     tagToAnimal = self._makeTagToAnimalDict()
-    loader = ZipLoader(source, self._cageManager, tagToAnimal)
+    loader = ZipLoader(self._sourceManager[source], self._cageManager,
+                       tagToAnimal)
 
     sessions = self._extractSessions(zf)
 
-    timeOrderer = LatticeOrderer()
-
-    visits = self._fromZipCSV(zf, 'Visits', source=source)
+    visits = self._fromZipCSV(zf, 'Visits')
 
     vids = visits[loader.VISIT_ID_FIELD]
 
-    if sessions is not None:
-      # for es, ee, ss, ll in izip(visits['Start'], visits['End'], visits['_source'], visits['_line']):
-      #   ee._type = 'v.End'
-      #   ee._source = ss
-      #   ee._line = ll
-      #   es._type = 'v.Start'
-      #   es._source = ss
-      #   es._line = ll
-      vEnds = visits['End']
-      vStarts = visits['Start']
-
-      timeOrderer.coupleTuples(vStarts, vEnds)
-      timeOrderer.makeOrderedSequence(vEnds)
-      timeOrderer.addOrderedSequence(np.array(vStarts + [None], dtype=object)[np.argsort(mapAsList(int, vids))])
-
-    else: #XXX
-      timeToFix = visits['End'] + visits['Start']
-
     nosepokes = None
     if self._getNp:
-      nosepokes = self._fromZipCSV(zf, 'Nosepokes', source=source)
+      nosepokes = self._fromZipCSV(zf, 'Nosepokes')
 
       npVids = nosepokes['VisitID']
 
       if len(npVids) > 0: # disables annoying warning on comparison of empty array
         vid2tag = dict(izip(vids, visits[loader.VISIT_TAG_FIELD]))
 
-        if sessions is not None:
-          # for es, ee, ss, ll in izip(nosepokes['Start'], nosepokes['End'], nosepokes['_source'], nosepokes['_line']):
-          #   ee._type = 'n.End'
-          #   ee._source = ss
-          #   ee._line = ll
-          #   es._type = 'n.Start'
-          #   es._source = ss
-          #   es._line = ll
-
-          npEnds = nosepokes['End']
-          npStarts = nosepokes['Start']
-          timeOrderer.coupleTuples(npStarts, npEnds)
-          timeOrderer.makeOrderedSequence(npEnds)
-
-          npStarts = np.array(npStarts + [None], dtype=object)[:-1] # None is to force a creation of a 1D array of lists instead of a 2D array
-
-          npTags = np.array(mapAsList(vid2tag.__getitem__, npVids))
-          npSides = np.array(mapAsList(int, nosepokes['Side'])) % 2 # no bilocation assumed
-          # XXX                   ^ - ugly... possibly duplicated
-
-          for tag in tagToAnimal:
-            for side in (0, 1): # tailpokes correction
-              timeOrderer.addOrderedSequence(npStarts[(npTags == tag) * (npSides == side)])
-
-        else: #XXX
-          timeToFix.extend(nosepokes['End'])
-          timeToFix.extend(nosepokes['Start'])
-
         for vid in npVids:
           if vid not in vid2tag:
             warn.warn('Unmatched nosepokes: %s' % vid)
 
     log = None
     if self._getLog:
-      log = self._fromZipCSV(zf, 'Log', source=source)
-      if sessions is not None:
-
-        timeOrderer.addOrderedSequence(log[ZipLoader.DATETIME_KEY])
-      else: #XXX
-        timeToFix.extend(log[ZipLoader.DATETIME_KEY])
+      log = self._fromZipCSV(zf, 'Log')
 
     environment = None
     if self._getEnv:
       try:
-        environment = self._fromZipCSV(zf, 'Environment', source=source)
+        environment = self._fromZipCSV(zf, 'Environment')
 
       except KeyError:
         pass
 
-      else:
-        if sessions is not None:
-          # for ee, ss, ll in izip(environment['DateTime'], environment['_source'], environment['_line']):
-          #   ee._type = 'e.DateTime'
-          #   ee._source = ss
-          #   ee._line = ll
-          timeOrderer.addOrderedSequence(environment[ZipLoader.DATETIME_KEY])
-
-        else:
-          timeToFix.extend(environment[ZipLoader.DATETIME_KEY])
-
     hardware = None
     if self._getHw:
       try:
-        hardware = self._fromZipCSV(zf, 'HardwareEvents', source=source)
+        hardware = self._fromZipCSV(zf, 'HardwareEvents')
 
       except KeyError:
         pass
 
-      else:
-        if sessions is not None:
-          timeOrderer.addOrderedSequence(hardware[ZipLoader.DATETIME_KEY])
-
-        else: #XXX
-          timeToFix.extend(hardware[ZipLoader.DATETIME_KEY])
-
-    #XXX important only when timezone changes!
-    if sessions is not None:
-      fixSessions(timeOrderer.pullOrdered(), sessions)
-
-    else:
-      for t in timeToFix:
-        t.append(pytz.utc) # UTC assumed
+    self.__fixTimeLists(sessions, ZipLoader, tagToAnimal, visits, nosepokes,
+                        [log, environment, hardware])
 
     self.__convertNecessaryFieldsToDatetime(visits, nosepokes,
                                             log, environment, hardware,
@@ -362,9 +991,10 @@ class Loader(Data):
     if hardware is not None:
       self._insertNewHw(loader.loadHw(hardware))
 
-  def _extractSessions(self, zf):
+  @classmethod
+  def _extractSessions(cls, zf):
     try:
-      with self._findAndOpenZipFile(zf, 'Sessions.xml') as fh:
+      with cls._findAndOpenZipFile(zf, 'Sessions.xml') as fh:
         dom = minidom.parse(fh)
 
       aos = dom.getElementsByTagName('ArrayOfSession')[0]
@@ -427,16 +1057,18 @@ class Loader(Data):
   def __convertFieldToDatetime(self, field, table):
     table[field] = [datetime(*x) for x in table[field]]
 
-  def _getZipLoader(self, zf):
+  @classmethod
+  def _getZipLoader(cls, zf):
     try:
-      return ZIP_LOADERS[self._checkVersion(zf)]
+      return ZIP_LOADERS[cls._checkVersion(zf)]
 
     except KeyError:
       return ZipLoader_v_IntelliCage_Plus_3
 
 
-  def _checkVersion(self, zf):
-    with self._findAndOpenZipFile(zf, 'DataDescriptor.xml') as fh:
+  @classmethod
+  def _checkVersion(cls, zf):
+    with cls._findAndOpenZipFile(zf, 'DataDescriptor.xml') as fh:
       dom = minidom.parse(fh)
 
     dd = dom.getElementsByTagName('DataDescriptor')[0]
@@ -445,11 +1077,26 @@ class Loader(Data):
     assert versionStr.nodeType == versionStr.TEXT_NODE
     return versionStr.nodeValue.strip().lower()
 
-  def _fromZipCSV(self, zf, path, source=None):
+  @classmethod
+  def _fromZipColumns(cls, zf, path, chunkSize=None, skippedLabels=()):
+    columnKinds = cls._columnKinds[path]
+    if skippedLabels:
+      columnKinds = dict((label, kind) for label, kind in columnKinds.items()
+                         if label not in skippedLabels)
+
+    with cls._findAndOpenZipFile(zf, path + '.txt') as fh:
+      return readColumnTable(fh, columnKinds,
+                             chunkSize=chunkSize)
+
+  def _fromZipCSV(self, zf, path):
+    convert = self._convertZip.get(path)
+    if path in self._internZip:
+      pool = CategoryColumn()
+      convert = dict(convert, **dict((label, pool.intern)
+                                     for label in self._internZip[path]))
+
     with self._findAndOpenZipFile(zf, path + '.txt') as fh:
-      return self._fromCSV(fh,
-                           source=source,
-                           convert=self._convertZip.get(path))
+      return self._fromCSV(fh, convert=convert)
 
   @staticmethod
   def _findAndOpenZipFile(zf, path):
@@ -459,12 +1106,11 @@ class Loader(Data):
     except KeyError:
       return zf.open('IntelliCage/' + path)
 
-  def _fromCSV(self, fh, source=None, convert=None):
+  def _fromCSV(self, fh, convert=None):
     return self.__fromCSV(list(csv.reader(fh, delimiter='\t')),
-                          source,
                           convert)
 
-  def __fromCSV(self, data, source, convert):
+  def __fromCSV(self, data, convert):
     if len(data) == 0:
       return None
 
@@ -475,26 +1121,18 @@ class Loader(Data):
       return {l: [] for l in labels}
 
     emptyStringToNone(data)
-    return self.__DictOfColumns(labels, data, source, convert)
+    return self.__DictOfColumns(labels, data, convert)
 
   class __DictOfColumns(dict):
-    def __init__(self, labels, rows, source, conversions):
+    """
+    Columns of a table; line numbers of rows are implicit (row position).
+    """
+    def __init__(self, labels, rows, conversions):
       dict.__init__(self, zip(labels, zip(*rows)))
-      self.__rowCount = len(rows)
-
-      if source is not None:
-        self.__appendDebugInformation(source)
 
       if conversions is not None:
         self.__convertCollumns(conversions)
 
-    def __appendDebugInformation(self, source):
-      assert '_source' not in self
-      self['_source'] = [source] * self.__rowCount
-
-      assert '_line' not in self
-      self['_line'] = range(1, self.__rowCount + 1)
-
     def __convertCollumns(self, conversions):
       for label, f in conversions.items():
         if label in self:
@@ -524,8 +1162,9 @@ class Loader(Data):
     return mystring
 
   def _loadAnimals(self, zf, loader):
-    animalData = self._fromZipCSV(zf, 'Animals')
+    self._registerAnimals(self._fromZipCSV(zf, 'Animals'), loader)
 
+  def _registerAnimals(self, animalData, loader):
     animals = loader.loadAnimals(animalData)
 
     for animal in animals:
@@ -584,6 +1223,11 @@ class Merger(Data):
     """
     Usage: Merger(data_1, [data_2, ...] [parameters])
 
+    Data of sources loaded in the columnar mode (see :py:class:`Loader`)
+    are merged as columns: neither nodes of the source are created nor
+    they are copied, and nodes of the merger are created not until they
+    are requested.
+
     :arg dataSources: objects containing IntelliCage data
     :type dataSources: [:py:class:`Data`, ...]
 
@@ -602,6 +1246,13 @@ class Merger(Data):
     :keyword ignoreMiceDifferences: whether to ignore encountered differences
                                     in animal description (e.g. sex)
     :type ignoreMiceDifferences: bool
+
+    :keyword dedupe: whether to drop visits (with their nosepokes), log,
+                     environmental and hardware data identical to those of
+                     data sources merged before (e.g. when the same export
+                     is merged twice; defaults to False); see
+                     :py:meth:`getRemovedDuplicates`
+    :type dedupe: bool
     """
     getNp = kwargs.pop('getNp', True)
     getLog = kwargs.pop('getLog', False)
@@ -609,6 +1260,8 @@ class Merger(Data):
     getHw = kwargs.pop('getHw', False)
 
     self._ignoreMiceDifferences = kwargs.pop('ignoreMiceDifferences', False)
+    self.__fingerprints = FingerprintSet() if kwargs.pop('dedupe', False) else None
+    self.__removedDuplicates = {}
 
     for key, value in kwargs.items():
       warn.warn("Unknown argument %s given for Merger constructor" % key,
@@ -620,6 +1273,7 @@ class Merger(Data):
     self._dataSources = map(str, dataSources)
 
     self.__topTime = datetime(MINYEAR, 1, 1, tzinfo=pytz.timezone('Etc/GMT-14'))
+    self.__overlaps = OverlapIndex()
 
     for dataSource in self._sortDataSources(dataSources):
       try:
@@ -631,6 +1285,80 @@ class Merger(Data):
 
     self.freeze()
 
+  def getOverlaps(self):
+    """
+    :return: temporal overlaps of the merged data: pairs of sources of
+             overlapping time spans, time ranges in which visits of
+             different sources overlap in the same cage, and groups of
+             duplicated visits (see :py:class:`OverlapIndex`); visits
+             dropped due to the `dedupe` flag are included
+    :rtype: Ens(sources=[Ens, ...], cages=[Ens, ...],
+                duplicates=[Ens, ...])
+    """
+    return Ens(sources=self.__overlaps.getSourceOverlaps(),
+               cages=self.__overlaps.getCageOverlaps(),
+               duplicates=self.__overlaps.getDuplicateVisits())
+
+  @classmethod
+  def fromFiles(cls, fnames, workers=None, **kwargs):
+    """
+    Load data files in parallel and merge them.
+
+    The files are parsed into typed columns by a pool of worker processes;
+    only registration of animals and the merge are done by the calling
+    process.
+
+    :arg fnames: paths to the data files
+    :type fnames: [basestring, ...]
+
+    :param workers: number of worker processes (defaults to the number of
+                    CPUs; if 1, files are parsed by the calling process)
+    :type workers: int or None
+
+    :keyword chunkSize: see :py:class:`Loader`
+
+    :keyword cacheDir: see :py:class:`Loader`
+
+    :keyword start: see :py:class:`Loader`
+
+    :keyword end: see :py:class:`Loader`
+
+    :keyword mice: see :py:class:`Loader`
+
+    :keyword fields: see :py:class:`Loader`
+
+    Remaining keywords are passed to both :py:class:`Loader` and
+    :py:class:`Merger`.
+
+    :rtype: :py:class:`Merger`
+    """
+    loaderFlags = {'getNp': kwargs.get('getNp', True),
+                   'getLog': kwargs.get('getLog', False),
+                   'getEnv': kwargs.get('getEnv', False),
+                   'getHw': kwargs.get('getHw', False),
+                   'chunkSize': kwargs.pop('chunkSize', None),
+                   'cacheDir': kwargs.pop('cacheDir', None),
+                   'fields': _ZipLoaderBase.checkFields(kwargs.pop('fields', None)),
+                   }
+    filters = dict((key, kwargs.pop(key)) for key in ['start', 'end', 'mice']
+                   if key in kwargs)
+    tasks = [(fname, loaderFlags) for fname in fnames]
+    if workers == 1:
+      archives = mapAsList(_readArchiveColumns, tasks)
+
+    else:
+      pool = multiprocessing.Pool(workers)
+      try:
+        archives = pool.map(_readArchiveColumns, tasks)
+
+      finally:
+        pool.close()
+        pool.join()
+
+    dataSources = [Loader(fname if archive is None else archive,
+                          **dict(loaderFlags, **filters))
+                   for fname, archive in izip(fnames, archives)]
+    return cls(*dataSources, **kwargs)
 
   @staticmethod
   def _sortDataSources(dataSources):
@@ -667,16 +1395,27 @@ class Merger(Data):
     return mystring
 
   def _appendDataSource(self, dataSource):
-    if dataSource.icSessionStart != None:
+    shared = None
+    if isinstance(dataSource, Loader):
+      # requested tables pending in a lazy loader are loaded first,
+      # as they might contain bounds of the session
+      paths = [path for path, flag in [('Log', self._getLog),
+                                       ('Environment', self._getEnv),
+                                       ('HardwareEvents', self._getHw)]
+               if flag]
+      shared = dataSource._getColumns(paths)
+
+    sourceStart, sourceEnd = dataSource._getIcSessionBounds()
+    if sourceStart != None:
       if self.icSessionStart != None and self.icSessionEnd != None:
-        if self.icSessionStart < dataSource.icSessionStart\
-          and self.icSessionEnd > dataSource.icSessionStart:
+        if self.icSessionStart < sourceStart\
+          and self.icSessionEnd > sourceStart:
           print('Overlap of IC sessions detected')
 
-    if dataSource.icSessionEnd != None:
+    if sourceEnd != None:
       if self.icSessionStart != None and self.icSessionEnd != None:
-        if self.icSessionStart < dataSource.icSessionEnd\
-          and self.icSessionEnd > dataSource.icSessionEnd:
+        if self.icSessionStart < sourceEnd\
+          and self.icSessionEnd > sourceEnd:
           print('Overlap of IC sessions detected')
 
     # TODO: overlap issue!
@@ -703,9 +1442,29 @@ class Merger(Data):
       gData = dataSource.getGroup(group)
       self._registerGroup(**gData)
 
+    if shared is not None:
+      columns, cagesAndAnimals = shared
+      self.__addColumnsToOverlaps(dataSource, columns)
+      if self.__fingerprints is not None:
+        columns = self.__dropDuplicateColumns(dataSource, columns)
+
+      dataSource._insertColumnsInto(self, columns)
+      self.__appendSharedColumns(dataSource, columns, cagesAndAnimals)
+      return
+
     visits = dataSource.getVisits()
 
     if visits != None:
+      self.__overlaps.addVisits([v._source for v in visits],
+                                cages=[v.Cage for v in visits],
+                                corners=[v.Corner for v in visits],
+                                animals=[v.Animal.Name for v in visits],
+                                starts=[timedeltaToMicroseconds(v.Start - EPOCH_UTC)
+                                        for v in visits],
+                                ends=[timedeltaToMicroseconds(v.End - EPOCH_UTC)
+                                      for v in visits],
+                                lines=[v._line for v in visits])
+      visits = self.__dropDuplicateNodes('Visits', visits)
       try:
         minStart = min(v.Start for v in visits)
 
@@ -714,23 +1473,26 @@ class Merger(Data):
 
       else:
         if minStart < self.__topTime:
-          print("Possible temporal overlap of visits")
+          print("Possible temporal overlap of visits (see getOverlaps())")
 
       self.insertVisits(visits)
 
     if self._getHw:
       hardware = dataSource.getHardwareEvents()
       if hardware is not None:
+        hardware = self.__dropDuplicateNodes('HardwareEvents', hardware)
         self.insertHw(hardware)
 
     if self._getEnv:
       env = dataSource.getEnvironment()
       if env is not None:
+        env = self.__dropDuplicateNodes('Environment', env)
         self.insertEnv(env)
 
     if self._getLog:
       log = dataSource.getLog()
       if log is not None:
+        log = self.__dropDuplicateNodes('Log', log)
         self.insertLog(log)
 
     ## XXX more data loading here
@@ -752,7 +1514,182 @@ class Merger(Data):
     if self._getLog and log:
       self.__topTime = max(self.__topTime, max(l.DateTime for l in log))
 
-    self._buildCache()
+    if visits != None:
+      self._updateCache((v.Cage, v.Animal.Name) for v in visits)
+
+  def __addColumnsToOverlaps(self, dataSource, columns):
+    visits = columns.visits
+    names = dict((tag, animal.Name)
+                 for tag, animal in dataSource._makeTagToAnimalDict().items())
+    self.__overlaps.addSourceVisits(columns.source,
+                                    cages=visits['Cage'],
+                                    corners=visits['Corner'],
+                                    animals=_mapColumn(visits[columns.ZipLoader.VISIT_TAG_FIELD],
+                                                       names),
+                                    starts=visits.getUtcTimestamps('Start'),
+                                    ends=visits.getUtcTimestamps('End'),
+                                    lines=visits['_line'] if '_line' in visits \
+                                          else np.arange(1, visits.rowCount + 1))
+
+  def __appendSharedColumns(self, dataSource, columns, cagesAndAnimals):
+    minStart = _getExtremeTimepoint(columns.visits, 'Start', np.argmin)
+    if minStart is not None and minStart < self.__topTime:
+      print("Possible temporal overlap of visits (see getOverlaps())")
+
+    latest = [_getExtremeTimepoint(columns.visits, 'End', np.argmax)]
+    if self._getNp and columns.nosepokes is not None:
+      latest.append(_getExtremeTimepoint(columns.nosepokes, 'End', np.argmax))
+
+    for table in columns.tables.values():
+      latest.append(_getExtremeTimepoint(table, columns.ZipLoader.DATETIME_KEY,
+                                         np.argmax))
+
+    self.__topTime = max([self.__topTime] + [t for t in latest if t is not None])
+    self._updateCache(cagesAndAnimals)
+
+  # fields of fingerprints of rows: interned values and timepoints
+  __NODE_FINGERPRINT_FIELDS = {
+    'Visits': ([lambda v: v.Animal.Name, attrgetter('Cage'),
+                attrgetter('Corner')],
+               [attrgetter('Start'), attrgetter('End')]),
+    'Log': ([attrgetter('Category'), attrgetter('Type'), attrgetter('Notes'),
+             attrgetter('Cage'), attrgetter('Corner'), attrgetter('Side')],
+            [attrgetter('DateTime')]),
+    'Environment': ([attrgetter('Temperature'), attrgetter('Illumination'),
+                     attrgetter('Cage')],
+                    [attrgetter('DateTime')]),
+    'HardwareEvents': ([lambda h: int(h.Type), attrgetter('State'),
+                        attrgetter('Cage'), attrgetter('Corner'),
+                        attrgetter('Side')],
+                       [attrgetter('DateTime')]),
+    }
+
+  def __dropDuplicateNodes(self, path, nodes):
+    if self.__fingerprints is None:
+      return nodes
+
+    getValues, getTimepoints = self.__NODE_FINGERPRINT_FIELDS[path]
+    fields = [self.__fingerprints.intern(map(get, nodes)) for get in getValues]
+    fields.extend(np.array([timedeltaToMicroseconds(get(n) - EPOCH_UTC)
+                            for n in nodes], dtype=np.int64)
+                  for get in getTimepoints)
+    selected = self.__fingerprints.selectUnseen(path,
+                                                FingerprintSet.makeFingerprints(fields))
+    sources = [n._source for n in nodes]
+    for source in set(sources):
+      self.__countRemovedDuplicates(source, path, 0)
+
+    for source, keep in izip(sources, selected.tolist()):
+      if not keep:
+        self.__countRemovedDuplicates(source, path, 1)
+
+    return [n for n, keep in izip(nodes, selected.tolist()) if keep]
+
+  def __dropDuplicateColumns(self, dataSource, columns):
+    loader = columns.ZipLoader(columns.source, self._cageManager, {})
+    names = dict((tag, animal.Name)
+                 for tag, animal in dataSource._makeTagToAnimalDict().items())
+    intern = self.__fingerprints.internColumn
+    visits = columns.visits
+    fields = {'Visits': [intern(visits[columns.ZipLoader.VISIT_TAG_FIELD],
+                                lambda tags: [names[tag] for tag in tags.tolist()]),
+                         self.__internField(visits, ['Cage']),
+                         self.__internField(visits, ['Corner']),
+                         visits.getUtcTimestamps('Start'),
+                         visits.getUtcTimestamps('End')]}
+    tables = columns.tables
+    timepoint = columns.ZipLoader.DATETIME_KEY
+    if 'Log' in tables:
+      log = tables['Log']
+      fields['Log'] = [self.__internField(log, ['LogCategory', 'Category']),
+                       self.__internField(log, ['LogType', 'Type']),
+                       self.__internField(log, ['LogNotes', 'Notes'])] \
+                      + self.__internLocations(log, loader._getLogCageCornerSide) \
+                      + [log.getUtcTimestamps(timepoint)]
+
+    if 'Environment' in tables:
+      env = tables['Environment']
+      fields['Environment'] = [self.__internField(env, ['Temperature']),
+                               self.__internField(env, ['Illumination']),
+                               self.__internField(env, ['Cage']),
+                               env.getUtcTimestamps(timepoint)]
+
+    if 'HardwareEvents' in tables:
+      hw = tables['HardwareEvents']
+      fields['HardwareEvents'] = [self.__internField(hw, ['HardwareType', 'Type'],
+                                                     lambda types: [int(x) for x in types]),
+                                  self.__internField(hw, ['State'])] \
+                                 + self.__internLocations(hw, loader._getHwCageCornerSide) \
+                                 + [hw.getUtcTimestamps(timepoint)]
+
+    selected = {}
+    for path, pathFields in fields.items():
+      selected[path] = self.__fingerprints.selectUnseen(path,
+                                                        FingerprintSet.makeFingerprints(pathFields))
+      self.__countRemovedDuplicates(columns.source, path,
+                                    int((~selected[path]).sum()))
+
+    return Loader._selectColumnsRows(columns, selected)
+
+  def __internField(self, table, labels, convert=list):
+    """
+    :param labels: alternative labels of the column (the first one present
+                   is used; None is interned for every row if none is)
+    :param convert: converts a list of values of the column
+    """
+    for label in labels:
+      if label in table:
+        toList = table.getKind(label).toList
+        return self.__fingerprints.internColumn(table[label],
+                                                lambda x: convert(toList(x)))
+
+    return self.__fingerprints.intern([None] * table.rowCount)
+
+  def __internLocations(self, table, getCageCornerSide):
+    """
+    Intern cages, corners and sides of rows of the table converting only
+    their unique combinations.
+
+    :param getCageCornerSide: converts raw values of the columns to
+                              the cage, corner and side
+    """
+    values, codes = [], []
+    for label in ['Cage', 'Corner', 'Side']:
+      if label in table:
+        unique, inverse = np.unique(table[label], return_inverse=True)
+        values.append(table.getKind(label).toList(unique))
+        codes.append(inverse)
+
+      else:
+        values.append([None])
+        codes.append(np.zeros(table.rowCount, dtype=np.intp))
+
+    cages, corners, sides = values
+    code = (codes[0] * len(corners) + codes[1]) * len(sides) + codes[2]
+    unique, inverse = np.unique(code, return_inverse=True)
+    locations = [getCageCornerSide(cages[c // (len(corners) * len(sides))],
+                                   corners[c // len(sides) % len(corners)],
+                                   sides[c % len(sides)])
+                 for c in unique.tolist()]
+    return [self.__fingerprints.intern([location[i] for location in locations])[inverse]
+            for i in range(3)]
+
+  def __countRemovedDuplicates(self, source, path, count):
+    removed = self.__removedDuplicates.setdefault(source, {})
+    removed[path] = removed.get(path, 0) + count
+
+  def getRemovedDuplicates(self):
+    """
+    :return: numbers of rows of data sources dropped as duplicates (if the
+             merger was created with the `dedupe` flag; empty otherwise)
+    :rtype: {source: Ens(visits=int, log=int, environment=int,
+             hardware=int), ...}
+    """
+    return dict((source, Ens(visits=removed.get('Visits', 0),
+                             log=removed.get('Log', 0),
+                             environment=removed.get('Environment', 0),
+                             hardware=removed.get('HardwareEvents', 0)))
+                for source, removed in self.__removedDuplicates.items())
 
 
 class ICSide(int):
@@ -881,10 +1818,78 @@ class ICCageManager(object):
 
 
 class _ZipLoaderBase(object):
-  def __init__(self, source, cageManager, animalManager):
+  def __init__(self, source, cageManager, animalManager, fields=None):
+    """
+    :param fields: visit and nosepoke attributes loaded (all if None)
+    :type fields: frozenset or None
+    """
     self.__animalManager = animalManager
     self._cageManager = cageManager
     self._source = source
+    self._Visit = projectNodeClass(Visit,
+                                   self.__getMissingAttributes(self.VISIT_ATTRIBUTES,
+                                                               fields))
+    self._Nosepoke = projectNodeClass(Nosepoke,
+                                      self.__getMissingAttributes(self.NOSEPOKE_ATTRIBUTES,
+                                                                  fields))
+
+  VISIT_ATTRIBUTES = ['Cage', 'Corner',
+                      'Animal', 'Start', 'End', 'Module',
+                      'CornerCondition', 'PlaceError',
+                      'AntennaNumber', 'AntennaDuration',
+                      'PresenceNumber', 'PresenceDuration',
+                      'VisitSolution']
+  REQUIRED_ATTRIBUTES = frozenset(['Cage', 'Corner', 'Animal',
+                                   'Start', 'End', 'Side'])
+
+  @classmethod
+  def __getMissingAttributes(cls, attributes, fields):
+    if fields is None:
+      return frozenset()
+
+    return frozenset(attributes) - cls.REQUIRED_ATTRIBUTES - fields
+
+  @classmethod
+  def checkFields(cls, fields):
+    """
+    >>> sorted(_ZipLoaderBase.checkFields(['Module', 'LickNumber']))
+    ['LickNumber', 'Module']
+
+    >>> _ZipLoaderBase.checkFields(['Module', 'Nosepoke'])
+    Traceback (most recent call last):
+      ...
+    ValueError: Unknown fields: Nosepoke
+
+    :return: fields to be loaded
+    :rtype: frozenset or None
+    """
+    if fields is None:
+      return None
+
+    fields = frozenset(fields)
+    unknown = fields - frozenset(cls.VISIT_ATTRIBUTES) \
+                     - frozenset(cls.NOSEPOKE_ATTRIBUTES)
+    if unknown:
+      raise ValueError('Unknown fields: ' + ', '.join(sorted(unknown)))
+
+    return fields
+
+  @classmethod
+  def getSkippedLabels(cls, fields):
+    """
+    :return: labels of visit and nosepoke columns of attributes not loaded
+    :rtype: (frozenset, frozenset)
+    """
+    return (cls.__getSkippedLabels(cls.VISIT_ATTRIBUTES, cls.VISIT_FIELDS,
+                                   fields),
+            cls.__getSkippedLabels(cls.NOSEPOKE_ATTRIBUTES, cls.NOSEPOKE_FIELDS,
+                                   fields))
+
+  @classmethod
+  def __getSkippedLabels(cls, attributes, labels, fields):
+    missing = cls.__getMissingAttributes(attributes, fields)
+    return frozenset(label for attr, label in izip(attributes, labels)
+                     if attr in missing)
 
   def _makeVisit(self, Cage, Corner, AnimalTag, Start, End, ModuleName,
                  CornerCondition, PlaceError,
@@ -895,22 +1900,37 @@ class _ZipLoaderBase(object):
     corner = cage[Corner]
 
     Nosepokes = None
-    if nosepokeRows is not None:
-      Nosepokes = tuple(self._makeNosepoke(corner, row)\
-                        for row in sorted(nosepokeRows))
-
-    return Visit(Start, corner, animal, End,
-                 unicode(ModuleName) if ModuleName is not None else None,
-                 cage,
-                 int(CornerCondition) if CornerCondition is not None else None,
-                 int(PlaceError) if PlaceError is not None else None,
-                 int(AntennaNumber) if AntennaNumber is not None else None,
-                 timedelta(seconds=float(AntennaDuration)) if AntennaDuration is not None else None,
-                 int(PresenceNumber) if PresenceNumber is not None else None,
-                 timedelta(seconds=float(PresenceDuration)) if PresenceDuration is not None else None,
-                 int(VisitSolution) if VisitSolution is not None else None,
-                 self._source, _line,
-                 Nosepokes)
+    if isinstance(nosepokeRows, LazyNosepokes):
+      Nosepokes = nosepokeRows
+
+    elif nosepokeRows is not None:
+      Nosepokes = self._makeNosepokes(corner, nosepokeRows)
+
+    return self._Visit(Start, corner, animal, End,
+                       ModuleName,
+                       cage,
+                       int(CornerCondition) if CornerCondition is not None else None,
+                       int(PlaceError) if PlaceError is not None else None,
+                       int(AntennaNumber) if AntennaNumber is not None else None,
+                       timedelta(seconds=float(AntennaDuration)) if AntennaDuration is not None else None,
+                       int(PresenceNumber) if PresenceNumber is not None else None,
+                       timedelta(seconds=float(PresenceDuration)) if PresenceDuration is not None else None,
+                       int(VisitSolution) if VisitSolution is not None else None,
+                       self._source, _line,
+                       Nosepokes)
+
+  def _makeNosepokes(self, sideManager, nosepokeRows):
+    return tuple(self._makeNosepoke(sideManager, row)\
+                 for row in sorted(nosepokeRows))
+
+  NOSEPOKE_ATTRIBUTES = ['Start', 'End', 'Side',
+                         'SideCondition', 'SideError',
+                         'TimeError', 'ConditionError',
+                         'LickNumber', 'LickContactTime',
+                         'LickDuration',
+                         'AirState', 'DoorState',
+                         'LED1State', 'LED2State',
+                         'LED3State']
 
   def _makeNosepoke(self, sideManager, nosepokeTuple):
     (Start, End, Side,
@@ -918,21 +1938,21 @@ class _ZipLoaderBase(object):
      LickNumber, LickContactTime, LickDuration,
      AirState, DoorState, LED1State, LED2State, LED3State,
      _line) = nosepokeTuple
-    return Nosepoke(Start, End,
-                    sideManager[Side] if Side is not None else None,
-                    int(LickNumber) if LickNumber is not None else None,
-                    timedelta(seconds=float(LickContactTime)) if LickContactTime is not None else None,
-                    timedelta(seconds=float(LickDuration)) if LickDuration is not None else None,
-                    int(SideCondition) if SideCondition is not None else None,
-                    int(SideError) if SideError is not None else None,
-                    int(TimeError) if TimeError is not None else None,
-                    int(ConditionError) if ConditionError is not None else None,
-                    int(AirState) if AirState is not None else None,
-                    int(DoorState) if DoorState is not None else None,
-                    int(LED1State) if LED1State is not None else None,
-                    int(LED2State) if LED2State is not None else None,
-                    int(LED3State) if LED3State is not None else None,
-                    self._source, _line)
+    return self._Nosepoke(Start, End,
+                          sideManager[Side] if Side is not None else None,
+                          int(LickNumber) if LickNumber is not None else None,
+                          timedelta(seconds=float(LickContactTime)) if LickContactTime is not None else None,
+                          timedelta(seconds=float(LickDuration)) if LickDuration is not None else None,
+                          int(SideCondition) if SideCondition is not None else None,
+                          int(SideError) if SideError is not None else None,
+                          int(TimeError) if TimeError is not None else None,
+                          int(ConditionError) if ConditionError is not None else None,
+                          int(AirState) if AirState is not None else None,
+                          int(DoorState) if DoorState is not None else None,
+                          int(LED1State) if LED1State is not None else None,
+                          int(LED2State) if LED2State is not None else None,
+                          int(LED3State) if LED3State is not None else None,
+                          self._source, _line)
   def loadVisits(self, visitsCollumns, nosepokesCollumns=None):
     if nosepokesCollumns is not None:
       vNosepokes = self._assignNosepokesToVisits(nosepokesCollumns,
@@ -941,9 +1961,23 @@ class _ZipLoaderBase(object):
     else:
       vNosepokes = repeat(None)
 
+    return self._makeVisits(visitsCollumns, vNosepokes)
+
+  def loadVisitsWithNosepokeTable(self, visitsCollumns, nosepokeTable):
+    """
+    Nosepokes are created on the first access to Visit.Nosepokes.
+
+    :param nosepokeTable: nosepokes (with timezones of timepoints set)
+    :type nosepokeTable: :py:class:`ColumnTable`
+    """
+    nosepokeColumns = NosepokeColumns(self, nosepokeTable)
+    return self._makeVisits(visitsCollumns,
+                            nosepokeColumns.assignToVisits(visitsCollumns[self.VISIT_ID_FIELD]))
+
+  def _makeVisits(self, visitsCollumns, vNosepokes):
     vColValues = [visitsCollumns.get(x, repeat(None)) \
                   for x in self.VISIT_FIELDS]
-    vLines = count(1)
+    vLines = visitsCollumns.get('_line', count(1))
     vColValues.append(vLines)
     vColValues.append(vNosepokes)
     return mapAsList(self._makeVisit, *vColValues)
@@ -973,9 +2007,9 @@ class _ZipLoaderBase(object):
                Cage, Corner, Side, Notes, _line):
     cage, corner, side = self._getLogCageCornerSide(Cage, Corner, Side)
 
-    return LogEntry(DateTime, unicode(Category), unicode(Type),
+    return LogEntry(DateTime, Category, Type,
                     cage, corner, side,
-                    unicode(Notes) if Notes is not None else None,
+                    Notes,
                     self._source,
                     _line)
 
@@ -994,7 +2028,7 @@ class _ZipLoaderBase(object):
 
   @staticmethod
   def _getColumnValues(columnNames, columns):
-    return [columns.get(c) for c in columnNames] + [count(1)]
+    return [columns.get(c) for c in columnNames] + [columns.get('_line', count(1))]
 
   def _makeHw(self, DateTime, Type, Cage, Corner, Side, State, _line):
     cage, corner, side = self._getHwCageCornerSide(Cage, Corner, Side)
@@ -1096,6 +2130,79 @@ class ZipLoader_v_IntelliCage_Plus_3(_ZipLoaderBase):
     return cls.group(columns['AnimalName'],
                      columns['GroupName'])
 
+
+class NosepokeColumns(object):
+  """
+  Nosepokes kept in a columnar table until they are accessed.
+  """
+  def __init__(self, loader, table):
+    self.__loader = loader
+    self.__table = table
+    self.__columns = dict(zip(loader.NOSEPOKE_ATTRIBUTES,
+                              loader.NOSEPOKE_FIELDS))
+    self.__order = np.argsort(table['VisitID'], kind='mergesort')
+    self.__durations = None
+
+  def assignToVisits(self, vIDs):
+    """
+    :return: nosepokes of every visit
+    :rtype: [:py:class:`LazyNosepokes` or (), ...]
+    """
+    nVIDs = self.__table['VisitID'][self.__order]
+    vIDs = np.array(vIDs, dtype=nVIDs.dtype)
+    starts = np.searchsorted(nVIDs, vIDs, side='left').tolist()
+    stops = np.searchsorted(nVIDs, vIDs, side='right').tolist()
+    return [LazyNosepokes(self, start, stop) if start < stop else ()
+            for start, stop in izip(starts, stops)]
+
+  def makeNosepokes(self, sideManager, start, stop):
+    indices = self.__order[start:stop]
+    columns = self.__table.select(indices).toPyColumns()
+    nColValues = [columns.get(x, repeat(None)) \
+                  for x in self.__loader.NOSEPOKE_FIELDS]
+    nColValues.append(columns['_line'] if '_line' in columns else (indices + 1).tolist())
+    return self.__loader._makeNosepokes(sideManager, izip(*nColValues))
+
+  def summarizeNosepokes(self, attribute, initial, start, stop):
+    indices = self.__order[start:stop]
+    if attribute == 'Duration':
+      durations = self.__getDurations()
+      if durations is not None:
+        return initial + timedelta(microseconds=int(durations[indices].sum()))
+
+      return None
+
+    label = self.__columns[attribute]
+    if label not in self.__table:
+      return None
+
+    values = self.__table[label][indices]
+    kind = self.__table.getKind(label)
+    if values.dtype.kind == 'f':
+      if np.isnan(values).any():
+        return None
+
+      return sum((timedelta(seconds=x) for x in values.tolist()), initial)
+
+    if (values == kind.null).any():
+      return None
+
+    return sum(values.tolist(), initial)
+
+  def __getDurations(self):
+    if self.__durations is None:
+      table = self.__table
+      startOffsets = table.getUtcOffsets('Start')
+      endOffsets = table.getUtcOffsets('End')
+      if startOffsets is None or endOffsets is None:
+        return None
+
+      self.__durations = (table['End'] - endOffsets) \
+                         - (table['Start'] - startOffsets)
+
+    return self.__durations
+
+
 class ZipLoader_v_version_2_2(_ZipLoaderBase):
   DATETIME_KEY = 'Time'
 
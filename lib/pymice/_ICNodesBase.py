@@ -71,6 +71,75 @@ def BaseNode_del_(self):
         pass
 
 
+class LazyNosepokes(object):
+  """
+  Nosepokes of a visit to be created on the first access.
+
+  The source has to provide makeNosepokes(sideManager, start, stop) and
+  summarizeNosepokes(attribute, initial, start, stop) methods, the latter
+  returning None if the summary can not be computed without the nosepokes.
+  """
+  __slots__ = ('__source', '__start', '__stop')
+
+  def __init__(self, source, start, stop):
+    self.__source = source
+    self.__start = start
+    self.__stop = stop
+
+  def __len__(self):
+    return self.__stop - self.__start
+
+  def materialize(self, sideManager):
+    return self.__source.makeNosepokes(sideManager, self.__start, self.__stop)
+
+  def summarize(self, attribute, initial):
+    return self.__source.summarizeNosepokes(attribute, initial,
+                                            self.__start, self.__stop)
+
+
+class FieldNotLoadedError(AttributeError):
+  """
+  The attribute has not been loaded from the data file.
+  """
+  pass
+
+
+_projectedClasses = {}
+
+def projectNodeClass(cls, missing):
+  """
+  :param missing: attributes not loaded
+  :type missing: frozenset
+
+  :return: a subclass of the node class raising FieldNotLoadedError on
+           access to the missing attributes (cls if none is missing)
+  """
+  if not missing:
+    return cls
+
+  key = cls, missing
+  try:
+    return _projectedClasses[key]
+
+  except KeyError:
+    pass
+
+  attrs = dict((attr, property(makeFieldNotLoadedGetter(cls.__name__, attr)))
+               for attr in missing)
+  attrs['__slots__'] = ()
+  attrs['__module__'] = cls.__module__
+  projected = type(cls)(cls.__name__, (cls,), attrs)
+  _projectedClasses[key] = projected
+  return projected
+
+
+def makeFieldNotLoadedGetter(name, attr):
+  def getter(self):
+    raise FieldNotLoadedError('%s.%s has not been loaded (see the fields argument of the loader)' % (name, attr))
+
+  return getter
+
+
 class VisitMetaclass(BaseNodeMetaclass):
   __npSummaryProperties = [(('NosepokeDuration', 'Duration'), timedelta(0)),
                            ('LickNumber', 0),
@@ -79,7 +148,21 @@ class VisitMetaclass(BaseNodeMetaclass):
                            ]
   def __new__(cls, name, bases, attrs):
     cls.__addNosepokeSummaryPropertiesToDict(attrs)
-    return BaseNodeMetaclass.__new__(cls, name, bases, attrs)
+    visitClass = BaseNodeMetaclass.__new__(cls, name, bases, attrs)
+    visitClass.Nosepokes = property(cls.__getNosepokes)
+    return visitClass
+
+  @staticmethod
+  def __getNosepokes(self):
+    nosepokes = self._Visit__Nosepokes
+    if isinstance(nosepokes, LazyNosepokes):
+      nosepokes = nosepokes.materialize(self._Visit__Corner)
+      for nosepoke in nosepokes:
+        nosepoke._bindToVisit(self)
+
+      self._Visit__Nosepokes = nosepokes
+
+    return nosepokes
 
   @classmethod
   def __addNosepokeSummaryPropertiesToDict(cls, dict):
@@ -96,6 +179,13 @@ class VisitMetaclass(BaseNodeMetaclass):
     npAttrGetter = attrgetter(attr)
     def propertyGetter(self):
       nosepokes = self._Visit__Nosepokes
+      if isinstance(nosepokes, LazyNosepokes):
+        summary = nosepokes.summarize(attr, start)
+        if summary is not None:
+          return summary
+
+        nosepokes = self.Nosepokes
+
       if nosepokes is not None:
         return sum(imap(npAttrGetter, nosepokes), start)
 
@@ -25,14 +25,177 @@
 
 import numpy as np
 from operator import attrgetter
-from collections import Sequence
+from itertools import count
+from collections import Sequence, OrderedDict
+
+from ._Tools import isString
 
 # dependence tracking
-from . import _dependencies
+from . import _dependencies, _Tools
 import types
 __dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().values() if isinstance(x, types.ModuleType)])
 
 
+class Interval(object):
+  """
+  A selector of values from the half-open [lower, upper) interval (an
+  unspecified bound is not checked; values not comparable with a bound,
+  like None, are not selected).
+
+  >>> interval = Interval(1, 3)
+  >>> interval(np.array([0, 1, 2, 3])).tolist()
+  [False, True, True, False]
+
+  >>> Interval(upper=2)(np.array([1, 2])).tolist()
+  [True, False]
+
+  >>> Interval()(np.array([1, 2])).tolist()
+  [True, True]
+
+  >>> interval(np.array([1, None, 3, 2], dtype=object)).tolist()
+  [True, False, False, True]
+  """
+  def __init__(self, lower=None, upper=None):
+    self.lower = lower
+    self.upper = upper
+
+  def __call__(self, values):
+    try:
+      return self.__compare(values)
+
+    except TypeError:
+      return np.array([self.__contains(value) for value in values],
+                      dtype=bool)
+
+  def __contains(self, value):
+    try:
+      return bool(self.__compare(value))
+
+    except TypeError:
+      return False
+
+  def __compare(self, values):
+    if self.lower is None:
+      if self.upper is None:
+        return np.ones(np.shape(values), dtype=bool)
+
+      return values < self.upper
+
+    if self.upper is None:
+      return self.lower <= values
+
+    return (self.lower <= values) * (values < self.upper)
+
+
+class LRUCache(object):
+  """
+  A memory-budgeted cache evicting the least recently used entries.
+
+  >>> cache = LRUCache(budget=100)
+  >>> cache.put('a', 'A', 60)
+  'A'
+  >>> cache.get('a')
+  'A'
+  >>> cache.put('b', 'B', 60)
+  'B'
+  >>> cache.get('a')
+  Traceback (most recent call last):
+  ...
+  KeyError: 'a'
+
+  >>> sorted(cache.getStats().items())
+  [('budget', 100), ('entries', 1), ('evictions', 1), ('hits', 1), ('misses', 1), ('nbytes', 60)]
+
+  Entries exceeding the budget are not stored:
+
+  >>> cache.put('c', 'C', 200)
+  'C'
+  >>> cache.get('b')
+  'B'
+
+  >>> cache.setBudget(10)
+  >>> cache.getStats()['entries']
+  0
+  """
+  DEFAULT_BUDGET = 256 * 1024 ** 2
+
+  def __init__(self, budget=DEFAULT_BUDGET):
+    """
+    :param budget: maximum total size (in bytes) of cached entries
+                   (unlimited if None)
+    :type budget: int or None
+    """
+    self.__budget = budget
+    self.__entries = OrderedDict()
+    self.__nbytes = 0
+    self.__hits = 0
+    self.__misses = 0
+    self.__evictions = 0
+
+  def get(self, key):
+    try:
+      entry = self.__entries.pop(key)
+
+    except KeyError:
+      self.__misses += 1
+      raise
+
+    self.__entries[key] = entry
+    self.__hits += 1
+    return entry[0]
+
+  def put(self, key, value, nbytes):
+    """
+    :return: the value
+    """
+    self.__remove(key)
+    if self.__budget is None or nbytes <= self.__budget:
+      self.__entries[key] = (value, nbytes)
+      self.__nbytes += nbytes
+      self.__trim()
+
+    return value
+
+  def discard(self, owner):
+    """
+    Remove entries of keys starting with the owner.
+    """
+    for key in [k for k in self.__entries if k[0] == owner]:
+      self.__remove(key)
+
+  def setBudget(self, budget):
+    self.__budget = budget
+    self.__trim()
+
+  def getStats(self):
+    """
+    :return: the budget, number and total size (in bytes) of entries, and
+             numbers of cache hits, misses and evictions
+    :rtype: {str: int, ...}
+    """
+    return {'budget': self.__budget,
+            'entries': len(self.__entries),
+            'nbytes': self.__nbytes,
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions}
+
+  def __remove(self, key):
+    try:
+      self.__nbytes -= self.__entries.pop(key)[1]
+
+    except KeyError:
+      pass
+
+  def __trim(self):
+    if self.__budget is None:
+      return
+
+    while self.__nbytes > self.__budget:
+      self.__nbytes -= self.__entries.popitem(last=False)[1][1]
+      self.__evictions += 1
+
+
 class ObjectBase(object):
   """
   A base class for efficient object filtering.
@@ -144,11 +307,198 @@ class ObjectBase(object):
   >>> ob.put((x * x for x in range(4)))
   >>> ob.get()
   [0, 1, 4, 9]
+
+  >>> def factory():
+  ...   print('materializing')
+  ...   return [ClassA(3, 3)]
+  >>> ob = ObjectBase()
+  >>> ob.put([ClassA(1, 1)])
+  >>> ob.putLazy(factory)
+  >>> ob.put([ClassA(2, 2)])
+  >>> ob.getMaterialized()
+  [ClassA(a=1, b=1)]
+
+  >>> ob.get({'a': lambda x: x > 1})
+  materializing
+  [ClassA(a=3, b=3), ClassA(a=2, b=2)]
+
+  >>> ob.get()
+  [ClassA(a=1, b=1), ClassA(a=3, b=3), ClassA(a=2, b=2)]
+
+  Interval selectors are resolved with a sorted index of the attribute
+  values (built on first use and kept until the next put):
+
+  >>> ob = ObjectBase()
+  >>> ob.put([ClassA(3, 0), ClassA(1, 1), ClassA(2, 0), ClassA(5, 1)])
+  >>> ob.get({'a': Interval(2, 5)})
+  [ClassA(a=3, b=0), ClassA(a=2, b=0)]
+
+  >>> ob.get({'a': Interval(2), 'b': [1]})
+  [ClassA(a=5, b=1)]
+
+  Converted attribute values, masks and indexes are kept in a (possibly
+  shared) :py:class:`LRUCache`:
+
+  >>> ob = ObjectBase(cache=LRUCache(budget=None))
+  >>> ob.put([ClassA(1, 0), ClassA(2, 0)])
+  >>> ob.get({'a': [1]})
+  [ClassA(a=1, b=0)]
+  >>> ob.get({'a': [2]})
+  [ClassA(a=2, b=0)]
+  >>> ob.getCacheStats()['hits'] > 0
+  True
   """
   class MaskManager(object):
-    def __init__(self, values):
+    def __init__(self, values, cache=None, key=()):
+      """
+      :param cache: a cache of masks and indexes (a private unlimited one
+                    if None)
+      :type cache: :py:class:`LRUCache` or None
+
+      :param key: a prefix of the cache keys (unique for the values)
+      :type key: tuple
+      """
       self.__values = np.array(values)
-      self.__cachedMasks = {}
+      self.__cache = cache if cache is not None else LRUCache(budget=None)
+      self.__key = key
+
+    @property
+    def nbytes(self):
+      return self.__values.nbytes
+
+    def __getCached(self, key, factory):
+      key = self.__key + key
+      try:
+        return self.__cache.get(key)
+
+      except KeyError:
+        value, nbytes = factory()
+        return self.__cache.put(key, value, nbytes)
+
+    def getIndices(self, selector, candidates=None):
+      """
+      :param selector: an interval or accepted values
+      :type selector: :py:class:`Interval` or collection
+
+      :param candidates: ascending indices the selection is limited to
+                         (all values if None)
+      :type candidates: numpy.ndarray or None
+
+      :return: ascending indices of selected values
+      :rtype: numpy.ndarray
+
+      >>> mm = ObjectBase.MaskManager([4., 1., 3., 2.])
+      >>> mm.getIndices(Interval(2, 4)).tolist()
+      [2, 3]
+
+      >>> mm.getIndices(Interval(upper=3)).tolist()
+      [1, 3]
+
+      >>> mm.getIndices(Interval(5)).tolist()
+      []
+
+      >>> mm = ObjectBase.MaskManager([u'a', u'b', u'a', u'c'])
+      >>> mm.getIndices([u'a']).tolist()
+      [0, 2]
+
+      >>> mm.getIndices([u'c', u'a', u'd']).tolist()
+      [0, 2, 3]
+
+      >>> mm.getIndices([]).tolist()
+      []
+
+      >>> mm.getIndices([u'a', u'c'], np.array([1, 2, 3])).tolist()
+      [2, 3]
+
+      >>> mm.getIndices(Interval(u'b'), np.array([0, 1, 3])).tolist()
+      [1, 3]
+
+      >>> mm = ObjectBase.MaskManager([1, None, 3])
+      >>> mm.getIndices(Interval(2)).tolist()
+      [2]
+      """
+      if isinstance(selector, Interval):
+        if candidates is not None:
+          return candidates[selector(self.__values[candidates])]
+
+        return self.__getIntervalIndices(selector)
+
+      return self.__getPostingIndices(list(selector), candidates)
+
+    def __getPostingIndices(self, acceptedValues, candidates):
+      allPostings = self.__getCached(('postings',), self.__makePostings)
+      if allPostings is False: # values not sortable
+        mask = self.__combineMasks(acceptedValues)
+        return np.flatnonzero(mask) if candidates is None \
+               else candidates[mask[candidates]]
+
+      postings = [allPostings[v] for v in set(acceptedValues)
+                  if v in allPostings]
+      if candidates is not None:
+        selected = np.zeros(len(candidates), dtype=bool)
+        for posting in postings:
+          positions = np.searchsorted(posting, candidates)
+          np.minimum(positions, len(posting) - 1, out=positions)
+          selected |= posting[positions] == candidates
+
+        return candidates[selected]
+
+      if len(postings) == 1:
+        return postings[0]
+
+      return np.sort(np.concatenate(postings)) if postings \
+             else np.zeros(0, dtype=np.intp)
+
+    def __makePostings(self):
+      """
+      :return: ascending positions of every value (or False if the values
+               can not be sorted) and its size in bytes
+      :rtype: ({value: numpy.ndarray, ...} or False, int)
+      """
+      try:
+        distinct, codes = np.unique(self.__values, return_inverse=True)
+
+      except TypeError:
+        return False, 0
+
+      order = np.argsort(codes, kind='mergesort')
+      bounds = np.searchsorted(codes[order], np.arange(len(distinct) + 1))
+      postings = dict((value, order[first:last])
+                      for value, first, last in zip(distinct.tolist(),
+                                                    bounds[:-1].tolist(),
+                                                    bounds[1:].tolist()))
+      return postings, order.nbytes
+
+    def __makeSortedIndex(self):
+      """
+      :return: ascending values with their positions (or False if the
+               values can not be sorted) and its size in bytes
+      :rtype: ((numpy.ndarray, numpy.ndarray) or False, int)
+      """
+      try:
+        order = np.argsort(self.__values, kind='mergesort')
+
+      except TypeError:
+        return False, 0
+
+      values = self.__values[order]
+      return (order, values), order.nbytes + values.nbytes
+
+    def __getIntervalIndices(self, interval):
+      index = self.__getCached(('sorted',), self.__makeSortedIndex)
+      if index is False: # values not sortable
+        return np.flatnonzero(interval(self.__values))
+
+      order, values = index
+      first = 0
+      if interval.lower is not None:
+        first = np.searchsorted(values, interval.lower, side='left')
+
+      last = len(values)
+      if interval.upper is not None:
+        last = np.searchsorted(values, interval.upper, side='left')
+
+      return np.sort(order[first:last])
 
     def getMask(self, selector):
       """
@@ -204,42 +554,204 @@ class ObjectBase(object):
       return sum(masks[1:], masks[0])
 
     def __getMasksMatchingValue(self, value):
-      try:
-        return self.__cachedMasks[value]
+      return self.__getCached(('mask', value),
+                              lambda: self.__makeMask(value))
 
-      except KeyError:
-        return self.__makeAndCacheMask(value)
-
-    def __makeAndCacheMask(self, value):
+    def __makeMask(self, value):
       mask = self.__values == value
-      self.__cachedMasks[value] = mask
-      return mask
+      return mask, np.size(mask)
+
 
+  __tokens = count()
 
-  def __init__(self, converters={}):
+  def __init__(self, converters={}, cache=None):
     """
+    :param cache: a cache of converted attribute values, masks and indexes
+                  (a private one if None)
+    :type cache: :py:class:`LRUCache` or None
     """
-    self.__objects = np.array([], dtype=object)
-    self.__cachedMaskManagers = {}
+    self.__buffer = np.empty(0, dtype=object)
+    self.__size = 0
+    self.__pending = []
+    self.__cache = cache if cache is not None else LRUCache()
+    self.__token = next(self.__tokens)
     self.__converters = dict(converters)
 
+  @property
+  def __objects(self):
+    return self.__buffer[:self.__size]
+
   def __len__(self):
-    return len(self.__objects)
+    self.__materialize()
+    return self.__size
 
   def put(self, objects):
-    self.__objects = np.append(self.__objects,
-                               objects if isinstance(objects, Sequence) else list(objects))
-    self.__cachedMaskManagers.clear()
+    if self.__pending:
+      objects = objects if isinstance(objects, Sequence) else list(objects)
+      self.__pending.append(lambda: objects)
+      return
+
+    self.__append(objects)
 
-  def get(self, filters=None):
-    return list(self.__getFilteredObjects(filters))
+  def __append(self, objects):
+    """
+    The buffer capacity is doubled when exceeded, so appending is amortized
+    O(1) per object.
+
+    >>> ob = ObjectBase()
+    >>> for i in range(100):
+    ...   ob.put([i, -i])
+    >>> len(ob)
+    200
+
+    >>> ob.get()[-4:]
+    [98, -98, 99, -99]
+    """
+    objects = objects if isinstance(objects, Sequence) else list(objects)
+    size = self.__size + len(objects)
+    if size > len(self.__buffer):
+      buffer = np.empty(max(size, 2 * len(self.__buffer)), dtype=object)
+      buffer[:self.__size] = self.__objects
+      self.__buffer = buffer
+
+    self.__buffer[self.__size:size] = objects
+    self.__size = size
+    self.__cache.discard(self.__token)
+    self.__token = next(self.__tokens)
+
+  def putLazy(self, objectsFactory):
+    """
+    Put objects to be created (by a call of objectsFactory) not until they
+    are necessary.
+    """
+    self.__pending.append(objectsFactory)
 
-  def __getFilteredObjects(self, filters):
-    if filters:
-      return self.__objects[self.__getProductOfMasks(filters)]
+  def __materialize(self):
+    while self.__pending:
+      self.__append(self.__pending.pop(0)())
+
+  def getMaterialized(self):
+    """
+    :return: objects already created
+    """
+    return list(self.__objects)
+
+  def get(self, filters=None, start=None, stop=None, order=None):
+    """
+    :param start: position (among selected objects) of the first object
+                  returned
+    :param stop: position (among selected objects) the returned objects end
+                 before
+    :param order: attributes the selected objects are (stably) sorted by
+    :type order: str or sequence of str or None
+
+    >>> ob = ObjectBase()
+    >>> ob.put([ClassA(i, i % 2) for i in range(10)])
+    >>> ob.get({}, 2, 4)
+    [ClassA(a=2, b=0), ClassA(a=3, b=1)]
+
+    >>> ob.get({'b': [1]}, 1, 3)
+    [ClassA(a=3, b=1), ClassA(a=5, b=1)]
+
+    Sort permutations are cached, so ordered results come without sorting
+    the objects by a Python key function:
+
+    >>> ob.get({'a': Interval(4)}, order=('b', 'a'), stop=4)
+    [ClassA(a=4, b=0), ClassA(a=6, b=0), ClassA(a=8, b=0), ClassA(a=5, b=1)]
+
+    >>> ob = ObjectBase()
+    >>> ob.put([ClassA(None, 1), ClassA(2, 2), ClassA(1, 3)])
+    >>> ob.get({'b': [2, 3]}, order='a')
+    [ClassA(a=1, b=3), ClassA(a=2, b=2)]
+    """
+    return list(self.__getFilteredObjects(filters, order)[start:stop])
+
+  def __getFilteredObjects(self, filters, order=None):
+    self.__materialize()
+    selected = self.__select(filters) if filters else slice(None)
+    if order is None:
+      return self.__objects[selected]
+
+    attributeNames = (order,) if isString(order) else tuple(order)
+    permutation = self.__getSortPermutation(attributeNames)
+    if permutation is None: # values not sortable as a whole
+      return sorted(self.__objects[selected],
+                    key=attrgetter(*attributeNames))
+
+    ordering, ranks = permutation
+    if isinstance(selected, slice):
+      return self.__objects[ordering]
+
+    if selected.dtype == bool:
+      selected = np.flatnonzero(selected)
+
+    return self.__objects[selected[np.argsort(ranks[selected])]]
+
+  def __select(self, filters):
+    """
+    :return: ascending indices or a mask of selected objects
+    :rtype: numpy.ndarray
+    """
+    indexed = dict((name, selector) for name, selector in filters.items()
+                   if isinstance(selector, Interval) \
+                      or not hasattr(selector, '__call__'))
+    selectors = dict((name, selector) for name, selector in filters.items()
+                     if name not in indexed)
+    if indexed:
+      indices = self.__getIntersectionOfIndices(indexed)
+      if selectors:
+        indices = indices[self.__getProductOfMasks(selectors)[indices]]
+
+      return indices
+
+    return self.__getProductOfMasks(selectors)
+
+  def __getSortPermutation(self, attributeNames):
+    key = (self.__token, attributeNames, 'order')
+    try:
+      return self.__cache.get(key)
+
+    except KeyError:
+      permutation = self.__makeSortPermutation(attributeNames)
+      nbytes = 0 if permutation is None else 2 * permutation[0].nbytes
+      return self.__cache.put(key, permutation, nbytes)
+
+  def __makeSortPermutation(self, attributeNames):
+    """
+    :return: indices of objects in the order of the attributes and ranks
+             of the objects in the order (or None if the attribute values
+             can not be sorted)
+    :rtype: (numpy.ndarray, numpy.ndarray) or None
+    """
+    keys = np.empty(self.__size, dtype=object)
+    for i, key in enumerate(self.getAttributes(*attributeNames)):
+      keys[i] = key
+
+    try:
+      ordering = np.argsort(keys, kind='mergesort')
+
+    except TypeError:
+      return None
+
+    ranks = np.empty_like(ordering)
+    ranks[ordering] = np.arange(len(ordering))
+    return ordering, ranks
+
+  def __getIntersectionOfIndices(self, selectors):
+    """
+    Intervals and accepted values are resolved with indexes, so the cost
+    depends on the number of selected objects rather than all of them.
+    Intervals (usually the narrowest selectors) are resolved first and
+    the remaining selectors are checked for the objects selected so far.
+    """
+    indices = None
+    for attributeName, selector in sorted(selectors.items(),
+                                          key=lambda item: not isinstance(item[1], Interval)):
+      indices = self.__getMaskManager(attributeName).getIndices(selector,
+                                                                indices)
+
+    return indices
 
-    return self.__objects
-      
   def __getProductOfMasks(self, selectors):
     mask = True
     for attributeName, selector in selectors.items():
@@ -251,13 +763,20 @@ class ObjectBase(object):
     return self.__getMaskManager(attributeName).getMask(selector)
 
   def __getMaskManager(self, attributeName):
+    key = (self.__token, attributeName)
     try:
-      return self.__cachedMaskManagers[attributeName]
+      return self.__cache.get(key)
 
     except KeyError:
-      maskManager = self.MaskManager(self.__getConvertedAttributeValues(attributeName))
-      self.__cachedMaskManagers[attributeName] = maskManager
-      return maskManager
+      maskManager = self.MaskManager(self.__getConvertedAttributeValues(attributeName),
+                                     self.__cache, key)
+      return self.__cache.put(key, maskManager, maskManager.nbytes)
+
+  def getCacheStats(self):
+    """
+    :return: statistics of the cache (see :py:meth:`LRUCache.getStats`)
+    """
+    return self.__cache.getStats()
 
   def __getConvertedAttributeValues(self, attributeName):
     attributeValues = self.getAttributes(attributeName)
@@ -293,6 +812,7 @@ class ObjectBase(object):
     >>> ob.getAttributes('a')
     [ClassB(c=1, d=2)]
     """
+    self.__materialize()
     # XXX: Python3 fix
     return list(map(attrgetter(*attributeNames), self.__objects))
 
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2012-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+"""
+Detection of temporal overlaps and of duplicated rows of merged data sources.
+"""
+
+import heapq
+from datetime import timedelta
+
+import numpy as np
+
+from ._Ens import Ens
+from ._Tools import EPOCH_UTC
+
+# dependence tracking
+from . import _dependencies, _Ens, _Tools
+import types
+__dependencies__ = _dependencies.moduleDependencies(*[x for x in globals().values()
+                                                      if isinstance(x, types.ModuleType)])
+
+
+def _toDatetime(microseconds):
+  return EPOCH_UTC + timedelta(microseconds=microseconds)
+
+
+_GOLDEN_GAMMA = np.uint64(0x9e3779b97f4a7c15)
+_MIX_1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX_2 = np.uint64(0x94d049bb133111eb)
+
+
+def _mix(x):
+  """
+  The finalizer of the SplitMix64 generator (a bijection of 64-bit integers).
+  """
+  x = (x ^ (x >> np.uint64(30))) * _MIX_1
+  x = (x ^ (x >> np.uint64(27))) * _MIX_2
+  return x ^ (x >> np.uint64(31))
+
+
+class OverlapIndex(object):
+  """
+  An index of visits of data sources (their cages, corners, animals and
+  time spans) reporting where the sources overlap in time.
+
+  All reports are made in O(n log n) time (plus the size of the report).
+
+  >>> index = OverlapIndex()
+  >>> index.addVisits(['a.zip'] * 3, cages=[1, 1, 2], corners=[1, 2, 1],
+  ...                 animals=['Minnie', 'Mickey', 'Jerry'],
+  ...                 starts=[0, 10, 20], ends=[5, 15, 25], lines=[1, 2, 3])
+  >>> index.addSourceVisits('b.zip', cages=[1, 1], corners=[2, 3],
+  ...                       animals=['Mickey', 'Minnie'],
+  ...                       starts=[10, 13], ends=[15, 30], lines=[1, 2])
+
+  >>> for overlap in index.getSourceOverlaps():
+  ...   print('%s %s %s' % (overlap.sources,
+  ...                       overlap.start.microsecond, overlap.end.microsecond))
+  ('a.zip', 'b.zip') 10 25
+
+  >>> for overlap in index.getCageOverlaps():
+  ...   print('%d %s %s %s' % (overlap.cage, sorted(overlap.sources),
+  ...                          overlap.start.microsecond, overlap.end.microsecond))
+  1 ['a.zip', 'b.zip'] 10 15
+
+  >>> for duplicate in index.getDuplicateVisits():
+  ...   print('%s %s' % (duplicate.animal, duplicate.visits))
+  Mickey (('a.zip', 2), ('b.zip', 1))
+  """
+  def __init__(self):
+    self.__sources = []
+    self.__sourceIds = {}
+    self.__chunks = []
+
+  def addVisits(self, sources, cages, corners, animals, starts, ends, lines):
+    """
+    :param sources: sources of the visits
+    :param cages: cages of the visits
+    :param corners: corners of the visits
+    :param animals: names of animals of the visits
+    :param starts: starts of the visits (in microseconds since the epoch)
+    :param ends: ends of the visits (in microseconds since the epoch)
+    :param lines: line numbers of the visits in their sources
+    """
+    self.__addChunk(np.array([self.__getSourceId(s) for s in sources],
+                             dtype=np.intp),
+                    cages, corners, animals, starts, ends, lines)
+
+  def addSourceVisits(self, source, cages, corners, animals, starts, ends,
+                      lines):
+    """
+    Add visits of a single source (see :py:meth:`addVisits`).
+
+    :param source: the source of all the visits
+    """
+    self.__addChunk(np.full(len(cages), self.__getSourceId(source),
+                            dtype=np.intp),
+                    cages, corners, animals, starts, ends, lines)
+
+  def __addChunk(self, sids, cages, corners, animals, starts, ends, lines):
+    self.__chunks.append((sids.reshape(-1),
+                          np.array(cages, dtype=np.int64).reshape(-1),
+                          np.array(corners, dtype=np.int64).reshape(-1),
+                          np.array(animals, dtype=object).reshape(-1),
+                          np.array(starts, dtype=np.int64).reshape(-1),
+                          np.array(ends, dtype=np.int64).reshape(-1),
+                          np.array(lines, dtype=np.int64).reshape(-1)))
+
+  def __getSourceId(self, source):
+    try:
+      return self.__sourceIds[source]
+
+    except KeyError:
+      self.__sourceIds[source] = len(self.__sources)
+      self.__sources.append(source)
+      return self.__sourceIds[source]
+
+  def __getVisits(self):
+    if len(self.__chunks) != 1:
+      chunks = list(zip(*self.__chunks))
+      if not chunks:
+        chunks = [[np.zeros(0, dtype=np.int64)]] * 7
+
+      self.__chunks = [tuple(np.concatenate(chunk) for chunk in chunks)]
+
+    return self.__chunks[0]
+
+  def getSourceOverlaps(self):
+    """
+    :return: pairs of sources (ordered as added) whose time spans (from the
+             earliest start to the latest end of their visits) overlap, and
+             the overlapping ranges
+    :rtype: [Ens(sources=(source, source), start=datetime, end=datetime), ...]
+    """
+    sids, _, _, _, starts, ends, _ = self.__getVisits()
+    if len(sids) == 0:
+      return []
+
+    spanStarts = np.full(len(self.__sources), np.iinfo(np.int64).max)
+    spanEnds = np.full(len(self.__sources), np.iinfo(np.int64).min)
+    np.minimum.at(spanStarts, sids, starts)
+    np.maximum.at(spanEnds, sids, ends)
+
+    overlaps = []
+    active = [] # heap of (end, source ID) of spans started so far
+    for sid in np.argsort(spanStarts, kind='mergesort').tolist():
+      start, end = int(spanStarts[sid]), int(spanEnds[sid])
+      if start > end: # no visits of the source
+        continue
+
+      while active and active[0][0] <= start:
+        heapq.heappop(active)
+
+      for otherEnd, other in active:
+        overlaps.append(Ens(sources=tuple(self.__sources[i]
+                                          for i in sorted([sid, other])),
+                            start=_toDatetime(start),
+                            end=_toDatetime(min(end, otherEnd))))
+
+      heapq.heappush(active, (end, sid))
+
+    return overlaps
+
+  def getCageOverlaps(self):
+    """
+    :return: maximal time ranges in which visits of different sources
+             overlap in the same cage, and the overlapping sources
+    :rtype: [Ens(cage=int, sources=frozenset, start=datetime, end=datetime),
+             ...]
+    """
+    sids, cages, _, _, starts, ends, _ = self.__getVisits()
+    overlaps = []
+    order = np.lexsort((starts, cages))
+    visits = zip(cages[order].tolist(), sids[order].tolist(),
+                 starts[order].tolist(), ends[order].tolist())
+    currentCage = None
+    for cage, sid, start, end in visits:
+      if cage != currentCage:
+        currentCage = cage
+        latest = []
+
+      # all visits processed so far started before the visit, so it
+      # overlaps them until the latest end of visits of another source
+      other = [(e, s) for (e, s) in latest if s != sid]
+      if other and other[0][0] > start:
+        self.__appendRange(overlaps, cage, set([sid, other[0][1]]),
+                           start, min(end, other[0][0]))
+
+      latest = self.__updateLatestEnds(latest, end, sid)
+
+    return [Ens(cage=cage, sources=frozenset(self.__sources[i] for i in sids),
+                start=_toDatetime(start), end=_toDatetime(end))
+            for cage, sids, start, end in overlaps]
+
+  @staticmethod
+  def __updateLatestEnds(latest, end, sid):
+    """
+    :param latest: the latest ends of visits of (at most) two distinct
+                   sources (in descending order); other sources are never
+                   needed to find the latest end of a source other than
+                   the given one
+    :type latest: [(int, int), ...]
+    """
+    ends = dict((s, e) for (e, s) in latest)
+    ends[sid] = max(end, ends.get(sid, end))
+    return sorted(((e, s) for (s, e) in ends.items()), reverse=True)[:2]
+
+  @staticmethod
+  def __appendRange(ranges, cage, sids, start, end):
+    if ranges:
+      lastCage, lastSids, lastStart, lastEnd = ranges[-1]
+      if lastCage == cage and start <= lastEnd:
+        ranges[-1] = (cage, lastSids | sids, lastStart, max(end, lastEnd))
+        return
+
+    ranges.append((cage, sids, start, end))
+
+  def getDuplicateVisits(self):
+    """
+    :return: groups of visits of the same animal to the same corner of the
+             same cage with the same start and end, and sources and line
+             numbers of the visits
+    :rtype: [Ens(cage=int, corner=int, animal=unicode, start=datetime,
+                 end=datetime, visits=((source, line), ...)), ...]
+    """
+    sids, cages, corners, animals, starts, ends, lines = self.__getVisits()
+    if len(sids) == 0:
+      return []
+
+    _, animalCodes = np.unique(animals, return_inverse=True)
+    order = np.lexsort((lines, sids, ends, starts, animalCodes, corners, cages))
+    keys = [cages[order], corners[order], animalCodes[order],
+            starts[order], ends[order]]
+    sameAsPrevious = np.ones(len(order) - 1, dtype=bool)
+    for key in keys:
+      sameAsPrevious &= key[1:] == key[:-1]
+
+    edges = np.diff(np.concatenate([[0], sameAsPrevious.astype(np.int8), [0]]))
+    duplicates = []
+    for first, last in zip(np.flatnonzero(edges == 1).tolist(),
+                           np.flatnonzero(edges == -1).tolist()):
+      group = order[first:last + 1]
+      i = group[0]
+      duplicates.append(Ens(cage=int(cages[i]), corner=int(corners[i]),
+                            animal=animals[i],
+                            start=_toDatetime(int(starts[i])),
+                            end=_toDatetime(int(ends[i])),
+                            visits=tuple((self.__sources[s], l)
+                                         for s, l in zip(sids[group].tolist(),
+                                                         lines[group].tolist()))))
+
+    return duplicates
+
+
+class FingerprintSet(object):
+  """
+  Fingerprints (64-bit hashes) of rows of tables of merged data sources,
+  used to drop rows which have been already merged.
+
+  Fields other than timepoints are interned, so they are hashed by their
+  (Python) values, no matter how they are represented in a source.
+
+  >>> fingerprints = FingerprintSet()
+  >>> first = fingerprints.makeFingerprints([fingerprints.intern(['Minnie', 'Mickey']),
+  ...                                        [10, 20]])
+  >>> fingerprints.selectUnseen('Visits', first).tolist()
+  [True, True]
+  >>> second = fingerprints.makeFingerprints([fingerprints.intern(['Mickey', 'Mickey', 'Minnie']),
+  ...                                         [20, 20, 20]])
+  >>> fingerprints.selectUnseen('Visits', second).tolist()
+  [False, False, True]
+  """
+  def __init__(self):
+    self.__ids = {}
+    self.__seen = {}
+
+  def intern(self, values):
+    """
+    :param values: hashable values (e.g. names of animals)
+    :return: identifiers of the values
+    :rtype: numpy.ndarray
+    """
+    ids = self.__ids
+    return np.array([ids.setdefault(value, len(ids)) for value in values],
+                    dtype=np.int64)
+
+  def internColumn(self, column, toList):
+    """
+    Intern values of the column converting only its unique values.
+
+    :param column: values of the column
+    :type column: numpy.ndarray
+
+    :param toList: converts an array of unique values of the column to
+                   a list of values to be interned
+    """
+    unique, inverse = np.unique(column, return_inverse=True)
+    return self.intern(toList(unique))[inverse]
+
+  @staticmethod
+  def makeFingerprints(fields):
+    """
+    :param fields: interned fields (or timepoints in microseconds since the
+                   epoch) of the rows
+    :type fields: [numpy.ndarray, ...]
+
+    :rtype: numpy.ndarray
+    """
+    fields = [np.asarray(field, dtype=np.int64).astype(np.uint64)
+              for field in fields]
+    fingerprints = np.zeros(len(fields[0]), dtype=np.uint64)
+    for field in fields:
+      fingerprints = _mix((fingerprints + _GOLDEN_GAMMA) ^ _mix(field))
+
+    return fingerprints.view(np.int64)
+
+  def selectUnseen(self, table, fingerprints):
+    """
+    Select rows not seen before and remember fingerprints of all rows.
+
+    :param table: name of the table of the rows (e.g. 'Visits')
+
+    :return: mask of rows whose fingerprints have not been seen (in
+             previous calls for the table)
+    :rtype: numpy.ndarray
+    """
+    seen = self.__seen.get(table, np.zeros(0, dtype=np.int64))
+    selected = ~_isInSorted(seen, fingerprints)
+    # only the new fingerprints are sorted; they are merged into the
+    # (sorted) fingerprints seen before in linear time
+    unseen = np.unique(fingerprints[selected])
+    self.__seen[table] = np.insert(seen, np.searchsorted(seen, unseen), unseen)
+    return selected
+
+
+def _isInSorted(sortedArray, values):
+  """
+  >>> _isInSorted(np.array([2, 3, 5]), np.array([1, 2, 4, 5, 6])).tolist()
+  [False, True, False, True, False]
+  >>> _isInSorted(np.array([], dtype=int), np.array([1])).tolist()
+  [False]
+  """
+  if len(sortedArray) == 0:
+    return np.zeros(len(values), dtype=bool)
+
+  positions = np.searchsorted(sortedArray, values)
+  return sortedArray[np.minimum(positions, len(sortedArray) - 1)] == values
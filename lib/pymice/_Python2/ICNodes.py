@@ -24,7 +24,8 @@
 ###############################################################################
 
 from .._ICNodesBase import (BaseNodeMetaclass, BaseNode_del_,
-                            VisitMetaclass, DurationAware, getTimeString)
+                            VisitMetaclass, DurationAware, getTimeString,
+                            LazyNosepokes)
 
 # dependence tracking
 from .. import _ICNodesBase, _dependencies
@@ -71,7 +72,7 @@ class Visit(BaseNode, DurationAware):
     self.___source = _source
     self.___line = _line
     self.__Nosepokes = Nosepokes
-    if Nosepokes is not None:
+    if Nosepokes is not None and not isinstance(Nosepokes, LazyNosepokes):
       for nosepoke in Nosepokes:
         nosepoke._bindToVisit(self)
 
@@ -80,7 +81,7 @@ class Visit(BaseNode, DurationAware):
     animal = animalManager[self.__Animal]
     cage = cageManager[self.__Cage]
     corner = cage[self.__Corner]
-    nosepokes = tuple(n.clone(sourceManager, corner) for n in self.__Nosepokes) if self.__Nosepokes is not None else None
+    nosepokes = tuple(n.clone(sourceManager, corner) for n in self.Nosepokes) if self.__Nosepokes is not None else None
     return self.__class__(self.__Start, corner, animal,
                           self.__End, self.__Module, cage,
                           self.__CornerCondition, self.__PlaceError,
@@ -90,7 +91,7 @@ class Visit(BaseNode, DurationAware):
                           self.___line, nosepokes)
 
   def _del_(self):
-    if self.__Nosepokes:
+    if self.__Nosepokes and not isinstance(self.__Nosepokes, LazyNosepokes):
       for nosepoke in self.__Nosepokes:
         nosepoke._del_()
 
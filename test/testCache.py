@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2015-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+  import cPickle as pickle
+
+except ImportError:
+  import pickle
+
+import pymice._Cache
+from pymice._Cache import ArchiveCache
+
+
+class TestArchiveCache(unittest.TestCase):
+  FLAGS = (True, False, False, False)
+
+  def setUp(self):
+    self.cacheDir = tempfile.mkdtemp()
+    self.cache = ArchiveCache(os.path.join(self.cacheDir, 'cache'))
+    self.dataFile = self.writeDataFile('data.zip', b'data')
+    self.parsed = []
+
+  def tearDown(self):
+    shutil.rmtree(self.cacheDir)
+
+  def testFirstGetParses(self):
+    self.assertEqual({'data': 1}, self.get())
+    self.assertEqual(1, len(self.parsed))
+
+  def testSecondGetDoesNotParse(self):
+    self.get()
+    self.assertEqual({'data': 1}, self.get())
+    self.assertEqual(1, len(self.parsed))
+
+  def testDifferentFlagsParse(self):
+    self.get()
+    self.get(flags=(True, True, False, False))
+    self.assertEqual(2, len(self.parsed))
+
+  def testChangedFileParses(self):
+    self.get()
+    self.writeDataFile('data.zip', b'other data')
+    self.assertEqual({'data': 2}, self.get())
+
+  def testSameContentDoesNotParse(self):
+    self.get()
+    self.assertEqual({'data': 1},
+                     self.get(fname=self.writeDataFile('copy.zip', b'data')))
+    self.assertEqual(1, len(self.parsed))
+
+  def testDirectoryDataFile(self):
+    dataDir = os.path.join(self.cacheDir, 'data')
+    os.mkdir(dataDir)
+    self.writeDataFile(os.path.join('data', 'Visits.txt'), b'visits')
+    self.get(fname=dataDir)
+    self.get(fname=dataDir)
+    self.assertEqual(1, len(self.parsed))
+    self.writeDataFile(os.path.join('data', 'Visits.txt'), b'changed')
+    self.get(fname=dataDir)
+    self.assertEqual(2, len(self.parsed))
+
+  def testSnapshotOfChangedFileIsEvicted(self):
+    self.get()
+    self.writeDataFile('data.zip', b'other data')
+    self.get()
+    self.assertEqual(1, len(self.listSnapshots()))
+    self.writeDataFile('data.zip', b'data')
+    self.assertEqual({'data': 3}, self.get())
+    self.assertEqual(1, len(self.listSnapshots()))
+
+  def testSnapshotsOfFlagsAreNotEvicted(self):
+    self.get()
+    self.get(flags=(True, True, False, False))
+    self.assertEqual(2, len(self.listSnapshots()))
+
+  def testSnapshotStoresFormatVersion(self):
+    self.get()
+    snapshot, = self.listSnapshots()
+    with open(snapshot, 'rb') as fh:
+      version, parsed = pickle.load(fh)
+
+    self.assertEqual((ArchiveCache.FORMAT_VERSION, pymice._Cache.VERSION),
+                     version)
+
+  def testCorruptedSnapshotIsReplaced(self):
+    self.get()
+    self.overwriteSnapshot(b'corrupted')
+    self.assertEqual({'data': 2}, self.get())
+    self.assertEqual({'data': 2}, self.get())
+
+  def testStaleSnapshotIsReplaced(self):
+    self.get()
+    self.overwriteSnapshot(pickle.dumps(((ArchiveCache.FORMAT_VERSION - 1,
+                                          pymice._Cache.VERSION),
+                                         {'data': 'stale'})))
+    self.assertEqual({'data': 2}, self.get())
+    self.assertEqual(1, len(self.listSnapshots()))
+
+  def testSnapshotOfOtherLibraryVersionIsReplaced(self):
+    self.get()
+    version = pymice._Cache.VERSION
+    pymice._Cache.VERSION = version + '.post1'
+    try:
+      self.assertEqual({'data': 2}, self.get())
+      self.assertEqual({'data': 2}, self.get())
+
+    finally:
+      pymice._Cache.VERSION = version
+
+    self.assertEqual({'data': 3}, self.get())
+    self.assertEqual(1, len(self.listSnapshots()))
+
+  def get(self, fname=None, flags=FLAGS):
+    return self.cache.get(self.dataFile if fname is None else fname,
+                          flags, self.parse)
+
+  def parse(self):
+    self.parsed.append(None)
+    return {'data': len(self.parsed)}
+
+  def writeDataFile(self, name, content):
+    path = os.path.join(self.cacheDir, name)
+    with open(path, 'wb') as fh:
+      fh.write(content)
+
+    return path
+
+  def listSnapshots(self):
+    cacheDir = os.path.join(self.cacheDir, 'cache')
+    return [os.path.join(cacheDir, f) for f in os.listdir(cacheDir)
+            if f.endswith('.pickle')]
+
+  def overwriteSnapshot(self, content):
+    snapshots = self.listSnapshots()
+    self.assertEqual(1, len(snapshots))
+    with open(snapshots[0], 'wb') as fh:
+      fh.write(content)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -24,9 +24,15 @@
 ###############################################################################
 
 import unittest
+import csv
 from sys import getrefcount
 
-from pymice._cymice import emptyStringToNone
+import numpy as np
+
+from pymice._cymice import (emptyStringToNone, timestampsToMicroseconds,
+                            tokenizeColumns)
+from pymice._Columns import (_npTimestampsToMicroseconds,
+                             INT8, INT, FLOAT, STRING, TIME)
 
 class TestEmptyStringToNone(unittest.TestCase):
   def testEmptyList(self):
@@ -87,5 +93,89 @@ class TestEmptyStringToNone(unittest.TestCase):
     self.assertEqual(listOut, after)
     return listOut
 
+
+class TestTimestampsToMicroseconds(unittest.TestCase):
+  def testEmptyList(self):
+    self.assertEqual([], timestampsToMicroseconds([]).tolist())
+
+  def testSameAsNumPy(self):
+    timestamps = ['1970-01-01 00:00:00',
+                  '1970-01-02 00:00:01.5',
+                  '1970-01-01 01:01',
+                  '1969-12-31 23:59:59.999',
+                  '2000-02-29 12:30:02.360',
+                  '2012-12-18 12:30:02.36',
+                  '1600-03-01 00:00:00.000001']
+    result = timestampsToMicroseconds(timestamps)
+    self.assertEqual('int64', result.dtype.name)
+    self.assertEqual(_npTimestampsToMicroseconds(timestamps).tolist(),
+                     result.tolist())
+
+  def testUnicode(self):
+    self.assertEqual([1000000],
+                     timestampsToMicroseconds([u'1970-01-01 00:00:01']).tolist())
+
+  def testInvalidTimestamps(self):
+    for timestamp in ['', '2012-12-18', '2012-13-01 00:00', '2012--12 00:00',
+                      '2012-12-18 12:30:02.3.4', '2012-12-18 12:30:0x',
+                      '2012-02-31 00:00', '2012-04-31 00:00', '2011-02-29 00:00',
+                      '1900-02-29 00:00']:
+      self.assertRaises(ValueError,
+                        lambda: timestampsToMicroseconds([timestamp]))
+
+  def testNotList(self):
+    self.assertRaises(TypeError, lambda: timestampsToMicroseconds(()))
+
+
+class TestTokenizeColumns(unittest.TestCase):
+  KINDS = [INT8, INT, FLOAT, STRING, TIME, None]
+
+  def testEmptyList(self):
+    columns = self.tokenize([])
+    self.assertEqual([[], [], [], [], [], None],
+                     [c.tolist() if c is not None else None for c in columns])
+
+  def testSameAsPython(self):
+    self.checkSameAsPython([u'1\t-12\t1,5\tabc\t2012-12-18 12:30:02.36\tx\n',
+                            u'\t+7\t\t\t1970-01-01 00:00\t\r\n',
+                            u'-128\t1234567890123456789\t 2.25 \t \t1969-12-31 23:59:59.999\t\n',
+                            u'0\t 3\t1e3\tżółw\t2000-02-29 00:00:00\t'])
+
+  def testBytes(self):
+    columns = self.tokenize([b'1\t2\t3,5\tabc\t1970-01-01 00:00:02\tx\n'])
+    self.assertEqual([[1], [2], [3.5], [b'abc'], [2000000], None],
+                     [c.tolist() if c is not None else None for c in columns])
+
+  def testQuotesLeftToCsv(self):
+    self.assertIsNone(self.tokenize([u'1\t2\t3\t"a"\t2012-12-18 12:30\tx\n']))
+
+  def testWrongNumberOfFieldsLeftToCsv(self):
+    self.assertIsNone(self.tokenize([u'1\t2\t3\ta\t2012-12-18 12:30\n']))
+    self.assertIsNone(self.tokenize([u'1\t2\t3\ta\t2012-12-18 12:30\tx\ty\n']))
+    self.assertIsNone(self.tokenize([u'\n']))
+
+  def testInvalidValues(self):
+    for line in [u'x\t2\t3\ta\t2012-12-18 12:30\tx\n',
+                 u'1\t2\t3x\ta\t2012-12-18 12:30\tx\n',
+                 u'1\t2\t3\ta\t2012-12-18\tx\n',
+                 u'1\t2\t3\ta\t\tx\n']:
+      self.assertRaises(ValueError, lambda: self.tokenize([line]))
+
+  def checkSameAsPython(self, lines):
+    rows = list(csv.reader(lines, delimiter='\t'))
+    for kind, values, column in zip(self.KINDS, zip(*rows), self.tokenize(lines)):
+      if kind is None:
+        self.assertIsNone(column)
+
+      else:
+        self.assertEqual(kind.toList(kind.fromStrings(values)),
+                         kind.toList(column.astype(kind.dtype)))
+
+  def tokenize(self, lines):
+    return tokenizeColumns(lines,
+                           [k.typeCode if k is not None else None for k in self.KINDS],
+                           [getattr(k, 'null', None) for k in self.KINDS])
+
+
 if __name__ == '__main__':
   unittest.main()
\ No newline at end of file
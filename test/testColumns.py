@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2015-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+import unittest
+import pickle
+from io import StringIO
+from datetime import datetime
+
+from pytz import utc, timezone, FixedOffset
+
+import numpy as np
+
+from pymice._Columns import (timeStringToMicroseconds, readColumnTable,
+                             _npTimestampsToMicroseconds,
+                             INT8, INT, FLOAT, STRING, CATEGORY, TIME)
+
+cet = timezone('Etc/GMT-1')
+
+
+class TestTimeStringToMicroseconds(unittest.TestCase):
+  def testEpoch(self):
+    self.assertEqual(0, timeStringToMicroseconds('1970-01-01 00:00:00'))
+
+  def testFractionOfSecond(self):
+    self.assertEqual(1234000,
+                     timeStringToMicroseconds('1970-01-01 00:00:01.234'))
+
+  def testBeforeEpoch(self):
+    self.assertEqual(-1000000,
+                     timeStringToMicroseconds('1969-12-31 23:59:59'))
+
+  def testNoSeconds(self):
+    self.assertEqual((181 * 24 + 1) * 3600000000,
+                     timeStringToMicroseconds('1970-07-01 01:00'))
+
+
+class TestNpTimestampsToMicroseconds(unittest.TestCase):
+  def testEmptyList(self):
+    self.assertEqual([], _npTimestampsToMicroseconds([]).tolist())
+
+  def testIso(self):
+    self.checkTimestamps(['1970-01-01 00:00:01.234', '1969-12-31 23:59:59',
+                          '1970-07-01 01:00'])
+
+  def testNotZeroPadded(self):
+    self.checkTimestamps(['2012-1-8 2:03:04.5'])
+
+  def checkTimestamps(self, timestamps):
+    result = _npTimestampsToMicroseconds(timestamps)
+    self.assertEqual(np.int64, result.dtype)
+    self.assertEqual([timeStringToMicroseconds(t) for t in timestamps],
+                     result.tolist())
+
+
+class TestColumnKinds(unittest.TestCase):
+  def testInt8(self):
+    array = INT8.fromStrings(['4', '', '-3'])
+    self.assertEqual(np.int8, array.dtype)
+    self.assertEqual([4, None, -3], INT8.toList(array))
+
+  def testInt(self):
+    array = INT.fromStrings(['12345678901', ''])
+    self.assertEqual(np.int64, array.dtype)
+    self.assertEqual([12345678901, None], INT.toList(array))
+
+  def testFloat(self):
+    array = FLOAT.fromStrings(['0,075', '', '1.5'])
+    self.assertEqual([0.075, None, 1.5], FLOAT.toList(array))
+
+  def testString(self):
+    self.assertEqual(['a', None], STRING.toList(STRING.fromStrings(['a', ''])))
+
+  def testCategory(self):
+    array = CATEGORY.fromStrings(['Info', '', 'Info', None])
+    self.assertEqual(np.int32, array.dtype)
+    self.assertEqual(['Info', None, 'Info', None], CATEGORY.toList(array))
+    self.assertEqual([True, False, True, False],
+                     CATEGORY.equals(array, 'Info').tolist())
+
+  def testCategoryStringsAreInterned(self):
+    first, second = CATEGORY.toList(CATEGORY.fromStrings([u'Warning',
+                                                          u'Warn' + u'ing']))
+    self.assertIs(first, second)
+    self.assertIs(first, CATEGORY.intern(u''.join([u'Warn', u'ing'])))
+
+  def testTime(self):
+    array = TIME.fromStrings(['2012-12-18 12:30:02.360'])
+    self.assertEqual(np.int64, array.dtype)
+    self.assertEqual([datetime(2012, 12, 18, 12, 30, 2, 360000)],
+                     TIME.toList(array))
+
+
+class TestReadColumnTable(unittest.TestCase):
+  KINDS = {'Cage': INT8, 'Start': TIME, 'Name': STRING}
+
+  def testEmptyFile(self):
+    self.assertIsNone(readColumnTable(StringIO(u''), self.KINDS))
+
+  def testHeaderOnly(self):
+    table = readColumnTable(StringIO(u'Cage\tStart\tOther\n'), self.KINDS)
+    self.assertEqual(0, table.rowCount)
+    self.assertEqual(['Cage', 'Start'], sorted(table))
+
+  def testUndeclaredColumnsAreSkipped(self):
+    table = self.readTable()
+    self.assertEqual(['Cage', 'Name', 'Start'], sorted(table))
+    self.assertEqual(2, table.rowCount)
+
+  def testColumnsAreTyped(self):
+    table = self.readTable()
+    self.assertEqual(np.int8, table['Cage'].dtype)
+    self.assertEqual(np.int64, table['Start'].dtype)
+    self.assertIs(INT8, table.getKind('Cage'))
+
+  def testChunked(self):
+    for chunkSize in [1, 2, 3]:
+      self.assertEqual(self.readTable().toPyColumns(),
+                       self.readTable(chunkSize=chunkSize).toPyColumns())
+
+  def testChunkedHeaderOnly(self):
+    table = readColumnTable(StringIO(u'Cage\tStart\tOther\n'), self.KINDS,
+                            chunkSize=2)
+    self.assertEqual(0, table.rowCount)
+    self.assertEqual(np.int8, table['Cage'].dtype)
+
+  def testQuotedFields(self):
+    for chunkSize in [None, 1, 2]:
+      table = readColumnTable(StringIO(u'Cage\tName\n'
+                                       u'1\ta\n'
+                                       u'2\t"b\tc"\n'
+                                       u'3\td\n'), self.KINDS,
+                              chunkSize=chunkSize)
+      self.assertEqual({'Cage': [1, 2, 3],
+                        'Name': ['a', 'b\tc', 'd']},
+                       table.toPyColumns())
+
+  def testNonPositiveChunkSize(self):
+    self.assertRaises(ValueError, lambda: self.readTable(chunkSize=0))
+
+  def testSelect(self):
+    table = self.readTable().select(np.array([False, True]))
+    self.assertEqual({'Cage': [None],
+                      'Name': ['b'],
+                      'Start': [datetime(2012, 12, 18, 12, 0, 1)]},
+                     table.toPyColumns())
+
+  def testTimezones(self):
+    table = self.readTable()
+    table.setTimezones('Start', [utc, cet])
+    self.assertEqual([utc, cet], table.getTimezones('Start'))
+    self.assertEqual([datetime(2012, 12, 18, 12, 0, tzinfo=utc),
+                      datetime(2012, 12, 18, 12, 0, 1, tzinfo=cet)],
+                     table.toPyColumns()['Start'])
+    self.assertEqual([cet], table.select([1]).getTimezones('Start'))
+
+  def testManyTimezones(self):
+    timezones = [FixedOffset(minutes) for minutes in range(-150, 150)]
+    table = readColumnTable(StringIO(u'Start\n' + u'2012-12-18 12:00\n' * len(timezones)),
+                            {'Start': TIME})
+    table.setTimezones('Start', timezones)
+    self.assertEqual(timezones, table.getTimezones('Start'))
+    self.assertEqual([-m * 60000000 for m in range(-150, 150)],
+                     (table.getUtcTimestamps('Start') - table['Start']).tolist())
+
+  def testTimezone(self):
+    table = self.readTable()
+    table.setTimezone('Start', cet)
+    self.assertEqual([cet, cet], table.getTimezones('Start'))
+
+  def testCategoryColumn(self):
+    kinds = {'Cage': INT8, 'Type': CATEGORY}
+    for chunkSize in [None, 1, 2]:
+      for text in [u'Cage\tType\n1\tInfo\n2\t\n3\tInfo\n',
+                   u'Cage\tType\n1\tInfo\n2\t""\n3\t"Info"\n']:
+        table = readColumnTable(StringIO(text), kinds, chunkSize=chunkSize)
+        self.assertEqual(np.int32, table['Type'].dtype)
+        self.assertEqual([u'Info', None, u'Info'],
+                         table.toPyColumns()['Type'])
+        self.assertEqual([True, False, True],
+                         table.equals('Type', u'Info').tolist())
+        self.assertEqual([False, False, False],
+                         table.equals('Type', u'Unknown').tolist())
+
+  def testPickledCategoryColumn(self):
+    table = readColumnTable(StringIO(u'Type\nInfo\nWarning\n'),
+                            {'Type': CATEGORY})
+    table = pickle.loads(pickle.dumps(table, pickle.HIGHEST_PROTOCOL))
+    self.assertEqual([u'Info', u'Warning'], table.toPyColumns()['Type'])
+
+  def testPickledCategoryColumnHasOnlyItsStrings(self):
+    table = readColumnTable(StringIO(u'Type\nInfo\nWarning\nWarning\n'),
+                            {'Type': CATEGORY}).select([1, 2])
+    table = pickle.loads(pickle.dumps(table, pickle.HIGHEST_PROTOCOL))
+    self.assertEqual([1, 1], table['Type'].tolist())
+    first, second = table.toPyColumns()['Type']
+    self.assertEqual(u'Warning', first)
+    self.assertIs(first, second)
+    self.assertEqual([False, False], table.equals('Type', u'Info').tolist())
+
+  def testTablesHaveOwnCategoryPools(self):
+    tables = [readColumnTable(StringIO(u'Type\nInfo\n'), {'Type': CATEGORY})
+              for _ in range(2)]
+    self.assertIsNot(tables[0].getKind('Type'), tables[1].getKind('Type'))
+    self.assertIsNot(CATEGORY, tables[0].getKind('Type'))
+    self.assertEqual([u'Info'], tables[1].toPyColumns()['Type'])
+
+  def readTable(self, chunkSize=None):
+    return readColumnTable(StringIO(u'Cage\tStart\tName\tOther\n'
+                                    u'1\t2012-12-18 12:00:00\ta\tx\n'
+                                    u'\t2012-12-18 12:00:01\tb\ty\n'),
+                           self.KINDS, chunkSize=chunkSize)
+
+
+if __name__ == '__main__':
+  unittest.main()
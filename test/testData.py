@@ -25,6 +25,8 @@
 
 import sys
 import os
+import shutil
+import tempfile
 import unittest
 
 from datetime import datetime, timedelta
@@ -36,7 +38,9 @@ from pymice._ICData import (ZipLoader_v_IntelliCage_Plus_3,
                             ZipLoader_v_version_2_2,
                             Merger, LogEntry, EnvironmentalConditions,
                             AirHardwareEvent, DoorHardwareEvent, LedHardwareEvent,
-                            UnknownHardwareEvent, ICCage, ICCageManager)
+                            UnknownHardwareEvent, ICCage, ICCageManager,
+                            Visit)
+from pymice._ICNodesBase import LazyNosepokes
 from pymice.Data import Data, IntIdentityManager
 
 import minimock
@@ -1414,6 +1418,13 @@ class MergerOnLoadedHw(MergerTest):
     self.assertEqual([u'D2', u'D1'],
                      [h._source for h in mm.getHardwareEvents(order='DateTime')])
 
+  def testSourcesRegistered(self):
+    mm = Merger(self.d1, self.d2, getHw=True)
+    sources = [h._source for h in mm.getHardwareEvents(order='DateTime')]
+    self.assertEqual(sorted(sources), sorted(mm._sourceManager))
+    for source in sources:
+      self.assertIs(mm._sourceManager[source], source)
+
   def testHwFrozen(self):
     mm = Merger(self.d1, self.d2, getHw=True)
     with self.assertRaises(mm.UnableToInsertIntoFrozen):
@@ -1505,6 +1516,37 @@ class LoadLegacyDataTest(LoaderIntegrationTest):
     self.assertSameDT(starts,
                       [v.Start for v in self.data.getVisits(mice='Minnie')])
 
+  def testQueryMiceAndCorners_fromDoctests(self):
+    self.assertEqual([4],
+                     [v.Corner for v in self.data.query('visits',
+                                                        {'Animal.Name': ['Mickey', 'Minnie'],
+                                                         'Corner': slice(2, 5)})])
+
+  def testQueryWithOffsetAndLimit_fromDoctests(self):
+    self.assertEqual([1],
+                     [v.Corner for v in self.data.query('visits',
+                                                        {'Animal.Name': ['Mickey', 'Minnie']},
+                                                        order='Start',
+                                                        offset=1, limit=1)])
+
+  def testQueryPredicates(self):
+    start = datetime(2012, 12, 18, 12, 30, 30, tzinfo=timezone('Etc/GMT-1'))
+    for where, corners in [({}, [4, 1, 2]),
+                           ({'Corner': 2}, [2]),
+                           ({'Corner': {1, 4}}, [4, 1]),
+                           ({'Start': slice(None, start)}, [4]),
+                           ({'Start': Data.Interval(start)}, [1, 2]),
+                           ({'Corner': lambda x: x < 3,
+                             'Start': slice(start, None)}, [1, 2]),
+                           ({'Animal.Name': 'Mickey', 'Corner': 2}, [])]:
+      self.assertEqual(corners,
+                       [v.Corner for v in self.data.query('visits', where,
+                                                          order='Start')])
+
+  def testQueryUnknownTableRaisesValueError(self):
+    with self.assertRaises(ValueError):
+      self.data.query('nosepokes')
+
   def testLickNumberNosepokeAttribute(self):
     self.checkAttrOfNosepokes('LickNumber',
                               [0, 1, 2, 3])
@@ -1517,6 +1559,10 @@ class LoadLegacyDataTest(LoaderIntegrationTest):
     self.checkAttrOfNosepokes('LickContactTime',
                               [None, None, None, None])
 
+  def testLickDurationVisitAttribute(self):
+    self.assertEqual(floatToTimedelta([0, 0.075, 0.375]),
+                     [v.LickDuration for v in self.data.getVisits(order='Start')])
+
 
   def checkAttrOfNosepokes(self, attr, expected):
     self.assertEqual(expected,
@@ -1565,6 +1611,21 @@ class GivenLegacyDataLoadedWithHwData(LoadLegacyDataTest):
 class GivenLegacyDataLoadedWithLogData(LoadLegacyDataTest):
   LOADER_FLAGS = {'getLog': True}
 
+  def testLogStringsAreShared(self):
+    log = self.data.getLog(order='DateTime')
+    self.assertEqual([u'Info', u'Warning', u'Info'], [l.Category for l in log])
+    self.assertIs(log[0].Category, log[2].Category)
+    self.assertIs(log[0].Type, log[2].Type)
+
+  def testQueryLogOfCageRangeSkipsEntriesWithoutCage(self):
+    self.assertEqual([None, 1, None],
+                     [l.Cage for l in self.data.getLog(order='DateTime')])
+    for where in [{'Cage': slice(1, 3)},
+                  {'Cage': slice(1, 3), 'Corner': slice(None, 2)},
+                  {'Cage': slice(None, 3), 'Category': u'Warning'}]:
+      self.assertEqual([(1, 1)],
+                       [(l.Cage, l.Corner) for l in self.data.query('log', where)])
+
 
 class LoadLegacyDataWithoutIntelliCageSubdirTest(LoadLegacyDataTest):
   DATA_FILE = 'legacy_data_nosubdir.zip'
@@ -1576,6 +1637,13 @@ class LoadIntelliCagePlus3DataTest(LoaderIntegrationTest):
                   'getEnv': True,
                   'getHw': True}
 
+  def testLickVisitAttributes(self):
+    visits = self.data.getVisits(order='Start')
+    self.assertEqual(floatToTimedelta([0, 0.75, 1.5]),
+                     [v.LickDuration for v in visits])
+    self.assertEqual(floatToTimedelta([0, 0.05, 0.1]),
+                     [v.LickContactTime for v in visits])
+
   def testGetStartOrderedVisits_fromDoctests(self):
     self.assertEqual([1, 2, 3],
                      [v.Corner for v in self.data.getVisits(order='Start')])
@@ -1646,6 +1714,448 @@ class LoadRetaggedDataTest(LoaderIntegrationTest):
   DATA_FILE = 'retagged_data.zip'
 
 
+class ColumnarLoaderTest(LoaderIntegrationTest):
+  def loadData(self):
+    flags = dict(self.LOADER_FLAGS)
+    flags['columnar'] = True
+    return pm.Loader(self.dataPath(),
+                     **flags)
+
+
+class LoadLegacyDataColumnarTest(ColumnarLoaderTest, LoadLegacyDataTest):
+  def testNosepokesCreatedOnAccess(self):
+    for visit in self.data.getVisits():
+      if visit._Visit__Nosepokes:
+        self.assertIsInstance(visit._Visit__Nosepokes, LazyNosepokes)
+        nosepokes = visit.Nosepokes
+        self.assertIsInstance(nosepokes, tuple)
+        self.assertIs(nosepokes, visit.Nosepokes)
+        for nosepoke in nosepokes:
+          self.assertIs(visit, nosepoke.Visit)
+
+  def testNosepokeSummariesComputedWithoutNosepokes(self):
+    reference = pm.Loader(self.dataPath(), **self.LOADER_FLAGS)
+    summaries = ['LickNumber', 'LickDuration', 'NosepokeDuration']
+    expected = [[getattr(v, attr) for attr in summaries]
+                for v in reference.getVisits(order='Start')]
+    visits = self.data.getVisits(order='Start')
+    self.assertEqual(expected,
+                     [[getattr(v, attr) for attr in summaries]
+                      for v in visits])
+    for visit in visits:
+      if visit._Visit__Nosepokes:
+        self.assertIsInstance(visit._Visit__Nosepokes, LazyNosepokes)
+
+
+class GivenLegacyDataLoadedColumnarWithEnvData(ColumnarLoaderTest,
+                                               GivenLegacyDataLoadedWithEnvData):
+  pass
+
+
+class GivenLegacyDataLoadedColumnarWithHwData(ColumnarLoaderTest,
+                                              GivenLegacyDataLoadedWithHwData):
+  pass
+
+
+class GivenLegacyDataLoadedColumnarWithLogData(ColumnarLoaderTest,
+                                               GivenLegacyDataLoadedWithLogData):
+  pass
+
+
+class LoadLegacyDataWithoutIntelliCageSubdirColumnarTest(ColumnarLoaderTest,
+                                                         LoadLegacyDataWithoutIntelliCageSubdirTest):
+  pass
+
+
+class LoadIntelliCagePlus3DataColumnarTest(ColumnarLoaderTest,
+                                           LoadIntelliCagePlus3DataTest):
+  pass
+
+
+class LoadUncompressedIntelliCagePlus3DataColumnarTest(ColumnarLoaderTest,
+                                                       LoadUncompressedIntelliCagePlus3DataTest):
+  pass
+
+
+class LoadEmptyDataColumnarTest(ColumnarLoaderTest, LoadEmptyDataTest):
+  pass
+
+
+class GivenArchiveMissingEnvAndHwDataLoadedColumnarRequestingThoseData(ColumnarLoaderTest,
+                                                                       GivenArchiveMissingEnvAndHwDataLoadedRequestingThoseData):
+  pass
+
+
+class LoadRetaggedDataColumnarTest(ColumnarLoaderTest, LoadRetaggedDataTest):
+  pass
+
+
+class ChunkedLoaderTest(LoaderIntegrationTest):
+  def loadData(self):
+    return pm.Loader(self.dataPath(),
+                     chunkSize=1,
+                     **self.LOADER_FLAGS)
+
+
+class LoadLegacyDataChunkedTest(ChunkedLoaderTest, LoadLegacyDataTest):
+  pass
+
+
+class GivenLegacyDataLoadedChunkedWithEnvData(ChunkedLoaderTest,
+                                              GivenLegacyDataLoadedWithEnvData):
+  pass
+
+
+class LoadIntelliCagePlus3DataChunkedTest(ChunkedLoaderTest,
+                                          LoadIntelliCagePlus3DataTest):
+  pass
+
+
+class LoadEmptyDataChunkedTest(ChunkedLoaderTest, LoadEmptyDataTest):
+  pass
+
+
+class CachedLoaderTest(LoaderIntegrationTest):
+  def loadData(self):
+    cacheDir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, cacheDir)
+    pm.Loader(self.dataPath(),
+              cacheDir=cacheDir,
+              **self.LOADER_FLAGS)
+    self.assertEqual(1, len([f for f in os.listdir(cacheDir)
+                             if f.endswith('.pickle')]))
+    return pm.Loader(self.dataPath(),
+                     cacheDir=cacheDir,
+                     **self.LOADER_FLAGS)
+
+
+class LoadLegacyDataCachedTest(CachedLoaderTest, LoadLegacyDataTest):
+  pass
+
+
+class GivenLegacyDataLoadedCachedWithHwData(CachedLoaderTest,
+                                            GivenLegacyDataLoadedWithHwData):
+  pass
+
+
+class LoadIntelliCagePlus3DataCachedTest(CachedLoaderTest,
+                                         LoadIntelliCagePlus3DataTest):
+  pass
+
+
+class LoadUncompressedIntelliCagePlus3DataCachedTest(CachedLoaderTest,
+                                                     LoadUncompressedIntelliCagePlus3DataTest):
+  pass
+
+
+class LazyLoaderTest(LoaderIntegrationTest):
+  def loadData(self):
+    return pm.Loader(self.dataPath(),
+                     lazy=True,
+                     **self.LOADER_FLAGS)
+
+
+class LoadLegacyDataLazyTest(LazyLoaderTest, LoadLegacyDataTest):
+  def testTablesLoadedOnRequest(self):
+    reference = pm.Loader(self.dataPath(), getLog=True, getEnv=True, getHw=True)
+    for getter in ['getLog', 'getEnvironment', 'getHardwareEvents']:
+      self.assertEqual(self.describeNodes(getattr(reference, getter)()),
+                       self.describeNodes(getattr(self.data, getter)()))
+
+  def testLogPendingAfterMerging(self):
+    loaded = []
+    fromZipColumns = self.data._fromZipColumns
+    def loadTable(zf, path, *args, **kwargs):
+      loaded.append(path)
+      return fromZipColumns(zf, path, *args, **kwargs)
+
+    self.data._fromZipColumns = loadTable
+    merged = pm.Merger(self.data, getNp=True)
+    self.assertEqual(self.data.getStart(), merged.getStart())
+    self.assertEqual([], loaded)
+    self.data.getLog()
+    self.assertEqual(['Log'], loaded)
+
+  def testSessionAttributes(self):
+    reference = pm.Loader(self.dataPath(), getLog=True)
+    self.assertEqual(reference.icSessionStart, self.data.icSessionStart)
+    self.assertEqual(reference.icSessionEnd, self.data.icSessionEnd)
+    self.assertEqual(reference.getStart(), self.data.getStart())
+
+  @staticmethod
+  def describeNodes(nodes):
+    return sorted((n.DateTime, n.DateTime.tzinfo.utcoffset(n.DateTime), n.Cage)
+                  for n in nodes)
+
+
+class GivenLegacyDataLoadedLazyWithEnvData(LazyLoaderTest,
+                                           GivenLegacyDataLoadedWithEnvData):
+  pass
+
+
+class GivenLegacyDataLoadedLazyWithHwData(LazyLoaderTest,
+                                          GivenLegacyDataLoadedWithHwData):
+  pass
+
+
+class LoadIntelliCagePlus3DataLazyTest(LazyLoaderTest,
+                                       LoadIntelliCagePlus3DataTest):
+  pass
+
+
+class GivenArchiveMissingEnvAndHwDataLoadedLazy(LazyLoaderTest,
+                                                GivenArchiveMissingEnvAndHwDataLoadedRequestingThoseData):
+  pass
+
+
+class LoadLegacyDataFilteredTest(unittest.TestCase):
+  FLAGS = {'getLog': True,
+           'getEnv': True,
+           'getHw': True,
+           'verbose': False}
+  CET = timezone('CET')
+
+  def setUp(self):
+    self.path = os.path.join(os.path.dirname(__file__), 'data', 'legacy_data.zip')
+    self.reference = pm.Loader(self.path, **self.FLAGS)
+
+  def testStart(self):
+    self.checkFiltered(start=self.CET.localize(datetime(2012, 12, 18, 12, 31)))
+
+  def testEnd(self):
+    self.checkFiltered(end=datetime(2012, 12, 18, 11, 31, tzinfo=utc))
+
+  def testStartAndEnd(self):
+    self.checkFiltered(start=self.CET.localize(datetime(2012, 12, 18, 12, 30, 15)),
+                       end=self.CET.localize(datetime(2012, 12, 18, 12, 41, 7)))
+
+  def testMice(self):
+    self.checkFiltered(mice=['Jerry', 'Minnie'])
+
+  def testSingleMouse(self):
+    self.checkFiltered(mice='Jerry')
+
+  def testMiceAndStart(self):
+    self.checkFiltered(mice=['Minnie', 'Mickey'],
+                       start=self.CET.localize(datetime(2012, 12, 18, 12, 31)))
+
+  def testLazy(self):
+    kwargs = {'start': self.CET.localize(datetime(2012, 12, 18, 12, 31))}
+    data = pm.Loader(self.path, lazy=True, **dict(self.FLAGS, **kwargs))
+    self.checkTables(data, kwargs)
+
+  def testMergerFromFiles(self):
+    kwargs = {'start': self.CET.localize(datetime(2012, 12, 18, 12, 31)),
+              'mice': ['Jerry']}
+    data = pm.Merger.fromFiles([self.path], workers=1, **kwargs)
+    self.assertEqual(self.describeVisits(self.reference.getVisits(**kwargs)),
+                     self.describeVisits(data.getVisits()))
+
+  def checkFiltered(self, **kwargs):
+    data = pm.Loader(self.path, **dict(self.FLAGS, **kwargs))
+    self.assertEqual(self.describeVisits(self.reference.getVisits(**kwargs)),
+                     self.describeVisits(data.getVisits()))
+    self.checkTables(data, kwargs)
+
+  def checkTables(self, data, kwargs):
+    window = dict((k, v) for k, v in kwargs.items() if k != 'mice')
+    for getter in ['getLog', 'getEnvironment', 'getHardwareEvents']:
+      self.assertEqual(self.describeNodes(getattr(self.reference, getter)(**window)),
+                       self.describeNodes(getattr(data, getter)()))
+
+  @staticmethod
+  def describeVisits(visits):
+    return sorted((v.Start, v.End, v.Animal.Name, v.Cage, v.Corner, v._line,
+                   [(n.Start, n.End, n.Side, n._line) for n in v.Nosepokes])
+                  for v in visits)
+
+  @staticmethod
+  def describeNodes(nodes):
+    return sorted((n.DateTime, n.Cage, n._line) for n in nodes)
+
+
+class LoadLegacyDataSourcesTest(unittest.TestCase):
+  def setUp(self):
+    self.path = os.path.join(os.path.dirname(__file__), 'data', 'legacy_data.zip')
+
+  def testNodesShareRegisteredSource(self):
+    for flags in [{}, {'columnar': True}]:
+      data = pm.Loader(self.path, getLog=True, getEnv=True, getHw=True,
+                       **flags)
+      self.assertEqual([self.path], list(data._sourceManager))
+      source = data._sourceManager[self.path]
+      nodes = data.getVisits() + data.getLog() + data.getEnvironment() \
+              + data.getHardwareEvents() \
+              + [n for v in data.getVisits() for n in v.Nosepokes]
+      for node in nodes:
+        self.assertIs(source, node._source)
+
+
+class LoadLegacyDataProjectedTest(unittest.TestCase):
+  FIELDS = ['Module', 'PlaceError', 'LickNumber', 'SideError']
+
+  def setUp(self):
+    self.path = os.path.join(os.path.dirname(__file__), 'data', 'legacy_data.zip')
+    self.reference = pm.Loader(self.path)
+    self.data = pm.Loader(self.path, fields=self.FIELDS)
+
+  def testRequestedFieldsLoaded(self):
+    self.assertEqual(self.describe(self.reference, self.FIELDS + ['Start', 'End', 'Cage', 'Corner']),
+                     self.describe(self.data, self.FIELDS + ['Start', 'End', 'Cage', 'Corner']))
+
+  def testVisitSummaryOfRequestedField(self):
+    self.assertEqual([v.LickNumber for v in self.reference.getVisits(order='Start')],
+                     [v.LickNumber for v in self.data.getVisits(order='Start')])
+
+  def testUnrequestedVisitFieldRaisesError(self):
+    for visit in self.data.getVisits():
+      for attr in ['AntennaDuration', 'VisitSolution', 'CornerCondition']:
+        self.assertRaises(pm.Loader.FieldNotLoadedError, getattr, visit, attr)
+
+  def testUnrequestedNosepokeFieldRaisesError(self):
+    for visit in self.data.getVisits():
+      self.assertRaises(pm.Loader.FieldNotLoadedError, getattr, visit, 'LickDuration')
+      for nosepoke in visit.Nosepokes:
+        for attr in ['LickDuration', 'LED1State', 'TimeError']:
+          self.assertRaises(pm.Loader.FieldNotLoadedError, getattr, nosepoke, attr)
+
+  def testVisitsRemainVisits(self):
+    for visit in self.data.getVisits():
+      self.assertIsInstance(visit, Visit)
+      self.assertEqual('Visit', type(visit).__name__)
+
+  def testUnknownFieldRaisesValueError(self):
+    self.assertRaises(ValueError, pm.Loader, self.path, fields=['Module', 'Mouse'])
+
+  def testMergerFromFiles(self):
+    merged = pm.Merger.fromFiles([self.path], workers=1, fields=self.FIELDS)
+    self.assertEqual(self.describe(self.reference, self.FIELDS),
+                     self.describe(merged, self.FIELDS))
+    for visit in merged.getVisits():
+      self.assertRaises(pm.Loader.FieldNotLoadedError, getattr, visit, 'PresenceNumber')
+
+  @staticmethod
+  def describe(data, fields):
+    visitFields = [f for f in fields if f not in ('SideError', 'LickNumber')]
+    nosepokeFields = [f for f in fields if f not in ('Module', 'PlaceError', 'Cage', 'Corner')]
+    return sorted([getattr(v, f) for f in visitFields]
+                  + [[getattr(n, f) for f in nosepokeFields] for n in v.Nosepokes]
+                  for v in data.getVisits())
+
+
+class MergerFromFilesTest(unittest.TestCase):
+  DATA_FILES = ['legacy_data.zip', 'empty_data.zip']
+  FLAGS = {'getLog': True,
+           'getEnv': True,
+           'getHw': True}
+
+  def setUp(self):
+    dataDir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
+    self.paths = [os.path.join(dataDir, f) for f in self.DATA_FILES]
+    self.reference = pm.Merger(*[pm.Loader(p, **self.FLAGS) for p in self.paths],
+                               **self.FLAGS)
+
+  def testParallelLoadingSameAsMergingLoaders(self):
+    self.checkMerged(pm.Merger.fromFiles(self.paths, workers=2, **self.FLAGS))
+
+  def testSerialLoadingSameAsMergingLoaders(self):
+    self.checkMerged(pm.Merger.fromFiles(self.paths, workers=1, **self.FLAGS))
+
+  def testChunkedLoadingSameAsMergingLoaders(self):
+    self.checkMerged(pm.Merger.fromFiles(self.paths, workers=1, chunkSize=2,
+                                         **self.FLAGS))
+
+  def testMergingColumnarLoadersSameAsMergingLoaders(self):
+    self.checkMerged(pm.Merger(*[pm.Loader(p, columnar=True, **self.FLAGS)
+                                 for p in self.paths],
+                               **self.FLAGS))
+
+  def testMergingLazyLoadersSameAsMergingLoaders(self):
+    self.checkMerged(pm.Merger(*[pm.Loader(p, lazy=True) for p in self.paths],
+                               **self.FLAGS))
+
+  def testOverlapsOfCopiedDataReported(self):
+    tmpDir = tempfile.mkdtemp()
+    try:
+      copy = os.path.join(tmpDir, 'copy.zip')
+      shutil.copy(self.paths[0], copy)
+      for flags in [{}, {'columnar': True}]:
+        merged = pm.Merger(pm.Loader(self.paths[0], **flags),
+                           pm.Loader(copy, **flags))
+        overlaps = merged.getOverlaps()
+        self.assertEqual([(self.paths[0], copy)],
+                         [o.sources for o in overlaps.sources])
+        self.assertEqual(sorted(v.Start for v in merged.getVisits()[:3]),
+                         sorted(d.start for d in overlaps.duplicates))
+        self.assertEqual([((self.paths[0], l), (copy, l)) for l in [1, 2, 3]],
+                         sorted(d.visits for d in overlaps.duplicates))
+
+    finally:
+      shutil.rmtree(tmpDir)
+
+  def testDuplicatesOfCopiedDataRemoved(self):
+    tmpDir = tempfile.mkdtemp()
+    try:
+      copy = os.path.join(tmpDir, 'copy.zip')
+      shutil.copy(self.paths[0], copy)
+      self.reference = pm.Merger(pm.Loader(self.paths[0], **self.FLAGS),
+                                 **self.FLAGS)
+      for flags, copyFlags in [({}, {}), ({'columnar': True}, {}),
+                               ({'columnar': True}, {'columnar': True})]:
+        merged = pm.Merger(pm.Loader(self.paths[0], **dict(flags, **self.FLAGS)),
+                           pm.Loader(copy, **dict(copyFlags, **self.FLAGS)),
+                           dedupe=True, **self.FLAGS)
+        self.checkMerged(merged)
+        removed = merged.getRemovedDuplicates()
+        self.assertEqual(sorted([self.paths[0], copy]), sorted(removed))
+        self.assertEqual((0, 0, 0, 0), self.describeRemoved(removed[self.paths[0]]))
+        self.assertEqual((3, 3, 13, 14), self.describeRemoved(removed[copy]))
+        self.assertEqual([((self.paths[0], line), (copy, line))
+                          for line in [1, 2, 3]],
+                         sorted(d.visits for d in merged.getOverlaps().duplicates))
+
+    finally:
+      shutil.rmtree(tmpDir)
+
+  def testNoDuplicatesRemovedByDefault(self):
+    self.assertEqual({}, self.reference.getRemovedDuplicates())
+
+  @staticmethod
+  def describeRemoved(removed):
+    return removed.visits, removed.log, removed.environment, removed.hardware
+
+  def testInmatesCachedIncrementallySameAsRebuilt(self):
+    inmates = self.describeInmates(self.reference)
+    self.assertNotEqual({}, inmates)
+    self.reference._buildCache()
+    self.assertEqual(inmates, self.describeInmates(self.reference))
+
+  @staticmethod
+  def describeInmates(data):
+    return dict((cage, sorted(a.Name for a in data.getInmates(cage)))
+                for cage in data.getInmates())
+
+  def checkMerged(self, merged):
+    self.assertEqual(sorted(self.reference.getAnimal()),
+                     sorted(merged.getAnimal()))
+    self.assertEqual(self.reference.getStart(), merged.getStart())
+    self.assertEqual(self.reference.getEnd(), merged.getEnd())
+    self.assertEqual(self.describeVisits(self.reference),
+                     self.describeVisits(merged))
+    for getter, attr in [('getLog', 'Notes'),
+                         ('getEnvironment', 'Temperature'),
+                         ('getHardwareEvents', 'Type')]:
+      self.assertEqual([(x.DateTime, getattr(x, attr)) for x in getattr(self.reference, getter)(order='DateTime')],
+                       [(x.DateTime, getattr(x, attr)) for x in getattr(merged, getter)(order='DateTime')])
+
+  @staticmethod
+  def describeVisits(data):
+    return [(v.Start, v.End, v.Animal.Name, v.Cage, v.Corner,
+             v.LickNumber, v.LickDuration,
+             [(n.Start, n.End, n.Side) for n in v.Nosepokes])
+            for v in data.getVisits(order='Start')]
+
+
 @unittest.skip('Not implemented yet')
 class LoadAnalyserDataTest(LoaderIntegrationTest):
   DATA_FILE = 'analyzer_data.txt'
@@ -1700,6 +2210,65 @@ class OnFrozen(OnVisitsLoaded, OnLogLoaded, OnEnvLoaded, OnHwLoaded):
       self.data.insertHw(self.getMockNodeList('HardwareEvent', 2))
 
 
+class TimedNode(object):
+  def __init__(self, time):
+    self.Start = self.DateTime = time
+
+  def clone(self, *args):
+    return self
+
+  def _del_(self):
+    pass
+
+
+class GivenDataWithTimedNodes(unittest.TestCase):
+  def setUp(self):
+    self.times = [datetime(2012, 12, 18, 12, m % 7, m % 3, tzinfo=utc)
+                  for m in range(40)]
+    self.data = Data()
+    self.data._setCageManager(IntIdentityManager())
+    self.data.insertVisits(map(TimedNode, self.times[:30]))
+    self.data.insertVisits(map(TimedNode, self.times[30:]))
+    self.data.insertLog(map(TimedNode, self.times))
+    self.data.freeze()
+
+  def testTimeWindowQueries(self):
+    bounds = [None] + sorted(set(self.times)) \
+             + [datetime(2012, 12, 18, 12, 3, 30, tzinfo=utc)]
+    for start in bounds:
+      for end in bounds:
+        expected = [t for t in self.times
+                    if (start is None or start <= t) and (end is None or t < end)]
+        self.assertEqual(expected,
+                         [v.Start for v in self.data.getVisits(start=start, end=end)])
+        self.assertEqual(expected,
+                         [l.DateTime for l in self.data.getLog(start=start, end=end)])
+
+  def testOrderedQueriesAreStable(self):
+    for start in [None, datetime(2012, 12, 18, 12, 3, tzinfo=utc)]:
+      for _ in range(2):
+        visits = self.data.getVisits(start=start)
+        self.assertEqual(sorted(visits, key=lambda v: v.Start),
+                         self.data.getVisits(start=start, order='Start'))
+        log = self.data.getLog(start=start)
+        self.assertEqual(sorted(log, key=lambda l: (l.DateTime, l.Start)),
+                         self.data.getLog(start=start, order=('DateTime', 'Start')))
+
+  def testQueryCacheIsBounded(self):
+    self.data.setQueryCacheBudget(400)
+    start = datetime(2012, 12, 18, 12, 3, tzinfo=utc)
+    for _ in range(3):
+      self.assertEqual(sorted(t for t in self.times if t >= start),
+                       sorted(v.Start for v in self.data.getVisits(start=start)))
+      self.assertEqual(sorted(t for t in self.times if t < start),
+                       sorted(l.DateTime for l in self.data.getLog(end=start)))
+
+    stats = self.data.getQueryCacheStats()
+    self.assertLessEqual(stats['nbytes'], 400)
+    self.assertGreater(stats['evictions'], 0)
+    self.assertGreater(stats['misses'], 0)
+
+
 def getGlobals():
   dataDir = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data'))
   return {
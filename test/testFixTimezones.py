@@ -24,11 +24,13 @@
 ###############################################################################
 
 import unittest
+import random
 
 from datetime import datetime, timedelta
 import pytz
 
-from pymice._FixTimezones import inferTimezones, TimezonesInferrer, LatticeOrderer
+from pymice._FixTimezones import (inferTimezones, getPreservedTimezone,
+                                  TimezonesInferrer, LatticeOrderer, Timeline)
 
 
 utc = pytz.utc
@@ -157,6 +159,37 @@ class TestFixTimezones(unittest.TestCase):
       inferTimezones(timepoints, sessionStart.astimezone(utcDST), sessionEnd)
 
 
+class TestGetPreservedTimezone(unittest.TestCase):
+  class Session(object):
+    def __init__(self, Start, End):
+      self.Start = Start
+      self.End = End
+
+  def testNoSessionsIsUTC(self):
+    self.assertIs(utc, getPreservedTimezone(None))
+
+  def testTimezoneOfSession(self):
+    self.assertIs(utcDST,
+                  getPreservedTimezone([self.Session(sessionStart.astimezone(utcDST),
+                                                     sessionEnd.astimezone(utcDST))]))
+
+  def testTimezoneOfUnfinishedSession(self):
+    self.assertIs(utc, getPreservedTimezone([self.Session(sessionStart, None)]))
+
+  def testTimezoneChangedInSession(self):
+    self.assertIsNone(getPreservedTimezone([self.Session(sessionStart,
+                                                         sessionEnd.astimezone(utcDST))]))
+
+  def testTimezoneChangedBetweenSessions(self):
+    self.assertIsNone(getPreservedTimezone([self.Session(sessionStart, timeChange),
+                                            self.Session(timeChange.astimezone(utcDST),
+                                                         sessionEnd.astimezone(utcDST))]))
+
+  def testTimezoneOfSessions(self):
+    self.assertIs(utc, getPreservedTimezone([self.Session(sessionStart, timeChange),
+                                             self.Session(timeChange, sessionEnd)]))
+
+
 class TestLatticeOrderer(unittest.TestCase):
   def setUp(self):
     self.orderer = LatticeOrderer()
@@ -235,5 +268,135 @@ class TestLatticeOrderer(unittest.TestCase):
                      reference)
 
 
+class TestTimeline(unittest.TestCase):
+  def setUp(self):
+    self.timeline = Timeline()
+
+  def tearDown(self):
+    del self.timeline
+
+  def testEmptyStaysEmpty(self):
+    self.assertEqual(0, len(self.timeline))
+    self.assertEqual([], self.timeline.pullOrdered().tolist())
+
+  def testAddTimepointsReturnsGlobalIndices(self):
+    self.assertEqual([0, 1], self.timeline.addTimepoints([5, 3]).tolist())
+    self.assertEqual([2], self.timeline.addTimepoints([4]).tolist())
+    self.assertEqual(3, len(self.timeline))
+    self.assertEqual([5, 3, 4], self.timeline.getTimepoints().tolist())
+
+  def testSimpleOrder(self):
+    self.timeline.addTimepoints([3, 1, 2])
+    self.assertEqual([1, 2, 0], self.timeline.pullOrdered().tolist())
+
+  def testOrderedSequence(self):
+    indices = self.timeline.addTimepoints([3, 1, 2])
+    self.timeline.addOrderedSequence(indices)
+    self.assertEqual([0, 1, 2], self.timeline.pullOrdered().tolist())
+
+  def testCoupledTuples(self):
+    starts = self.timeline.addTimepoints([3, 1])
+    ends = self.timeline.addTimepoints([4, 2])
+    self.timeline.coupleTuples(starts, ends)
+    self.assertEqual([1, 3, 0, 2], self.timeline.pullOrdered().tolist())
+
+  def testOrderOfPrecedingLaterTimepointsLikeLatticeOrderer(self):
+    rng = random.Random(0)
+    for _ in range(50):
+      clock = self.generateClockMovedBack(rng)
+      unused = list(range(len(clock)))
+      rng.shuffle(unused)
+      timeline = Timeline()
+      chains = []
+      for _ in range(rng.randint(1, 4)):
+        n = rng.randint(0, 30)
+        indices = sorted(unused[:2 * n])
+        del unused[:2 * n]
+        starts = timeline.addTimepoints([clock[i] for i in indices[::2]])
+        ends = timeline.addTimepoints([clock[i] + 1 for i in indices[1::2]])
+        timeline.coupleTuples(starts, ends)
+        timeline.addOrderedSequence(ends)
+        timeline.addOrderedSequence(starts)
+        chains.append((starts, ends))
+
+      timepoints = timeline.getTimepoints().tolist()
+      nodes = [LatticeOrderer.Node([t]) for t in timepoints]
+      for starts, ends in chains:
+        LatticeOrderer.coupleTuples([nodes[i] for i in starts],
+                                    [nodes[i] for i in ends])
+        LatticeOrderer.makeOrderedSequence([nodes[i] for i in starts])
+        LatticeOrderer.makeOrderedSequence([nodes[i] for i in ends])
+
+      orderer = LatticeOrderer()
+      orderer.addNodes(*nodes)
+      self.assertEqual([timepoints.index(n[0]) for n in orderer],
+                       timeline.pullOrdered().tolist())
+
+  @staticmethod
+  def generateClockMovedBack(rng):
+    """
+    Distinct timepoints (divisible by 2, but not by 4 after the clock was
+    moved back).
+    """
+    timepoints = sorted(rng.sample(range(0, 4000000, 4), 240))
+    moved = rng.randint(0, 120)
+    timepoints[moved:] = [t - 1000002 for t in timepoints[moved:]]
+    return timepoints
+
+  def testInferTimezonesWithoutSessionsIsUTC(self):
+    self.timeline.addTimepoints([3, 1])
+    self.assertEqual([utc, utc],
+                     self.timeline.inferTimezones(None).tolist())
+
+  def testInferTimezonesLikeInferTimezones(self):
+    class Session(object):
+      Start = sessionStart
+      End = sessionEnd
+
+    times = dateRange(sessionStart, timeChange, minute) \
+            + dateRange(likeDST(timeChange), likeDST(sessionEnd), minute)
+    self.timeline.addTimepoints([self.toMicroseconds(t) for t in times])
+    self.assertEqual(inferTimezones(times, sessionStart, sessionEnd),
+                     self.timeline.inferTimezones([Session]).tolist())
+
+  def testInferTimezonesOfChangeFromDST(self):
+    class Session(object):
+      Start = sessionStart.astimezone(utcDST)
+      End = sessionEnd
+
+    times = dateRange(sessionStart.astimezone(utcDST), timeChange.astimezone(utcDST), minute) \
+            + dateRange(timeChange, sessionEnd, minute)
+    self.timeline.addOrderedSequence(self.timeline.addTimepoints([self.toMicroseconds(t)
+                                                                  for t in times]))
+    self.assertEqual(inferTimezones(times, Session.Start, Session.End),
+                     self.timeline.inferTimezones([Session]).tolist())
+
+  def testInferTimezonesOfManySessions(self):
+    class Session(object):
+      def __init__(self, start, end):
+        self.Start = start
+        self.End = end
+
+    hour = 60 * minute
+    sessions = [Session(sessionStart, timeChange),
+                Session(sessionEnd, (sessionEnd + 3 * hour).astimezone(utcDST)),
+                Session((sessionEnd + 4 * hour).astimezone(utcDST),
+                        sessionEnd + 6 * hour)]
+    timesUTC = dateRange(sessionStart, timeChange, minute) \
+               + dateRange(sessionEnd, sessionEnd + hour, minute)
+    timesDST = dateRange(likeDST(sessionEnd + hour), likeDST(sessionEnd + 3 * hour), minute) \
+               + dateRange(likeDST(sessionEnd + 4 * hour), likeDST(sessionEnd + 5 * hour), minute)
+    timesBack = dateRange(sessionEnd + 5 * hour, sessionEnd + 6 * hour, minute)
+    times = timesUTC + timesDST + timesBack
+    indices = self.timeline.addTimepoints([self.toMicroseconds(t) for t in times])
+    self.timeline.addOrderedSequence(indices)
+    self.assertEqual([utc] * len(timesUTC) + [utcDST] * len(timesDST) + [utc] * len(timesBack),
+                     self.timeline.inferTimezones(sessions).tolist())
+
+  @staticmethod
+  def toMicroseconds(timeList):
+    return int((datetime(*timeList) - datetime(1970, 1, 1)).total_seconds()) * 1000000
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# encoding: utf-8
+###############################################################################
+#                                                                             #
+#    PyMICE library                                                           #
+#                                                                             #
+#    Copyright (C) 2015-2017 Jakub M. Dzik a.k.a. Kowalski, S. Łęski          #
+#    (Laboratory of Neuroinformatics; Nencki Institute of Experimental        #
+#    Biology of Polish Academy of Sciences)                                   #
+#                                                                             #
+#    This software is free software: you can redistribute it and/or modify    #
+#    it under the terms of the GNU General Public License as published by     #
+#    the Free Software Foundation, either version 3 of the License, or        #
+#    (at your option) any later version.                                      #
+#                                                                             #
+#    This software is distributed in the hope that it will be useful,         #
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of           #
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the            #
+#    GNU General Public License for more details.                             #
+#                                                                             #
+#    You should have received a copy of the GNU General Public License        #
+#    along with this software.  If not, see http://www.gnu.org/licenses/.     #
+#                                                                             #
+###############################################################################
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+from pytz import utc
+
+from pymice._Overlaps import OverlapIndex, FingerprintSet
+
+
+def toDatetime(microseconds):
+  return datetime(1970, 1, 1, tzinfo=utc) + timedelta(microseconds=microseconds)
+
+
+class TestOverlapIndex(unittest.TestCase):
+  def setUp(self):
+    self.index = OverlapIndex()
+
+  def addVisits(self, source, visits):
+    cages, corners, animals, starts, ends = zip(*visits)
+    self.index.addVisits([source] * len(visits), cages=cages, corners=corners,
+                         animals=animals, starts=starts, ends=ends,
+                         lines=range(1, len(visits) + 1))
+
+  def testEmptyIndexReportsNoOverlaps(self):
+    self.assertEqual([], self.index.getSourceOverlaps())
+    self.assertEqual([], self.index.getCageOverlaps())
+    self.assertEqual([], self.index.getDuplicateVisits())
+
+  def testDisjointSourcesDoNotOverlap(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10)])
+    self.addVisits('b', [(1, 1, 'Mickey', 10, 20)])
+    self.addVisits('c', [(1, 1, 'Mickey', 30, 40)])
+    self.assertEqual([], self.index.getSourceOverlaps())
+    self.assertEqual([], self.index.getCageOverlaps())
+    self.assertEqual([], self.index.getDuplicateVisits())
+
+  def testSourceOverlaps(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10), (1, 1, 'Mickey', 40, 50)])
+    self.addVisits('b', [(2, 1, 'Minnie', 20, 30)])
+    self.addVisits('c', [(3, 1, 'Jerry', 45, 60)])
+    self.assertEqual([(('a', 'b'), 20, 30), (('a', 'c'), 45, 50)],
+                     [(o.sources, o.start.microsecond, o.end.microsecond)
+                      for o in self.index.getSourceOverlaps()])
+
+  def testSourceOverlapsAreInUtc(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10)])
+    self.addVisits('b', [(1, 1, 'Mickey', 5, 20)])
+    overlap, = self.index.getSourceOverlaps()
+    self.assertEqual(toDatetime(5), overlap.start)
+    self.assertEqual(toDatetime(10), overlap.end)
+
+  def testCageOverlapsAreMergedPerCage(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10),
+                         (1, 2, 'Minnie', 12, 20),
+                         (2, 1, 'Jerry', 0, 100)])
+    self.addVisits('b', [(1, 3, 'Mickey', 5, 15),
+                         (2, 1, 'Tom', 100, 110)])
+    self.addVisits('c', [(1, 4, 'Jerry', 14, 30)])
+    self.assertEqual([(1, frozenset('ab'), 5, 10),
+                      (1, frozenset('abc'), 12, 20)],
+                     [(o.cage, o.sources, o.start.microsecond, o.end.microsecond)
+                      for o in self.index.getCageOverlaps()])
+
+  def testVisitsOfOneSourceDoNotOverlap(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10), (1, 2, 'Minnie', 5, 15)])
+    self.assertEqual([], self.index.getCageOverlaps())
+
+  def testDuplicateVisits(self):
+    self.addVisits('a', [(1, 1, 'Mickey', 0, 10), (1, 2, 'Minnie', 5, 15)])
+    self.addVisits('b', [(1, 2, 'Minnie', 5, 15), (1, 1, 'Mickey', 0, 11)])
+    self.addVisits('c', [(1, 2, 'Minnie', 5, 15)])
+    duplicate, = self.index.getDuplicateVisits()
+    self.assertEqual((1, 2, 'Minnie', toDatetime(5), toDatetime(15)),
+                     (duplicate.cage, duplicate.corner, duplicate.animal,
+                      duplicate.start, duplicate.end))
+    self.assertEqual((('a', 2), ('b', 1), ('c', 1)), duplicate.visits)
+
+
+class TestOverlapIndexGivenVisitsOfSources(TestOverlapIndex):
+  def addVisits(self, source, visits):
+    cages, corners, animals, starts, ends = map(np.array, zip(*visits))
+    self.index.addSourceVisits(source, cages=cages, corners=corners,
+                               animals=animals, starts=starts, ends=ends,
+                               lines=np.arange(1, len(visits) + 1))
+
+
+class TestFingerprintSet(unittest.TestCase):
+  def setUp(self):
+    self.fingerprints = FingerprintSet()
+
+  def makeFingerprints(self, rows):
+    names, times = zip(*rows)
+    return self.fingerprints.makeFingerprints([self.fingerprints.intern(names),
+                                               times])
+
+  def testRowsOfFirstSourceAreNotDropped(self):
+    fingerprints = self.makeFingerprints([('Mickey', 10), ('Mickey', 10)])
+    self.assertEqual([True, True],
+                     self.fingerprints.selectUnseen('Visits', fingerprints).tolist())
+
+  def testRowsSeenBeforeAreDropped(self):
+    self.fingerprints.selectUnseen('Visits',
+                                   self.makeFingerprints([('Mickey', 10),
+                                                          ('Minnie', 20)]))
+    fingerprints = self.makeFingerprints([('Minnie', 20), ('Minnie', 10),
+                                          ('Mickey', 20), ('Mickey', 10)])
+    self.assertEqual([False, True, True, False],
+                     self.fingerprints.selectUnseen('Visits', fingerprints).tolist())
+
+  def testRowsOfAllSourcesSeenBeforeAreDropped(self):
+    for rows in [[('Mickey', 30), ('Mickey', 10)], [('Minnie', 20)],
+                 [('Mickey', 10), ('Minnie', 40)]]:
+      self.fingerprints.selectUnseen('Visits', self.makeFingerprints(rows))
+
+    fingerprints = self.makeFingerprints([('Minnie', 40), ('Mickey', 20),
+                                          ('Mickey', 30), ('Minnie', 20),
+                                          ('Minnie', 10)])
+    self.assertEqual([False, True, False, False, True],
+                     self.fingerprints.selectUnseen('Visits', fingerprints).tolist())
+
+  def testTablesAreSeparated(self):
+    fingerprints = self.makeFingerprints([('Mickey', 10)])
+    self.fingerprints.selectUnseen('Visits', fingerprints)
+    self.assertEqual([True],
+                     self.fingerprints.selectUnseen('Log', fingerprints).tolist())
+
+  def testOrderOfFieldsMatters(self):
+    intern = self.fingerprints.intern
+    self.assertNotEqual(self.fingerprints.makeFingerprints([intern([1]), intern([2])]).tolist(),
+                        self.fingerprints.makeFingerprints([intern([2]), intern([1])]).tolist())
+
+  def testColumnInternedByValues(self):
+    self.assertEqual(self.fingerprints.intern([u'Minnie', u'Mickey', None, u'Minnie']).tolist(),
+                     self.fingerprints.internColumn(np.array([1, 0, 2, 1]),
+                                                    lambda codes: [[u'Mickey', u'Minnie', None][c]
+                                                                   for c in codes.tolist()]).tolist())
+
+
+if __name__ == '__main__':
+  unittest.main()